@@ -1,5 +1,3 @@
-import copy
-
 PRINT = False
 
 def dprint(*argv):
@@ -19,12 +17,12 @@ def alphaBeta(state, depth, player):
 	beta = float("inf")
 	dprint('Legal Moves: ', legalMoves)
 	for move in legalMoves:
-		successor = copy.deepcopy(state)
-		successor.make_move(move, player, play_test=False)
-		score = minPlayer(successor, depth-1, alpha, beta, player) # Switch to opponent (minPlayer)
+		record = state.move(move, player)
+		score = minPlayer(state, depth-1, alpha, beta, player) # Switch to opponent (minPlayer)
 		
 		if PRINT:
-			successor.print()
+			state.print()
+		state.undo(record)
 		dprint('a')
 		dprint('Score: ', score)
 		dprint('Depth: ', depth)
@@ -50,12 +48,12 @@ def minPlayer(state, depth, a, b, player):
 	beta = b
 	dprint('Legal Moves: ', legalMoves)
 	for move in legalMoves:
-		successor = copy.deepcopy(state)
-		successor.make_move(move, opponent, play_test=False)
-		score = maxPlayer(successor, depth-1, alpha, beta, player) # Switch to maxPlayer
+		record = state.move(move, opponent)
+		score = maxPlayer(state, depth-1, alpha, beta, player) # Switch to maxPlayer
 		
 		if PRINT:
-			successor.print()
+			state.print()
+		state.undo(record)
 		dprint('b')
 		dprint('Score: ', score)
 		dprint('Depth: ', depth)
@@ -81,12 +79,12 @@ def maxPlayer(state, depth, a, b, player):
 	alpha = a
 	beta = b
 	for move in legalMoves:
-		successor = copy.deepcopy(state)
-		successor.make_move(move, player, play_test=False)
-		score = minPlayer(successor, depth-1, alpha, beta, player) # Switch to minPlayer
+		record = state.move(move, player)
+		score = minPlayer(state, depth-1, alpha, beta, player) # Switch to minPlayer
 		
 		if PRINT:
-			successor.print()
+			state.print()
+		state.undo(record)
 		dprint('c')
 		dprint('Score: ', score)
 		dprint('Depth: ', depth)
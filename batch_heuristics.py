@@ -0,0 +1,357 @@
+"""
+Heuristics evaluated on many boards at once.
+
+Boards are stacked in an int8 array of shape (N, 8, 8), indexed as [i, y, x]. Black is 1, white is -1 and empty is 0.
+Every function returns arrays of shape (N,), with the same values as the scalar versions in `othello.Board` and
+othello-cpp/othello.h.
+"""
+
+import functools
+import numpy as np
+import othello
+
+BLACK = 1
+WHITE = -1
+
+# Same weights as weighted_parity_heuristic_1 and weighted_parity_heuristic_2 in othello.h.
+DHCONNELLY_WEIGHTS = np.array([
+    120, -20, 20, 5, 5, 20, -20, 120,
+    -20, -40, -5, -5, -5, -5, -40, -20,
+    20, -5, 15, 3, 3, 15, -5, 20,
+    5, -5, 3, 3, 3, 3, -5, 5,
+    5, -5, 3, 3, 3, 3, -5, 5,
+    20, -5, 15, 3, 3, 15, -5, 20,
+    -20, -40, -5, -5, -5, -5, -40, -20,
+    120, -20, 20, 5, 5, 20, -20, 120,
+], dtype=np.int32).reshape(8, 8)
+
+# Same weights as weighted_parity_heuristic_3 in othello.h.
+RUSSIA_WEIGHTS = np.array([
+    4, -3, 2, 2, 2, 2, -3, 4,
+    -3, -4, -1, -1, -1, -1, -4, -3,
+    2, -1, 1, 0, 0, 1, -1, 2,
+    2, -1, 0, 1, 1, 0, -1, 2,
+    2, -1, 0, 1, 1, 0, -1, 2,
+    2, -1, 1, 0, 0, 1, -1, 2,
+    -3, -4, -1, -1, -1, -1, -4, -3,
+    4, -3, 2, 2, 2, 2, -3, 4
+], dtype=np.int32).reshape(8, 8)
+
+# (dx, dy) pairs. `i ^ 1` is the opposite of `i`.
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, -1), (-1, 1), (1, -1)]
+
+CORNERS = (np.array([0, 0, 7, 7]), np.array([0, 7, 0, 7]))
+
+
+def boards_to_tensor(boards):
+    """
+    :param boards: List of `othello.Board`.
+    :return: int8 array of shape (N, 8, 8).
+    """
+    ret = np.zeros((len(boards), 8, 8), dtype=np.int8)
+    for i, board in enumerate(boards):
+        assert isinstance(board, othello.Board)
+        for bits, value in ((board.black_bits, BLACK), (board.white_bits, WHITE)):
+            mask = np.unpackbits(np.array([bits], dtype='<u8').view(np.uint8), bitorder='little').astype(bool)
+            ret[i].reshape(64)[mask] = value
+    return ret
+
+
+def player_sign(player, num_boards):
+    """
+    :param player: 'B' or 'W', or a sequence of them, one per board.
+    :return: int8 array of shape (N, 1, 1). 1 for black and -1 for white.
+    """
+    if isinstance(player, str):
+        player = [player] * num_boards
+    assert len(player) == num_boards
+    assert all(item in ('B', 'W') for item in player)
+    return np.array([BLACK if item == 'B' else WHITE for item in player], dtype=np.int8).reshape(-1, 1, 1)
+
+
+def shift(masks, dx, dy):
+    """
+    Moves every square of boolean `masks` by (dx, dy). Squares moved off the board are dropped.
+    """
+    ret = np.zeros_like(masks)
+    src_y = slice(max(0, -dy), 8 - max(0, dy))
+    src_x = slice(max(0, -dx), 8 - max(0, dx))
+    dst_y = slice(max(0, dy), 8 - max(0, -dy))
+    dst_x = slice(max(0, dx), 8 - max(0, -dx))
+    ret[:, dst_y, dst_x] = masks[:, src_y, src_x]
+    return ret
+
+
+def legal_move_masks(own, opp):
+    """
+    :param own: Boolean array of shape (N, 8, 8). Disks of the player to move.
+    :param opp: Boolean array of shape (N, 8, 8). Disks of the opponent.
+    :return: Boolean array of shape (N, 8, 8). Legal moves of the player to move.
+    """
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for dx, dy in DIRECTIONS:
+        candidates = shift(own, dx, dy) & opp
+        for _ in range(5):
+            candidates |= shift(candidates, dx, dy) & opp
+        moves |= shift(candidates, dx, dy) & empty
+    return moves
+
+
+# (dx, dy) of a neighbor along each of the four axes of `othello.AXIS_SHIFTS`.
+AXIS_DIRECTIONS = [(1, 0), (0, 1), (1, 1), (-1, 1)]
+
+INTERIOR = np.zeros((8, 8), dtype=bool)
+INTERIOR[1:7, 1:7] = True
+
+TERNARY_POWERS = 3 ** np.arange(8)
+
+
+@functools.lru_cache(maxsize=None)
+def edge_stability_table():
+    """
+    `othello.edge_stable_bits` of every ternary index, as a uint8 array.
+    """
+    return np.array([othello.edge_stable_bits(index) for index in range(3 ** 8)], dtype=np.uint8)
+
+
+def _edge_stable(black_edges, white_edges):
+    """
+    :param black_edges: Boolean array of shape (N, 8).
+    :return: Boolean array of shape (N, 8). Stable squares of each edge.
+    """
+    index = (black_edges.astype(np.int32) + 2 * white_edges.astype(np.int32)) @ TERNARY_POWERS
+    return (edge_stability_table()[index][:, np.newaxis] >> np.arange(8) & 1).astype(bool)
+
+
+def _full_lines(filled):
+    """
+    :return: List of boolean arrays of shape (N, 8, 8), one per axis. Squares whose line along the axis is full.
+    """
+    rows = np.broadcast_to(filled.all(axis=2, keepdims=True), filled.shape)
+    columns = np.broadcast_to(filled.all(axis=1, keepdims=True), filled.shape)
+    diagonals = np.zeros_like(filled)
+    anti_diagonals = np.zeros_like(filled)
+    y, x = np.mgrid[0:8, 0:8]
+    for c in range(-7, 8):
+        ys, xs = np.nonzero(x - y == c)
+        diagonals[:, ys, xs] = filled[:, ys, xs].all(axis=1, keepdims=True)
+    for c in range(15):
+        ys, xs = np.nonzero(x + y == c)
+        anti_diagonals[:, ys, xs] = filled[:, ys, xs].all(axis=1, keepdims=True)
+    return [rows, columns, diagonals, anti_diagonals]
+
+
+def stable_masks(black, white):
+    """
+    Same as `othello.stable_bits`. Disks of both colors that can never be flipped.
+
+    :param black: Boolean array of shape (N, 8, 8).
+    :param white: Boolean array of shape (N, 8, 8).
+    :return: Boolean array of shape (N, 8, 8).
+    """
+    stable = np.zeros_like(black)
+    stable[:, 0, :] |= _edge_stable(black[:, 0, :], white[:, 0, :])
+    stable[:, 7, :] |= _edge_stable(black[:, 7, :], white[:, 7, :])
+    stable[:, :, 0] |= _edge_stable(black[:, :, 0], white[:, :, 0])
+    stable[:, :, 7] |= _edge_stable(black[:, :, 7], white[:, :, 7])
+
+    filled = black | white
+    full = _full_lines(filled)
+    stable |= filled & INTERIOR & full[0] & full[1] & full[2] & full[3]
+
+    while True:
+        next_stable = stable.copy()
+        for disks in (black, white):
+            own_stable = stable & disks
+            candidates = disks & INTERIOR
+            for (dx, dy), full_line in zip(AXIS_DIRECTIONS, full):
+                candidates &= shift(own_stable, dx, dy) | shift(own_stable, -dx, -dy) | full_line
+            next_stable |= candidates
+        if np.array_equal(next_stable, stable):
+            return stable
+        stable = next_stable
+
+
+def count(masks):
+    return masks.reshape(masks.shape[0], -1).sum(axis=1)
+
+
+def normalized_difference(player_value, opponent_value, denominator):
+    """
+    (player_value - opponent_value + 1) / denominator, in float32 as in othello.h.
+    """
+    return (player_value - opponent_value + 1).astype(np.float32) / denominator.astype(np.float32)
+
+
+def disk_counts(boards):
+    """
+    Same as `othello.Board.get_scores`.
+
+    :return: (black counts, white counts)
+    """
+    return count(boards == BLACK), count(boards == WHITE)
+
+
+def corner_counts(boards):
+    """
+    Same as `othello.Board.get_corner_disk_count`.
+
+    :return: (black counts, white counts)
+    """
+    corners = boards[:, CORNERS[0], CORNERS[1]]
+    return (corners == BLACK).sum(axis=1), (corners == WHITE).sum(axis=1)
+
+
+def mobility_counts(boards):
+    """
+    Same as `othello.Board.heuristic_numMoves`.
+
+    :return: (black counts, white counts)
+    """
+    black = boards == BLACK
+    white = boards == WHITE
+    return count(legal_move_masks(black, white)), count(legal_move_masks(white, black))
+
+
+def permanent_disk_counts(boards):
+    """
+    Same as `othello.Board.get_permanent_disk_count`.
+
+    :return: (black counts, white counts)
+    """
+    black = boards == BLACK
+    white = boards == WHITE
+    stable = stable_masks(black, white)
+    return count(stable & black), count(stable & white)
+
+
+def heuristic_weighted(boards):
+    """
+    Same as `othello.Board.heuristic_weighted`.
+
+    :return: (black scores, white scores)
+    """
+    b_score, w_score = disk_counts(boards)
+    b_perm, w_perm = permanent_disk_counts(boards)
+    b_moves, w_moves = mobility_counts(boards)
+    return b_score + b_perm + b_moves, w_score + w_perm + w_moves
+
+
+def weighted_sum(boards, player, weights):
+    """
+    Same as `othello.Board.get_weighted_sum`, with `weights` of shape (8, 8).
+    """
+    relative = boards.astype(np.int32) * player_sign(player, boards.shape[0])
+    return (relative * weights).reshape(boards.shape[0], -1).sum(axis=1)
+
+
+def parity(boards, player):
+    """
+    Same as parity_heuristic in othello.h.
+    """
+    relative = boards.astype(np.int32) * player_sign(player, boards.shape[0])
+    return relative.reshape(boards.shape[0], -1).sum(axis=1)
+
+
+def weighted_parity_1(boards, player):
+    """
+    Same as weighted_parity_heuristic_1 in othello.h, and `alphaBeta.weighted_heuristic`.
+    """
+    return weighted_sum(boards, player, DHCONNELLY_WEIGHTS)
+
+
+def _normalized_weighted_parity(boards, player, weights):
+    relative = boards * player_sign(player, boards.shape[0])
+    player_sum = ((relative == 1) * weights).reshape(boards.shape[0], -1).sum(axis=1)
+    opponent_sum = ((relative == -1) * weights).reshape(boards.shape[0], -1).sum(axis=1)
+    return normalized_difference(player_sum, opponent_sum, np.abs(player_sum) + np.abs(opponent_sum) + 1)
+
+
+def weighted_parity_2(boards, player):
+    """
+    Same as weighted_parity_heuristic_2 in othello.h.
+    """
+    return _normalized_weighted_parity(boards, player, DHCONNELLY_WEIGHTS)
+
+
+def weighted_parity_3(boards, player):
+    """
+    Same as weighted_parity_heuristic_3 in othello.h.
+    """
+    return _normalized_weighted_parity(boards, player, RUSSIA_WEIGHTS)
+
+
+def _player_first(black_values, white_values, player, num_boards):
+    is_black = player_sign(player, num_boards).reshape(-1) == BLACK
+    return np.where(is_black, black_values, white_values), np.where(is_black, white_values, black_values)
+
+
+def mobility(boards, player):
+    """
+    Same as mobility_heuristic in othello.h.
+    """
+    player_moves, opponent_moves = _player_first(*mobility_counts(boards), player, boards.shape[0])
+    return normalized_difference(player_moves, opponent_moves, player_moves + opponent_moves + 1)
+
+
+def permanent_disk(boards, player):
+    """
+    Same as permanent_disk_heuristic in othello.h, including its denominator of twice the player's count plus one.
+    """
+    player_count, opponent_count = _player_first(*permanent_disk_counts(boards), player, boards.shape[0])
+    return normalized_difference(player_count, opponent_count, player_count + player_count + 1)
+
+
+def heuristic(boards, player, strategy):
+    """
+    Same as heuristic in othello.h. `strategy` is a name from `othello_ctypes.strategy_indices`.
+    """
+    if strategy == 'weighted_parity_1':
+        return weighted_parity_1(boards, player).astype(np.float32)
+    elif strategy == 'weighted_parity_2':
+        return weighted_parity_2(boards, player)
+    elif strategy == 'weighted_parity_3':
+        return weighted_parity_3(boards, player)
+    elif strategy == 'parity':
+        return parity(boards, player).astype(np.float32)
+    elif strategy == 'mobility':
+        return mobility(boards, player)
+    elif strategy == 'perm_disk':
+        return permanent_disk(boards, player)
+    elif strategy == 'weighted_parity_and_mobility_1':
+        return weighted_parity_2(boards, player) + mobility(boards, player)
+    elif strategy == 'weighted_parity_and_mobility_2':
+        return weighted_parity_2(boards, player) + np.float32(0.5) * mobility(boards, player)
+    elif strategy == 'all':
+        return weighted_parity_2(boards, player) * np.float32(4) + mobility(boards, player) * np.float32(5) \
+               + permanent_disk(boards, player) * np.float32(6)
+    elif strategy == 'random':
+        return np.zeros(boards.shape[0], dtype=np.float32)
+    raise ValueError('Unknown strategy: {}'.format(strategy))
+
+
+def features(boards, player):
+    """
+    All heuristic features, from `player`'s perspective.
+
+    :return: dict of name to array of shape (N,).
+    """
+    num_boards = boards.shape[0]
+    player_corners, opponent_corners = _player_first(*corner_counts(boards), player, num_boards)
+    player_permanent, opponent_permanent = _player_first(*permanent_disk_counts(boards), player, num_boards)
+    player_moves, opponent_moves = _player_first(*mobility_counts(boards), player, num_boards)
+    return {
+        'parity': parity(boards, player),
+        'weighted_parity_1': weighted_parity_1(boards, player),
+        'weighted_parity_2': weighted_parity_2(boards, player),
+        'weighted_parity_3': weighted_parity_3(boards, player),
+        'mobility': mobility(boards, player),
+        'perm_disk': permanent_disk(boards, player),
+        'player_moves': player_moves,
+        'opponent_moves': opponent_moves,
+        'player_permanent_disks': player_permanent,
+        'opponent_permanent_disks': opponent_permanent,
+        'player_corners': player_corners,
+        'opponent_corners': opponent_corners,
+    }
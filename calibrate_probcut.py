@@ -0,0 +1,172 @@
+"""
+Fits the Multi-ProbCut parameters of the 'all' strategy (heuristic 8), and writes them to
+othello-cpp/probcut_parameters.h. See `kMultiProbCut` in othello.h.
+
+    python calibrate_probcut.py --num-games 100
+    ./othello-cpp/build_all.sh
+
+Positions are sampled from games of mixed random and shallow-search moves. Each is searched to every depth up to
+--max-depth without selective search. For each game stage, depth and shallow depth checked at that depth, the deep value
+is fitted to the shallow value by least squares, and the deviation of the residuals is kept.
+"""
+
+import argparse
+import random
+import time
+from os import path
+
+import numpy as np
+
+import othello_ctypes
+
+HEADER_FILENAME = path.join(path.dirname(path.realpath(__file__)), 'othello-cpp', 'probcut_parameters.h')
+
+# Same as kProbCut* in othello.h.
+MIN_DEPTH = 5
+MAX_DEPTH = 10
+NUM_STAGES = 4
+NUM_CHECKS = 2
+STAGE_NAMES = ['60-46', '45-31', '30-16', '15-0']
+
+# Stages with fewer positions than this are not fitted, so they are never cut off.
+MIN_SAMPLES = 30
+# Values of won or lost positions are not heuristic values, and are left out of the fit.
+MAX_HEURISTIC_VALUE = 1000
+
+
+def shallow_depths(depth):
+    """
+    :return: Shallow depths checked at `depth`, cheapest first. They have the same parity as `depth`, and are about half
+    as deep.
+    """
+    shallow = depth // 2 if (depth // 2) % 2 == depth % 2 else depth // 2 - 1
+    return [d for d in (shallow - 2, shallow) if d >= 1]
+
+
+def stage(squares):
+    num_empty = int(np.count_nonzero(squares == othello_ctypes.EMPTY_SQUARE))
+    return min(NUM_STAGES - 1, max(0, 60 - num_empty) // 15)
+
+
+def sample_positions(num_games, positions_per_game=4, random_move_rate=0.5, seed=0):
+    """
+    :return: (boards, players). boards is a uint8 array of shape (N, 64).
+    """
+    rng = random.Random(seed)
+    boards, players = [], []
+    for game in range(num_games):
+        board = othello_ctypes.NativeBoard()
+        player = 'B'
+        sample_plies = set(rng.sample(range(58), positions_per_game))
+        for ply in range(60):
+            moves = board.get_legal_moves(player)
+            if not moves:
+                player = 'W' if player == 'B' else 'B'
+                moves = board.get_legal_moves(player)
+                if not moves:
+                    break
+            if ply in sample_plies:
+                boards.append(board.squares.copy())
+                players.append(player)
+            if rng.random() < random_move_rate:
+                move = rng.choice(moves)
+            else:
+                move, _ = othello_ctypes.best_move(board, player, 'all', 2, num_threads=1, endgame_empties=0,
+                                                   seed=rng.getrandbits(64))
+            board.move(move, player)
+            player = 'W' if player == 'B' else 'B'
+    return np.array(boards, dtype=np.uint8), players
+
+
+def search_values(boards, players, max_depth):
+    """
+    :return: float array of shape (max_depth + 1, N). values[d, i] is the value of board i for players[i], searched to
+    depth d. Row 0 is unused.
+    """
+    values = np.zeros((max_depth + 1, len(boards)), dtype=np.float32)
+    for depth in range(1, max_depth + 1):
+        start_time = time.time()
+        _, values[depth] = othello_ctypes.best_moves_batch(boards, players, 'all', depth, tt_size_log2=20,
+                                                           options=othello_ctypes.DEFAULT_OPTIONS, seed=0)
+        print('Depth {}: {:.1f} seconds'.format(depth, time.time() - start_time), flush=True)
+    return values
+
+
+def fit(shallow_values, deep_values):
+    """
+    :return: (slope, intercept, sigma) of deep = slope * shallow + intercept.
+    """
+    slope, intercept = np.polyfit(shallow_values, deep_values, 1)
+    sigma = np.std(deep_values - (slope * shallow_values + intercept))
+    return float(slope), float(intercept), float(sigma)
+
+
+def fit_parameters(stages, values):
+    """
+    :return: dict from (stage, depth, shallow depth) to (slope, intercept, sigma, number of positions).
+    """
+    max_depth = values.shape[0] - 1
+    is_heuristic = np.all(np.abs(values[1:]) < MAX_HEURISTIC_VALUE, axis=0)
+    ret = {}
+    for stage_index in range(NUM_STAGES):
+        selected = (stages == stage_index) & is_heuristic
+        if np.count_nonzero(selected) < MIN_SAMPLES:
+            continue
+        for depth in range(MIN_DEPTH, min(MAX_DEPTH, max_depth) + 1):
+            for shallow_depth in shallow_depths(depth):
+                slope, intercept, sigma = fit(values[shallow_depth, selected], values[depth, selected])
+                if slope > 0:
+                    ret[stage_index, depth, shallow_depth] = (slope, intercept, sigma, int(np.count_nonzero(selected)))
+    return ret
+
+
+def write_header(parameters, num_positions, filename=HEADER_FILENAME):
+    lines = [
+        '// Generated by calibrate_probcut.py from {} positions. Do not edit.'.format(num_positions),
+        '// Indexed by [stage][depth][check]. See ProbCutParameters in othello.h.',
+        '#pragma once',
+        '',
+        'constexpr ProbCutParameters',
+        '    kProbCutParameters[kProbCutNumStages][kProbCutMaxDepth + 1][kProbCutNumChecks] = {',
+    ]
+    for stage_index in range(NUM_STAGES):
+        lines.append('  {{  // {} empty squares.'.format(STAGE_NAMES[stage_index]))
+        for depth in range(MAX_DEPTH + 1):
+            checks = []
+            shallow = shallow_depths(depth) if depth >= MIN_DEPTH else []
+            for shallow_depth in [0] * (NUM_CHECKS - len(shallow)) + shallow:
+                slope, intercept, sigma, _ = parameters.get((stage_index, depth, shallow_depth), (0.0, 0.0, 0.0, 0))
+                checks.append('{{{}, {!r}f, {!r}f, {!r}f}}'.format(shallow_depth if sigma > 0 else 0, round(slope, 6),
+                                                                   round(intercept, 6), round(sigma, 6)))
+            lines.append('    {{{}}},  // Depth {}.'.format(', '.join(checks), depth))
+        lines.append('  },')
+    lines.append('};')
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--num-games', type=int, default=100, help='Four positions are sampled from each game.')
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=HEADER_FILENAME)
+    args = parser.parse_args()
+
+    boards, players = sample_positions(args.num_games, seed=args.seed)
+    stages = np.array([stage(board) for board in boards])
+    print('{} positions, per stage: {}'.format(len(boards), np.bincount(stages, minlength=NUM_STAGES)))
+    values = search_values(boards, players, min(args.max_depth, MAX_DEPTH))
+    parameters = fit_parameters(stages, values)
+
+    print('{:>6} {:>5} {:>7} {:>7} {:>9} {:>7} {:>9}'.format(
+        'stage', 'depth', 'shallow', 'slope', 'intercept', 'sigma', 'positions'))
+    for (stage_index, depth, shallow_depth), (slope, intercept, sigma, count) in sorted(parameters.items()):
+        print('{:>6} {:>5} {:>7} {:>7.3f} {:>9.3f} {:>7.3f} {:>9}'.format(
+            STAGE_NAMES[stage_index], depth, shallow_depth, slope, intercept, sigma, count))
+    write_header(parameters, len(boards), filename=args.output)
+    print('Wrote {}. Rebuild the library to use them.'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+"""
+Serves the C++ engine to many games at once, over stdin/stdout or a local socket.
+
+    python engine_server.py --stdio
+    python engine_server.py --unix /tmp/othello.sock --workers 8
+    python engine_server.py --port 7777
+
+Searches run in a bounded pool of threads. The ctypes calls release the GIL, so the searches run in parallel while the
+event loop keeps reading requests. Each game has its own transposition table, kept between its moves.
+
+The protocol is one JSON object per line, in both directions. Every request has an "id", a string or an integer,
+which is copied to its response. Responses to move requests are written when the search ends, so they can come out of
+order.
+
+    {"id": 1, "type": "move", "game": "g1", "board": "...........................WB......BW...........................",
+     "player": "B", "depth": 6}
+        Searches to a fixed depth. Optional: "strategy" (default "all"), "endgame_empties", "seed".
+        -> {"id": 1, "move": [x, y], "depth": 6, "seconds": 0.01, "queued_seconds": 0.0}
+        "move" is null if the player has no legal move.
+
+    {"id": 2, "type": "move", "game": "g1", "board": "...", "player": "B", "time_ms": 500}
+        Iterative deepening until the time budget is spent. "depth" in the response is the depth reached.
+
+    {"id": 3, "type": "cancel", "target": 1}
+        Cancels a move request of the same connection, queued or running. The cancelled request gets
+        {"id": 1, "error": "cancelled"}, and this one gets {"id": 3, "cancelled": true}, or false if request 1 had
+        already finished.
+
+    {"id": 4, "type": "metrics"}
+        -> {"id": 4, "queued": 0, "running": 1, "workers": 8, "completed": 10, ...}. See `EngineServer.metrics`.
+
+    {"id": 5, "type": "close", "game": "g1"}
+        Frees the game's transposition table.
+
+With --stdio, every request is answered before the server exits at the end of its input. A socket client's pending
+searches are cancelled when it disconnects.
+
+Invalid requests get {"id": ..., "error": "..."}. A move request is rejected with "queue full" when --max-queued
+requests are already waiting for a worker.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import json
+import os
+import sys
+import time
+
+import othello_ctypes
+
+BOARD_CHARACTERS = frozenset('BW.')
+
+
+class RequestError(Exception):
+    pass
+
+
+class _Job(object):
+    """
+    A move request that is queued or running.
+    """
+
+    def __init__(self):
+        self.control = othello_ctypes.SearchControl()
+        self.task = None
+        self.is_running = False
+
+
+class _Connection(object):
+    def __init__(self, writer):
+        self.writer = writer
+        self.write_lock = asyncio.Lock()
+        self.jobs = {}  # By request id.
+        self.tables = {}  # By game name.
+
+    async def send(self, response):
+        async with self.write_lock:
+            self.writer.write((json.dumps(response) + '\n').encode('utf-8'))
+            await self.writer.drain()
+
+
+class EngineServer(object):
+    def __init__(self, num_workers=None, max_queued=64, omp_threads=1, tt_size_log2=16, max_games=256):
+        """
+        :param num_workers: Number of searches run at the same time. Defaults to the number of cores.
+        :param max_queued: Move requests waiting for a worker beyond this number are rejected.
+        :param omp_threads: Search threads per move. 1 gives the best throughput when many games are served.
+        :param tt_size_log2: Transposition table size of each game. See `othello_ctypes.TranspositionTable`.
+        :param max_games: Maximum number of games with a table, per connection.
+        """
+        self.num_workers = num_workers or os.cpu_count()
+        self.max_queued = max_queued
+        self.omp_threads = omp_threads
+        self.tt_size_log2 = tt_size_log2
+        self.max_games = max_games
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.num_workers)
+        self.slots = asyncio.Semaphore(self.num_workers)
+
+        self.num_queued = 0
+        self.num_running = 0
+        self.num_started = 0
+        self.num_completed = 0
+        self.num_cancelled = 0
+        self.num_rejected = 0
+        self.num_failed = 0
+        self.num_connections = 0
+        self.total_queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+
+    def metrics(self):
+        """
+        :return: dict of the current queue depth and running searches, and totals since the server started.
+        """
+        return {
+            'queued': self.num_queued,
+            'running': self.num_running,
+            'workers': self.num_workers,
+            'max_queued': self.max_queued,
+            'completed': self.num_completed,
+            'cancelled': self.num_cancelled,
+            'rejected': self.num_rejected,
+            'failed': self.num_failed,
+            'connections': self.num_connections,
+            'started': self.num_started,
+            'mean_queue_seconds': self.total_queue_seconds / self.num_started if self.num_started else 0.0,
+            'max_queue_seconds': self.max_queue_seconds,
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def _search(self, request, table, control):
+        """
+        Runs in a worker thread.
+
+        :return: (move, depth, seconds).
+        """
+        kwargs = dict(strategy=request.get('strategy', 'all'), table=table, num_threads=self.omp_threads,
+                      seed=request.get('seed'), control=control)
+        if 'endgame_empties' in request:
+            kwargs['endgame_empties'] = request['endgame_empties']
+        if 'time_ms' in request:
+            return othello_ctypes.best_move_timed(request['board'], request['player'],
+                                                  time_budget_ms=request['time_ms'], **kwargs)
+        move, seconds = othello_ctypes.best_move(request['board'], request['player'], depth=request['depth'],
+                                                 **kwargs)
+        return move, request['depth'], seconds
+
+    @staticmethod
+    def _validate_move_request(request):
+        board = request.get('board')
+        if not isinstance(board, str) or len(board) != 64 or not set(board) <= BOARD_CHARACTERS:
+            raise RequestError('board must be 64 characters, each B, W or .')
+        if request.get('player') not in othello_ctypes.player_indices:
+            raise RequestError('player must be B or W')
+        if request.get('strategy', 'all') not in othello_ctypes.strategy_indices:
+            raise RequestError('unknown strategy: {}'.format(request.get('strategy')))
+        if request.get('strategy') == 'pattern' and not othello_ctypes.pattern_weights_loaded:
+            raise RequestError('no pattern weights are loaded')
+        if ('depth' in request) == ('time_ms' in request):
+            raise RequestError('exactly one of depth and time_ms is required')
+        if 'depth' in request and not (isinstance(request['depth'], int) and 0 < request['depth'] < 64):
+            raise RequestError('depth must be an integer from 1 to 63')
+        if 'time_ms' in request and not (isinstance(request['time_ms'], int) and 0 <= request['time_ms'] < 2 ** 32):
+            raise RequestError('time_ms must be a non-negative integer')
+        if not isinstance(request.get('endgame_empties', 0), int) or not 0 <= request.get('endgame_empties', 0) <= 64:
+            raise RequestError('endgame_empties must be an integer from 0 to 64')
+        seed = request.get('seed')
+        if seed is not None and not (isinstance(seed, int) and 0 <= seed < 2 ** 64):
+            raise RequestError('seed must be a non-negative 64-bit integer')
+
+    def _table(self, connection, game):
+        if game not in connection.tables:
+            if len(connection.tables) >= self.max_games:
+                raise RequestError('too many games')
+            connection.tables[game] = othello_ctypes.TranspositionTable(self.tt_size_log2)
+        return connection.tables[game]
+
+    async def _move(self, connection, request_id, request, job):
+        """
+        :return: Response to the move request.
+        """
+        enqueue_time = time.time()
+        try:
+            async with self.slots:
+                queue_seconds = time.time() - enqueue_time
+                self.num_queued -= 1
+                self.num_started += 1
+                self.total_queue_seconds += queue_seconds
+                self.max_queue_seconds = max(self.max_queue_seconds, queue_seconds)
+                job.is_running = True
+                self.num_running += 1
+                try:
+                    # Keeps a reference to the table, so that it lives until the search ends even if the game is closed.
+                    table = self._table(connection, str(request.get('game', '')))
+                    loop = asyncio.get_running_loop()
+                    move, depth, seconds = await loop.run_in_executor(
+                        self.executor, functools.partial(self._search, request, table, job.control))
+                finally:
+                    self.num_running -= 1
+        except asyncio.CancelledError:
+            if not job.is_running:
+                self.num_queued -= 1
+            self.num_cancelled += 1
+            return {'id': request_id, 'error': 'cancelled'}
+        except othello_ctypes.SearchCancelled:
+            self.num_cancelled += 1
+            return {'id': request_id, 'error': 'cancelled'}
+        except Exception as e:
+            # A RequestError, or an unexpected error from the search, which must not leave the client waiting.
+            self.num_failed += 1
+            return {'id': request_id, 'error': str(e)}
+
+        if job.control.is_cancelled:
+            self.num_cancelled += 1
+            return {'id': request_id, 'error': 'cancelled'}
+        self.num_completed += 1
+        return {
+            'id': request_id,
+            'move': None if move is None else list(move),
+            'depth': depth,
+            'seconds': seconds,
+            'queued_seconds': queue_seconds,
+        }
+
+    async def _run_job(self, connection, request_id, request, job):
+        try:
+            response = await self._move(connection, request_id, request, job)
+        finally:
+            connection.jobs.pop(request_id, None)
+            job.control.close()
+        await connection.send(response)
+
+    def _start_move(self, connection, request_id, request):
+        self._validate_move_request(request)
+        if request_id in connection.jobs:
+            raise RequestError('request id already in use: {}'.format(request_id))
+        # Queued requests include those that have not yet taken a free worker.
+        if self.num_queued + self.num_running >= self.num_workers + self.max_queued:
+            self.num_rejected += 1
+            raise RequestError('queue full')
+        job = _Job()
+        self.num_queued += 1
+        connection.jobs[request_id] = job
+        job.task = asyncio.ensure_future(self._run_job(connection, request_id, request, job))
+
+    @staticmethod
+    def _cancel(connection, target):
+        """
+        :return: True if `target` was queued or running.
+        """
+        job = connection.jobs.get(target)
+        if job is None:
+            return False
+        if job.is_running:
+            # The search stops at its next clock check, and `_move` answers "cancelled".
+            job.control.cancel()
+        else:
+            job.task.cancel()
+        return True
+
+    async def handle_request(self, connection, line):
+        """
+        Answers `line`, except for move requests, which are answered by their own task.
+
+        :param line: One request, as UTF-8 encoded JSON.
+        """
+        request_id = None
+        try:
+            try:
+                request = json.loads(line.decode('utf-8'))
+            except UnicodeDecodeError:
+                raise RequestError('request must be UTF-8')
+            except ValueError:
+                raise RequestError('invalid JSON')
+            if not isinstance(request, dict):
+                raise RequestError('request must be a JSON object')
+            if not isinstance(request.get('id'), (type(None), str, int)):
+                raise RequestError('id must be a string or an integer')
+            request_id = request.get('id')
+            request_type = request.get('type')
+            if request_type == 'move':
+                self._start_move(connection, request_id, request)
+                return
+            elif request_type == 'cancel':
+                if not isinstance(request.get('target'), (type(None), str, int)):
+                    raise RequestError('target must be a string or an integer')
+                response = {'id': request_id, 'cancelled': self._cancel(connection, request.get('target'))}
+            elif request_type == 'metrics':
+                response = dict(self.metrics(), id=request_id)
+            elif request_type == 'close':
+                connection.tables.pop(str(request.get('game', '')), None)
+                response = {'id': request_id, 'closed': True}
+            else:
+                raise RequestError('unknown request type: {}'.format(request_type))
+        except RequestError as e:
+            response = {'id': request_id, 'error': str(e)}
+        await connection.send(response)
+
+    async def handle_connection(self, reader, writer, cancel_pending=True):
+        """
+        Serves one client until it closes its end.
+
+        :param cancel_pending: If True, the client's queued and running searches are then cancelled. Otherwise they are
+        answered first.
+        """
+        connection = _Connection(writer)
+        self.num_connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    await self.handle_request(connection, line)
+        finally:
+            self.num_connections -= 1
+            jobs = list(connection.jobs.values())
+            for job in jobs if cancel_pending else []:
+                if job.is_running:
+                    job.control.cancel()
+                else:
+                    job.task.cancel()
+            await asyncio.gather(*[job.task for job in jobs], return_exceptions=True)
+            connection.tables.clear()
+            writer.close()
+
+
+class _StdinReader(object):
+    """
+    Reads stdin in a thread, since pipe transports do not accept files or terminals.
+    """
+
+    async def readline(self):
+        return await asyncio.get_running_loop().run_in_executor(None, sys.stdin.buffer.readline)
+
+
+class _StdoutWriter(object):
+    def write(self, data):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+async def serve_stdio(server):
+    # Lets a client pipe its requests in and read every answer.
+    await server.handle_connection(_StdinReader(), _StdoutWriter(), cancel_pending=False)
+
+
+async def serve_socket(server, unix_path=None, host='127.0.0.1', port=None):
+    if unix_path is not None:
+        socket_server = await asyncio.start_unix_server(server.handle_connection, path=unix_path)
+    else:
+        socket_server = await asyncio.start_server(server.handle_connection, host=host, port=port)
+    async with socket_server:
+        await socket_server.serve_forever()
+
+
+async def _main(args):
+    server = EngineServer(num_workers=args.workers, max_queued=args.max_queued, omp_threads=args.omp_threads,
+                          tt_size_log2=args.tt_size_log2)
+    try:
+        if args.stdio:
+            await serve_stdio(server)
+        else:
+            await serve_socket(server, unix_path=args.unix, host=args.host, port=args.port)
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    transport = parser.add_mutually_exclusive_group(required=True)
+    transport.add_argument('--stdio', action='store_true', help='Serve one client on stdin and stdout.')
+    transport.add_argument('--unix', help='Path of a Unix domain socket to listen on.')
+    transport.add_argument('--port', type=int, help='TCP port to listen on.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on, with --port.')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of searches run at the same time. Defaults to the number of cores.')
+    parser.add_argument('--max-queued', type=int, default=64,
+                        help='Move requests waiting beyond this number are rejected.')
+    parser.add_argument('--omp-threads', type=int, default=1, help='Search threads per move.')
+    parser.add_argument('--tt-size-log2', type=int, default=16, help='Transposition table size of each game.')
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Opening book of precomputed moves, generated offline with the C++ engine.
+
+The book is a .npy file of shape (N, 3) and dtype uint64, stored in column-major order so that it can be memory-mapped
+and each column searched without copying. Row i is (black bits, white bits, player << 8 | move) of a position in
+canonical orientation, where player is 0 (black) or 1 (white) and move is the linear index (x + 8 * y) of the best
+move, also in canonical orientation. Rows are sorted.
+
+The canonical orientation of a position is the one of its 8 symmetries with the smallest (black bits, white bits).
+
+To generate a book,
+
+    python opening_book.py --output opening_book.npy --plies 8 --depth 10
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import othello
+import othello_ctypes
+
+NUM_SYMMETRIES = 8
+
+NO_MOVE = 255
+
+
+def flip_vertical(bits):
+    """
+    (x, y) -> (x, 7 - y)
+    """
+    return int.from_bytes(bits.to_bytes(8, 'little'), 'big')
+
+
+def mirror_horizontal(bits):
+    """
+    (x, y) -> (7 - x, y)
+    """
+    bits = ((bits >> 1) & 0x5555555555555555) | ((bits & 0x5555555555555555) << 1)
+    bits = ((bits >> 2) & 0x3333333333333333) | ((bits & 0x3333333333333333) << 2)
+    bits = ((bits >> 4) & 0x0F0F0F0F0F0F0F0F) | ((bits & 0x0F0F0F0F0F0F0F0F) << 4)
+    return bits
+
+
+def flip_diagonal(bits):
+    """
+    (x, y) -> (y, x)
+    """
+    t = 0x0F0F0F0F00000000 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bits ^ (bits << 7))
+    bits ^= t ^ (t >> 7)
+    return bits
+
+
+def transform(bits, symmetry):
+    """
+    Applies one of the 8 symmetries of the board. Bit 2 of `symmetry` flips the diagonal, then bit 1 flips vertically,
+    then bit 0 mirrors horizontally.
+    """
+    if symmetry & 4:
+        bits = flip_diagonal(bits)
+    if symmetry & 2:
+        bits = flip_vertical(bits)
+    if symmetry & 1:
+        bits = mirror_horizontal(bits)
+    return bits
+
+
+def inverse_transform(bits, symmetry):
+    if symmetry & 1:
+        bits = mirror_horizontal(bits)
+    if symmetry & 2:
+        bits = flip_vertical(bits)
+    if symmetry & 4:
+        bits = flip_diagonal(bits)
+    return bits
+
+
+def canonical(black_bits, white_bits):
+    """
+    :return: (black bits, white bits, symmetry). `symmetry` transforms the given position into the canonical one.
+    """
+    ret = None
+    for symmetry in range(NUM_SYMMETRIES):
+        candidate = (transform(black_bits, symmetry), transform(white_bits, symmetry), symmetry)
+        if ret is None or candidate[:2] < ret[:2]:
+            ret = candidate
+    return ret
+
+
+def bits_from_board_string(board):
+    """
+    :param board: Board string of `othello_ctypes.best_move`. 64 squares in row-major order, 'B', 'W' or '.'.
+    :return: (black bits, white bits)
+    """
+    assert len(board) == 64, board
+    black_bits = 0
+    white_bits = 0
+    for i, symbol in enumerate(board):
+        if symbol == 'B':
+            black_bits |= 1 << i
+        elif symbol == 'W':
+            white_bits |= 1 << i
+    return black_bits, white_bits
+
+
+class OpeningBook(object):
+    def __init__(self, filename):
+        """
+        Memory-maps a book written by `save_book`.
+        """
+        self.entries = np.load(filename, mmap_mode='r')
+        assert self.entries.dtype == np.uint64 and self.entries.ndim == 2 and self.entries.shape[1] == 3, \
+            (self.entries.dtype, self.entries.shape)
+        self.black_column = self.entries[:, 0]
+        self.white_column = self.entries[:, 1]
+        self.info_column = self.entries[:, 2]
+
+    def __len__(self):
+        return self.entries.shape[0]
+
+    def find_move_bits(self, black_bits, white_bits, player):
+        """
+        :return: The linear index of the book move, or None if the position is not in the book.
+        """
+        player_index = othello_ctypes.player_indices[player]
+        black_bits, white_bits, symmetry = canonical(black_bits, white_bits)
+
+        key = np.uint64(black_bits)
+        start = np.searchsorted(self.black_column, key, side='left')
+        end = np.searchsorted(self.black_column, key, side='right')
+        for i in range(start, end):
+            info = int(self.info_column[i])
+            if int(self.white_column[i]) == white_bits and info >> 8 == player_index:
+                move_bit = inverse_transform(1 << (info & 0xFF), symmetry)
+                return move_bit.bit_length() - 1
+        return None
+
+    def find_move(self, board, player):
+        """
+        :param board: Board string of `othello_ctypes.best_move`.
+        :param player: 'B' or 'W'
+        :return: The book move (x, y), or None if the position is not in the book.
+        """
+        move = self.find_move_bits(*bits_from_board_string(board), player)
+        if move is None:
+            return None
+        return move % 8, move // 8
+
+
+def save_book(filename, positions):
+    """
+    :param positions: dict of (black bits, white bits, player index) to move, in any orientation.
+    """
+    rows = set()
+    for (black_bits, white_bits, player_index), move in positions.items():
+        canonical_black, canonical_white, symmetry = canonical(black_bits, white_bits)
+        canonical_move = transform(1 << move, symmetry).bit_length() - 1
+        rows.add((canonical_black, canonical_white, player_index << 8 | canonical_move))
+
+    entries = np.array(sorted(rows), dtype=np.uint64).reshape(-1, 3)
+    np.save(filename, np.asfortranarray(entries))
+
+
+def _board_array(black_bits, white_bits):
+    ret = np.full(64, NO_MOVE, dtype=np.uint8)
+    for i in othello.iter_bits(black_bits):
+        ret[i] = 0
+    for i in othello.iter_bits(white_bits):
+        ret[i] = 1
+    return ret
+
+
+def _children(black_bits, white_bits, player_index, moves):
+    """
+    Yields the positions after each of `moves`, with the player to move. The player passes if they have no legal move.
+    Positions where the game is over are skipped.
+    """
+    for move in moves:
+        own, opp = (black_bits, white_bits) if player_index == 0 else (white_bits, black_bits)
+        move_bit = 1 << move
+        flipped = othello.flipped_bits(own, opp, move_bit)
+        own |= move_bit | flipped
+        opp ^= flipped
+        child = (own, opp) if player_index == 0 else (opp, own)
+
+        if othello.legal_move_bits(opp, own):
+            yield child + (1 - player_index,)
+        elif othello.legal_move_bits(own, opp):
+            yield child + (player_index,)
+
+
+def generate_book(plies, depth, strategy='all', tt_size_log2=22, num_threads=0):
+    """
+    Searches the positions reached in the first `plies` moves when one side plays book moves and the other side plays
+    any legal move, for both sides.
+
+    :return: dict of (black bits, white bits, player index) to move, in canonical orientation, as `save_book` expects.
+    """
+    board = othello.Game(othello.Board()).board
+    # Position, with the index of the player who follows the book.
+    frontier = {(board.black_bits, board.white_bits, 0, 0), (board.black_bits, board.white_bits, 0, 1)}
+    positions = {}
+
+    with othello_ctypes.TranspositionTable(tt_size_log2) as table:
+        for ply in range(plies):
+            start_time = time.time()
+
+            to_search = set()
+            for black_bits, white_bits, player_index, _ in frontier:
+                canonical_black, canonical_white, _ = canonical(black_bits, white_bits)
+                to_search.add((canonical_black, canonical_white, player_index))
+            to_search = sorted(to_search - positions.keys())
+            if to_search:
+                boards = np.stack([_board_array(black_bits, white_bits) for black_bits, white_bits, _ in to_search])
+                players = np.array([player_index for _, _, player_index in to_search], dtype=np.uint8)
+                moves, _ = othello_ctypes.best_moves_batch(boards, players, strategy, depth, table=table,
+                                                           num_threads=num_threads)
+                for key, move in zip(to_search, moves):
+                    assert move != NO_MOVE
+                    positions[key] = int(move)
+
+            next_frontier = set()
+            for black_bits, white_bits, player_index, book_player_index in frontier:
+                if player_index == book_player_index:
+                    canonical_black, canonical_white, symmetry = canonical(black_bits, white_bits)
+                    move = positions[(canonical_black, canonical_white, player_index)]
+                    moves = [inverse_transform(1 << move, symmetry).bit_length() - 1]
+                else:
+                    own, opp = (black_bits, white_bits) if player_index == 0 else (white_bits, black_bits)
+                    moves = othello.iter_bits(othello.legal_move_bits(own, opp))
+                for child in _children(black_bits, white_bits, player_index, moves):
+                    next_frontier.add(child + (book_player_index,))
+            frontier = next_frontier
+
+            print('Ply {}: searched {} positions in {:.1f} seconds. {} positions in the book.'.format(
+                ply, len(to_search), time.time() - start_time, len(positions)))
+
+    return positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', required=True, help='Output .npy filename.')
+    parser.add_argument('--plies', type=int, default=8, help='Number of moves from the starting position.')
+    parser.add_argument('--depth', type=int, default=10, help='Search depth of the book moves.')
+    parser.add_argument('--strategy', default='all', choices=sorted(othello_ctypes.strategy_indices))
+    parser.add_argument('--tt-size-log2', type=int, default=22)
+    parser.add_argument('--num-threads', type=int, default=0, help='0 uses the OpenMP default.')
+    args = parser.parse_args()
+
+    positions = generate_book(args.plies, args.depth, strategy=args.strategy, tt_size_log2=args.tt_size_log2,
+                              num_threads=args.num_threads)
+    save_book(args.output, positions)
+    print('Saved {} positions to {}'.format(len(OpeningBook(args.output)), args.output))
+
+
+if __name__ == '__main__':
+    main()
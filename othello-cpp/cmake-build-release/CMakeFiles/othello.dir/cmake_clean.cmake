@@ -0,0 +1,11 @@
+file(REMOVE_RECURSE
+  "CMakeFiles/othello.dir/othello_ctypes.cc.o"
+  "CMakeFiles/othello.dir/othello_ctypes.cc.o.d"
+  "libothello.pdb"
+  "libothello.so"
+)
+
+# Per-language clean rules from dependency scanning.
+foreach(lang CXX)
+  include(CMakeFiles/othello.dir/cmake_clean_${lang}.cmake OPTIONAL)
+endforeach()
@@ -10,6 +10,13 @@
 #include <algorithm>
 #include <map>
 #include <unordered_map>
+#include <memory>
+#include <atomic>
+#include <cstring>
+#include <chrono>
+#include <numeric>
+#include <fstream>
+#include <cmath>
 #include <omp.h>
 
 using std::array;
@@ -32,14 +39,17 @@ struct Position {
   uint8_t x, y;
 };
 
-enum class TTFlag {
+enum class TTFlag : uint8_t {
   UPPERBOUND, LOWERBOUND, EXACT
 };
 
 struct TTEntry {
+  uint64_t key;
   float value;
   TTFlag flag;
-  uint8_t depth;
+  uint8_t depth;  // 0 if the slot is empty.
+  uint8_t age;
+  uint8_t best_move;  // Linear index of the best move found, or EMPTY.
 };
 
 static std::mt19937 &RandomEngine() {
@@ -47,6 +57,337 @@ static std::mt19937 &RandomEngine() {
   return engine;
 }
 
+struct ZobristKeys {
+  uint64_t squares[64][2];  // Indexed by [square][BLACK or WHITE].
+  uint64_t white_to_move;
+  uint64_t heuristic_types[256];
+};
+
+static const ZobristKeys &Zobrist() {
+  static const ZobristKeys keys = [] {
+    ZobristKeys ret{};
+    // Fixed seed, so that hashes are the same across runs.
+    std::mt19937_64 engine{0x9E3779B97F4A7C15ULL};
+    for (auto &square : ret.squares) {
+      square[BLACK] = engine();
+      square[WHITE] = engine();
+    }
+    ret.white_to_move = engine();
+    for (auto &key : ret.heuristic_types) {
+      key = engine();
+    }
+    return ret;
+  }();
+  return keys;
+}
+
+// Fixed-size hash table of search results, keyed by `tt_key`. It holds 2^size_log2 buckets of `kBucketSize` entries.
+// A bucket is 64 bytes. Memory is allocated once, in the constructor.
+//
+// The table can be shared by any number of threads without locking. Each slot stores the packed entry along with
+// `key ^ packed entry`, so a slot that was torn by concurrent writes fails the key check and reads as a miss.
+class TranspositionTable {
+ public:
+  static constexpr int kBucketSize = 4;
+
+  explicit TranspositionTable(int size_log2)
+      : slots_(new Slot[size_t{kBucketSize} << size_log2]), mask_((uint64_t{1} << size_log2) - 1) {
+    clear();
+  }
+
+  bool probe(uint64_t key, TTEntry *entry) const {
+    const Slot *bucket = &slots_[(key & mask_) * kBucketSize];
+    for (int i = 0; i < kBucketSize; ++i) {
+      if (bucket[i].load(key, entry)) {
+        return true;
+      }
+    }
+    return false;
+  }
+
+  // Replaces the entry with the same key if there is one, otherwise an empty slot. If the bucket is full, the entry
+  // with the lowest depth is replaced, where entries from older searches count as shallower.
+  void store(uint64_t key, float value, TTFlag flag, int depth, uint8_t best_move = EMPTY) {
+    Slot *bucket = &slots_[(key & mask_) * kBucketSize];
+    const uint8_t age = age_.load(std::memory_order_relaxed);
+
+    Slot *victim = nullptr;
+    TTEntry victim_entry{};
+    int victim_priority = std::numeric_limits<int>::max();
+    for (int i = 0; i < kBucketSize; ++i) {
+      TTEntry slot_entry = bucket[i].unpack();
+      if (slot_entry.depth == 0 or slot_entry.key == key) {
+        victim = &bucket[i];
+        victim_entry = slot_entry;
+        break;
+      }
+      int priority = slot_entry.depth - kAgePenalty * static_cast<uint8_t>(age - slot_entry.age);
+      if (priority < victim_priority) {
+        victim_priority = priority;
+        victim = &bucket[i];
+        victim_entry = slot_entry;
+      }
+    }
+
+    // Keep a deeper result for the same position from the current search.
+    if (victim_entry.key == key and victim_entry.age == age and victim_entry.depth > depth) {
+      return;
+    }
+    // Fail-low searches don't find a best move. Keep the one from an earlier search.
+    if (victim_entry.key == key and victim_entry.depth > 0 and best_move == EMPTY) {
+      best_move = victim_entry.best_move;
+    }
+
+    TTEntry entry{};
+    entry.key = key;
+    entry.value = value;
+    entry.flag = flag;
+    entry.depth = static_cast<uint8_t>(depth);  // Assume 0 < depth < 256.
+    entry.age = age;
+    entry.best_move = best_move;
+    victim->save(entry);
+  }
+
+  // Call once per search. Entries from earlier searches stay valid, but are replaced first.
+  void new_search() {
+    age_.fetch_add(1, std::memory_order_relaxed);
+  }
+
+  // Not thread-safe. Must not be called during a search.
+  void clear() {
+    for (size_t i = 0; i < (mask_ + 1) * kBucketSize; ++i) {
+      slots_[i].check.store(0, std::memory_order_relaxed);
+      slots_[i].data.store(0, std::memory_order_relaxed);
+    }
+    age_.store(0, std::memory_order_relaxed);
+  }
+
+ private:
+  static constexpr int kAgePenalty = 8;
+
+  struct Slot {
+    std::atomic<uint64_t> check;  // key ^ data
+    std::atomic<uint64_t> data;
+
+    // Bits 0-31: value, 32-39: depth, 40-47: flag, 48-55: age, 56-63: best move.
+    static uint64_t pack(const TTEntry &entry) {
+      uint32_t value_bits;
+      std::memcpy(&value_bits, &entry.value, sizeof(value_bits));
+      return uint64_t{value_bits} | (uint64_t{entry.depth} << 32)
+          | (uint64_t{static_cast<uint8_t>(entry.flag)} << 40) | (uint64_t{entry.age} << 48)
+          | (uint64_t{entry.best_move} << 56);
+    }
+
+    static TTEntry unpack(uint64_t key, uint64_t packed) {
+      TTEntry entry{};
+      auto value_bits = static_cast<uint32_t>(packed);
+      std::memcpy(&entry.value, &value_bits, sizeof(value_bits));
+      entry.key = key;
+      entry.depth = static_cast<uint8_t>(packed >> 32);
+      entry.flag = static_cast<TTFlag>(static_cast<uint8_t>(packed >> 40));
+      entry.age = static_cast<uint8_t>(packed >> 48);
+      entry.best_move = static_cast<uint8_t>(packed >> 56);
+      return entry;
+    }
+
+    // Returns an empty entry if the slot is empty or torn.
+    TTEntry unpack() const {
+      uint64_t packed = data.load(std::memory_order_relaxed);
+      uint64_t key = check.load(std::memory_order_relaxed) ^ packed;
+      return unpack(key, packed);
+    }
+
+    bool load(uint64_t key, TTEntry *entry) const {
+      uint64_t packed = data.load(std::memory_order_relaxed);
+      if ((check.load(std::memory_order_relaxed) ^ packed) != key or static_cast<uint8_t>(packed >> 32) == 0) {
+        return false;
+      }
+      *entry = unpack(key, packed);
+      return true;
+    }
+
+    void save(const TTEntry &entry) {
+      uint64_t packed = pack(entry);
+      check.store(entry.key ^ packed, std::memory_order_relaxed);
+      data.store(packed, std::memory_order_relaxed);
+    }
+  };
+
+  std::unique_ptr<Slot[]> slots_;
+  uint64_t mask_;
+  std::atomic<uint8_t> age_{0};
+};
+
+// Bits of `SearchContext::options`. The table's best move is always searched first. The other moves are ordered by
+// square weight, unless enabled below.
+// Killer moves: the last two moves that caused a beta cutoff at the same remaining depth are searched next.
+constexpr uint32_t kOrderKillers = 1u << 0;
+// History heuristic: nodes at least `kHistoryOrderingMinDepth` from the horizon sort moves by how often, weighted by
+// depth squared, they caused a beta cutoff.
+constexpr uint32_t kOrderHistory = 1u << 1;
+// Nodes at least `kMobilityOrderingMinDepth` from the horizon sort moves by the opponent's resulting mobility first.
+constexpr uint32_t kOrderMobility = 1u << 2;
+// Enhanced transposition cutoff: nodes at least `kEnhancedTranspositionCutoffMinDepth` from the horizon probe the
+// table for every child before searching, and cut off if a child is already known to refute the node.
+constexpr uint32_t kEnhancedTranspositionCutoff = 1u << 3;
+// Principal variation search (NegaScout): once the eldest child has set alpha, younger children are searched with a
+// null window just above alpha, and only searched again with the full window if they fail high.
+constexpr uint32_t kPrincipalVariationSearch = 1u << 4;
+// Aspiration windows: each iteration of `search_next_move_iterative` searches the eldest root move with a window of
+// `kAspirationWindow` around the previous iteration's value, widened on failure.
+constexpr uint32_t kAspirationWindows = 1u << 5;
+// Multi-ProbCut: null window nodes `kProbCutMinDepth` to `kProbCutMaxDepth` from the horizon first run shallow null
+// window searches, and are cut off when these predict a fail high or low with high probability. This is a selective
+// search: the value may differ from the full search. Only used with heuristic `kProbCutHeuristicType`, which the
+// parameters were fitted for.
+constexpr uint32_t kMultiProbCut = 1u << 6;
+constexpr uint32_t kDefaultSearchOptions = kOrderKillers | kPrincipalVariationSearch;
+
+constexpr int kHistoryOrderingMinDepth = 3;
+constexpr int kMobilityOrderingMinDepth = 4;
+constexpr int kEnhancedTranspositionCutoffMinDepth = 3;
+constexpr int kMaxSearchDepth = 64;
+constexpr float kAspirationWindow = 8;
+
+// The value of a node searched to depth d is predicted from its value v searched to `shallow_depth` as
+// slope * v + intercept, with normally distributed error of deviation `sigma`. Fitted by calibrate_probcut.py.
+struct ProbCutParameters {
+  int shallow_depth;
+  float slope;
+  float intercept;
+  float sigma;  // 0 if not fitted, which disables the check.
+};
+
+constexpr int kProbCutHeuristicType = 8;
+constexpr int kProbCutMinDepth = 5;
+constexpr int kProbCutMaxDepth = 10;
+// Game stages, by number of empty squares: 60-46, 45-31, 30-16 and 15-0.
+constexpr int kProbCutNumStages = 4;
+// Checks per node, cheapest first.
+constexpr int kProbCutNumChecks = 2;
+// Nodes are cut off when the predicted value is this many deviations beyond the window.
+constexpr float kProbCutThreshold = 1.5f;
+
+#include "probcut_parameters.h"
+
+// Work done by one thread during a search. See `SearchContext::counters`.
+struct alignas(64) SearchCounters {
+  uint64_t nodes = 0;  // Including leaves and endgame solver nodes.
+  uint64_t leaves = 0;  // Heuristic evaluations.
+  uint64_t tt_probes = 0;
+  uint64_t tt_hits = 0;
+  uint64_t tt_cutoffs = 0;  // Hits whose value or bounds ended the search of the node.
+  uint64_t tt_stores = 0;
+  uint64_t beta_cutoffs = 0;
+  uint64_t first_move_cutoffs = 0;  // Beta cutoffs caused by the first move searched.
+  uint64_t cutoff_move_index_sum = 0;  // Sum, over beta cutoffs, of the index of the move that caused it.
+  uint64_t researches = 0;  // Null window searches that failed high, and aspiration windows that failed.
+  uint64_t probcut_cutoffs = 0;  // Nodes cut off by Multi-ProbCut.
+};
+
+constexpr int kMaxCounterThreads = 64;
+
+// State shared by all threads searching the same position.
+struct SearchContext {
+  int heuristic_type = 0;
+  TranspositionTable *table = nullptr;
+  int num_threads = 0;  // Threads used by the parallel searches. 0 means the OpenMP default.
+  uint32_t options = kDefaultSearchOptions;
+  // Null, or `kMaxCounterThreads` counters indexed by OpenMP thread number. Each thread only writes its own.
+  SearchCounters *counters = nullptr;
+  // If set, the move picked only depends on the position, the depth and `seed`, whatever the number of threads and the
+  // contents of the table. Table entries are then only used at the depth they were searched to, so that every exact
+  // value is the plain minimax value, and ties are broken by a generator seeded with `seed` and the position.
+  bool deterministic = false;
+  uint64_t seed = 0;
+
+  // Move ordering state, shared by all threads without locking. Races only make the ordering slightly worse. Killers
+  // are indexed by remaining depth instead of by ply, which is the same within one iteration.
+  std::atomic<uint8_t> killers[kMaxSearchDepth][2];
+  std::atomic<uint32_t> history[2][64];  // Indexed by [player][square].
+
+  // Set when the deadline passes, or when `cancel` is set. Values returned by a stopped search are meaningless and must
+  // be discarded.
+  std::atomic<bool> stopped{false};
+  bool has_deadline = false;
+  std::chrono::steady_clock::time_point deadline;
+  // If not null, set by another thread to stop the search. Read as often as the clock.
+  const std::atomic<bool> *cancel = nullptr;
+
+  // Called at every node. Only reads the clock and `cancel` every `kNodesPerClockCheck` calls per thread.
+  bool check_stop() {
+    static constexpr uint32_t kNodesPerClockCheck = 1024;
+    thread_local static uint32_t num_calls = 0;
+    if (stopped.load(std::memory_order_relaxed)) {
+      return true;
+    }
+    if ((has_deadline or cancel != nullptr) and ++num_calls % kNodesPerClockCheck == 0 and
+        ((cancel != nullptr and cancel->load(std::memory_order_relaxed)) or
+         (has_deadline and std::chrono::steady_clock::now() >= deadline))) {
+      stopped.store(true, std::memory_order_relaxed);
+      return true;
+    }
+    return false;
+  }
+
+  SearchContext() {
+    for (auto &depth_killers : killers) {
+      for (auto &killer : depth_killers) {
+        killer.store(EMPTY, std::memory_order_relaxed);
+      }
+    }
+    for (auto &player_history : history) {
+      for (auto &value : player_history) {
+        value.store(0, std::memory_order_relaxed);
+      }
+    }
+  }
+
+  // Heuristic type used in the table keys. Values of the selective search must not stand in for values of the full
+  // search when both share a table, so it is keyed as a different heuristic.
+  int table_heuristic_type() const {
+    return ((options & kMultiProbCut) and heuristic_type == kProbCutHeuristicType) ? heuristic_type ^ 0x80
+                                                                                      : heuristic_type;
+  }
+
+  // Whether a table entry searched to `entry_depth` can stand in for a search to `depth`.
+  bool is_usable_depth(int entry_depth, int depth) const {
+    return deterministic ? entry_depth == depth : entry_depth >= depth;
+  }
+
+  // This thread's counters, or null if not counting.
+  SearchCounters *thread_counters() const {
+    return (counters != nullptr) ? &counters[omp_get_thread_num() % kMaxCounterThreads] : nullptr;
+  }
+
+  void count(uint64_t SearchCounters::*counter, uint64_t n = 1) const {
+    if (counters != nullptr) {
+      thread_counters()->*counter += n;
+    }
+  }
+
+  // Called when `square` causes a beta cutoff `depth` from the horizon. `move_index` is its position in the move
+  // order.
+  void record_cutoff(uint8_t player, int depth, uint8_t square, int move_index) {
+    if (counters != nullptr) {
+      SearchCounters *c = thread_counters();
+      ++c->beta_cutoffs;
+      c->first_move_cutoffs += (move_index == 0);
+      c->cutoff_move_index_sum += move_index;
+    }
+    if (options & kOrderKillers) {
+      auto &depth_killers = killers[depth];
+      if (depth_killers[0].load(std::memory_order_relaxed) != square) {
+        depth_killers[1].store(depth_killers[0].load(std::memory_order_relaxed), std::memory_order_relaxed);
+        depth_killers[0].store(square, std::memory_order_relaxed);
+      }
+    }
+    if (options & kOrderHistory) {
+      history[player][square].fetch_add(static_cast<uint32_t>(depth * depth), std::memory_order_relaxed);
+    }
+  }
+};
+
 void print_board(const array<uint8_t, 64> &board) {
   for (int i = 0; i < 64; ++i) {
     if (board[i] == EMPTY) {
@@ -82,6 +423,360 @@ inline uint8_t get_opponent(uint8_t player) {
   return static_cast<uint8_t>((player == BLACK) ? WHITE : BLACK);
 }
 
+// Hash of the disk placement only. See `tt_key`.
+uint64_t zobrist_hash(const array<uint8_t, 64> &board) {
+  const auto &keys = Zobrist();
+  uint64_t hash = 0;
+  for (int i = 0; i < 64; ++i) {
+    if (board[i] != EMPTY) {
+      hash ^= keys.squares[i][board[i]];
+    }
+  }
+  return hash;
+}
+
+// Transposition table key of a board hash with `player` to move. Values depend on the heuristic, so it is part of the
+// key. This lets searches with different heuristics share a table.
+inline uint64_t tt_key(uint64_t hash, uint8_t player, int heuristic_type) {
+  const auto &keys = Zobrist();
+  hash ^= keys.heuristic_types[heuristic_type & 0xFF];
+  return (player == WHITE) ? hash ^ keys.white_to_move : hash;
+}
+
+// Bitboards. Bit `x + 8 * y` is square (x, y).
+
+inline int popcount64(uint64_t bits) {
+  return __builtin_popcountll(bits);
+}
+
+// `squares` is 64 squares in row-major order, each BLACK, WHITE or EMPTY.
+inline void bitboards_from_squares(const uint8_t *squares, uint8_t player, uint64_t *own, uint64_t *opp) {
+  *own = 0;
+  *opp = 0;
+  for (int i = 0; i < 64; ++i) {
+    if (squares[i] == player) {
+      *own |= uint64_t{1} << i;
+    } else if (squares[i] != EMPTY) {
+      *opp |= uint64_t{1} << i;
+    }
+  }
+}
+
+inline void bitboards_from_board(const array<uint8_t, 64> &board, uint8_t player, uint64_t *own, uint64_t *opp) {
+  bitboards_from_squares(board.data(), player, own, opp);
+}
+
+// Every square except the leftmost and rightmost columns. Disks on them can't be flipped horizontally or diagonally.
+constexpr uint64_t kInnerColumns = 0x7E7E7E7E7E7E7E7EULL;
+
+inline uint64_t legal_moves_bits(uint64_t own, uint64_t opp) {
+  const uint64_t empty = ~(own | opp);
+  const int shifts[] = {1, 8, 7, 9};
+  const uint64_t masked_opps[] = {opp & kInnerColumns, opp, opp & kInnerColumns, opp & kInnerColumns};
+
+  uint64_t moves = 0;
+  for (int d = 0; d < 4; ++d) {
+    const int shift = shifts[d];
+    const uint64_t mask = masked_opps[d];
+    uint64_t left = mask & (own << shift);
+    uint64_t right = mask & (own >> shift);
+    for (int i = 0; i < 5; ++i) {
+      left |= mask & (left << shift);
+      right |= mask & (right >> shift);
+    }
+    moves |= empty & ((left << shift) | (right >> shift));
+  }
+  return moves;
+}
+
+// Opponent's disks flipped by `own` playing at `square`. Zero if the move is not legal.
+inline uint64_t flipped_bits(uint64_t own, uint64_t opp, int square) {
+  const int shifts[] = {1, 8, 7, 9};
+  const uint64_t masked_opps[] = {opp & kInnerColumns, opp, opp & kInnerColumns, opp & kInnerColumns};
+  const uint64_t move = uint64_t{1} << square;
+
+  uint64_t flipped = 0;
+  for (int d = 0; d < 4; ++d) {
+    const int shift = shifts[d];
+    const uint64_t mask = masked_opps[d];
+
+    uint64_t line = 0;
+    uint64_t cursor = move << shift;
+    while (cursor & mask) {
+      line |= cursor;
+      cursor <<= shift;
+    }
+    if (cursor & own) {
+      flipped |= line;
+    }
+
+    line = 0;
+    cursor = move >> shift;
+    while (cursor & mask) {
+      line |= cursor;
+      cursor >>= shift;
+    }
+    if (cursor & own) {
+      flipped |= line;
+    }
+  }
+  return flipped;
+}
+
+// Plays `square` for `player` on 64 squares in the layout of `bitboards_from_squares`, in place. Only the placed and
+// flipped squares are written. Returns the number of flipped disks, or 0 if the move is not legal, in which case
+// `squares` is unchanged.
+inline int play_move_in_place(uint8_t *squares, uint8_t player, int square) {
+  if (square < 0 || square >= 64 || squares[square] != EMPTY) {
+    return 0;
+  }
+  uint64_t own, opp;
+  bitboards_from_squares(squares, player, &own, &opp);
+  uint64_t flipped = flipped_bits(own, opp, square);
+  const int num_flipped = popcount64(flipped);
+  if (num_flipped > 0) {
+    squares[square] = player;
+    for (; flipped; flipped &= flipped - 1) {
+      squares[__builtin_ctzll(flipped)] = player;
+    }
+  }
+  return num_flipped;
+}
+
+// Tables for `stable_bits`. Edges are indexed by their ternary index: the sum of 3^i * (0 if square i is empty, 1 for
+// black, 2 for white).
+struct StabilityTables {
+  uint8_t edge[6561];  // Stable squares of an edge, of either color.
+  uint16_t ternary[256];  // `ternary[bits]` is the sum of 3^i over the set bits i.
+  uint64_t file_a[256];  // Squares of the leftmost column, from the bits returned by `gather_file_a`.
+  vector<uint64_t> lines[4];  // Lines along each axis: rows, columns, diagonals (x - y) and anti-diagonals (x + y).
+};
+
+// Squares of the leftmost column, packed into one byte.
+inline uint8_t gather_file_a(uint64_t bits) {
+  return static_cast<uint8_t>(((bits & 0x0101010101010101ULL) * 0x0102040810204080ULL) >> 56);
+}
+
+// Stable squares of an edge, in any sequence of moves along the edge. A square is stable if it is occupied, and stays
+// unchanged and stable after any disk of either color is placed on any empty square of the edge.
+static uint8_t edge_stability(int index, uint8_t *table, bool *is_computed) {
+  if (is_computed[index]) {
+    return table[index];
+  }
+  int cells[8];
+  uint8_t stable = 0;
+  for (int i = 0, rest = index; i < 8; ++i, rest /= 3) {
+    cells[i] = rest % 3;
+    if (cells[i] != 0) {
+      stable |= 1 << i;
+    }
+  }
+
+  for (int i = 0; i < 8 and stable; ++i) {
+    if (cells[i] != 0) {
+      continue;
+    }
+    for (int color = 1; color <= 2; ++color) {
+      int next_cells[8];
+      std::copy(cells, cells + 8, next_cells);
+      next_cells[i] = color;
+      uint8_t changed = static_cast<uint8_t>(1 << i);
+      for (int step : {-1, 1}) {
+        int j = i + step;
+        while (j >= 0 and j < 8 and next_cells[j] == 3 - color) {
+          j += step;
+        }
+        if (j >= 0 and j < 8 and next_cells[j] == color) {
+          for (int k = i + step; k != j; k += step) {
+            next_cells[k] = color;
+            changed |= 1 << k;
+          }
+        }
+      }
+      int next_index = 0;
+      for (int k = 7; k >= 0; --k) {
+        next_index = next_index * 3 + next_cells[k];
+      }
+      stable &= edge_stability(next_index, table, is_computed) & ~changed;
+    }
+  }
+
+  is_computed[index] = true;
+  table[index] = stable;
+  return stable;
+}
+
+static const StabilityTables &Stability() {
+  static const StabilityTables tables = [] {
+    StabilityTables ret{};
+    bool is_computed[6561] = {};
+    for (int index = 0; index < 6561; ++index) {
+      edge_stability(index, ret.edge, is_computed);
+    }
+    for (int bits = 0; bits < 256; ++bits) {
+      for (int i = 0, power = 1; i < 8; ++i, power *= 3) {
+        if (bits >> i & 1) {
+          ret.ternary[bits] += power;
+        }
+      }
+    }
+    for (int y = 0; y < 8; ++y) {
+      const uint64_t square = uint64_t{1} << (y * 8);
+      for (int bits = 0; bits < 256; ++bits) {
+        if (bits & gather_file_a(square)) {
+          ret.file_a[bits] |= square;
+        }
+      }
+    }
+    for (int i = 0; i < 8; ++i) {
+      ret.lines[0].push_back(uint64_t{0xFF} << (8 * i));
+      ret.lines[1].push_back(0x0101010101010101ULL << i);
+    }
+    for (int c = -6; c <= 6; ++c) {
+      uint64_t diagonal = 0, anti_diagonal = 0;
+      for (int y = 0; y < 8; ++y) {
+        if (y + c >= 0 and y + c < 8) {
+          diagonal |= uint64_t{1} << (y * 8 + y + c);
+        }
+        if (7 + c - y >= 0 and 7 + c - y < 8) {
+          anti_diagonal |= uint64_t{1} << (y * 8 + 7 + c - y);
+        }
+      }
+      ret.lines[2].push_back(diagonal);
+      ret.lines[3].push_back(anti_diagonal);
+    }
+    return ret;
+  }();
+  return tables;
+}
+
+// Disks of both colors that can never be flipped. Disks on the edges come from the edge tables. Other disks are stable
+// if, along each of the four axes, the line is full or a neighbor is a stable disk of the same color. Squares are
+// added until nothing changes, so the result is a lower bound of the stable disks.
+inline uint64_t stable_bits(uint64_t black, uint64_t white) {
+  constexpr uint64_t kInterior = 0x007E7E7E7E7E7E00ULL;
+  const auto &tables = Stability();
+  const auto edge_index = [&](uint8_t black_edge, uint8_t white_edge) {
+    return tables.ternary[black_edge] + 2 * tables.ternary[white_edge];
+  };
+
+  uint64_t stable = tables.edge[edge_index(black & 0xFF, white & 0xFF)];
+  stable |= uint64_t{tables.edge[edge_index(black >> 56, white >> 56)]} << 56;
+  stable |= tables.file_a[tables.edge[edge_index(gather_file_a(black), gather_file_a(white))]];
+  stable |= tables.file_a[tables.edge[edge_index(gather_file_a(black >> 7), gather_file_a(white >> 7))]] << 7;
+
+  const uint64_t filled = black | white;
+  uint64_t full[4] = {0, 0, 0, 0};
+  for (int axis = 0; axis < 4; ++axis) {
+    for (auto line : tables.lines[axis]) {
+      if ((filled & line) == line) {
+        full[axis] |= line;
+      }
+    }
+  }
+  stable |= filled & kInterior & full[0] & full[1] & full[2] & full[3];
+
+  while (true) {
+    uint64_t next = stable;
+    for (uint64_t disks : {black, white}) {
+      const uint64_t s = stable & disks;
+      const uint64_t horizontal = (s >> 1) | (s << 1) | full[0];
+      const uint64_t vertical = (s >> 8) | (s << 8) | full[1];
+      const uint64_t diagonal = (s >> 9) | (s << 9) | full[2];
+      const uint64_t anti_diagonal = (s >> 7) | (s << 7) | full[3];
+      next |= disks & kInterior & horizontal & vertical & diagonal & anti_diagonal;
+    }
+    if (next == stable) {
+      return stable;
+    }
+    stable = next;
+  }
+}
+
+// Same weights as:
+// https://github.com/dhconnelly/paip-python/blob/master/paip/othello.py
+constexpr int kDhconnellyWeights[64] = {
+    120, -20, 20, 5, 5, 20, -20, 120,
+    -20, -40, -5, -5, -5, -5, -40, -20,
+    20, -5, 15, 3, 3, 15, -5, 20,
+    5, -5, 3, 3, 3, 3, -5, 5,
+    5, -5, 3, 3, 3, 3, -5, 5,
+    20, -5, 15, 3, 3, 15, -5, 20,
+    -20, -40, -5, -5, -5, -5, -40, -20,
+    120, -20, 20, 5, 5, 20, -20, 120,
+};
+
+// https://courses.cs.washington.edu/courses/cse573/04au/Project/mini1/RUSSIA/Final_Paper.pdf
+constexpr int kRussiaWeights[64] = {
+    4, -3, 2, 2, 2, 2, -3, 4,
+    -3, -4, -1, -1, -1, -1, -4, -3,
+    2, -1, 1, 0, 0, 1, -1, 2,
+    2, -1, 0, 1, 1, 0, -1, 2,
+    2, -1, 0, 1, 1, 0, -1, 2,
+    2, -1, 1, 0, 0, 1, -1, 2,
+    -3, -4, -1, -1, -1, -1, -4, -3,
+    4, -3, 2, 2, 2, 2, -3, 4
+};
+
+// Position searched by `minimax_ab_transposition` and `minimax_pv_split`. `apply_move` keeps the hash and the weighted
+// sums up to date from the flipped disks, so that the heuristics don't rescan the board. Only mobility and permanent
+// disks are computed at the leaves, from the bitboards.
+struct SearchState {
+  uint64_t disks[2] = {0, 0};  // Bitboards, indexed by BLACK or WHITE.
+  uint64_t hash = 0;  // `zobrist_hash` of the board.
+  int dhconnelly_sums[2] = {0, 0};  // Sums of `kDhconnellyWeights` over each player's disks.
+  int russia_sums[2] = {0, 0};  // Sums of `kRussiaWeights` over each player's disks.
+};
+
+SearchState make_search_state(const array<uint8_t, 64> &board) {
+  SearchState state;
+  for (int i = 0; i < 64; ++i) {
+    if (board[i] != EMPTY) {
+      state.disks[board[i]] |= uint64_t{1} << i;
+      state.dhconnelly_sums[board[i]] += kDhconnellyWeights[i];
+      state.russia_sums[board[i]] += kRussiaWeights[i];
+    }
+  }
+  state.hash = zobrist_hash(board);
+  return state;
+}
+
+// Assumes `square` is a valid move.
+void apply_move(SearchState *state, uint8_t player, int square) {
+  const auto &keys = Zobrist();
+  const uint8_t opponent = player ^ 1;
+  uint64_t flipped = flipped_bits(state->disks[player], state->disks[opponent], square);
+  state->disks[player] |= flipped | (uint64_t{1} << square);
+  state->disks[opponent] ^= flipped;
+  state->hash ^= keys.squares[square][player];
+  state->dhconnelly_sums[player] += kDhconnellyWeights[square];
+  state->russia_sums[player] += kRussiaWeights[square];
+
+  while (flipped) {
+    const int i = __builtin_ctzll(flipped);
+    flipped &= flipped - 1;
+    state->hash ^= keys.squares[i][BLACK] ^ keys.squares[i][WHITE];
+    state->dhconnelly_sums[player] += kDhconnellyWeights[i];
+    state->dhconnelly_sums[opponent] -= kDhconnellyWeights[i];
+    state->russia_sums[player] += kRussiaWeights[i];
+    state->russia_sums[opponent] -= kRussiaWeights[i];
+  }
+}
+
+inline uint64_t legal_moves_bits(const SearchState &state, uint8_t player) {
+  return legal_moves_bits(state.disks[player], state.disks[player ^ 1]);
+}
+
+// Same order as `find_valid_moves` of the board.
+int find_valid_moves(const SearchState &state, uint8_t player, vector<Position> *moves) {
+  uint64_t legal = legal_moves_bits(state, player);
+  for (uint64_t bits = legal; bits; bits &= bits - 1) {
+    const int i = __builtin_ctzll(bits);
+    moves->push_back(Position{static_cast<uint8_t>(i % 8), static_cast<uint8_t>(i / 8)});
+  }
+  return popcount64(legal);
+}
+
 inline void direction_delta(Direction direction, int *dx, int *dy) {
   if (direction == Direction::UP) {
     *dx = 0;
@@ -195,27 +890,88 @@ int find_valid_moves(const array<uint8_t, 64> &board, uint8_t player, vector<Pos
   return num_found;
 }
 
-void order_moves(vector<Position> *moves) {
-  // Same weights as:
-  // https://github.com/dhconnelly/paip-python/blob/master/paip/othello.py
-  static int weights[] = {
-      120, -20, 20, 5, 5, 20, -20, 120,
-      -20, -40, -5, -5, -5, -5, -40, -20,
-      20, -5, 15, 3, 3, 15, -5, 20,
-      5, -5, 3, 3, 3, 3, -5, 5,
-      5, -5, 3, 3, 3, 3, -5, 5,
-      20, -5, 15, 3, 3, 15, -5, 20,
-      -20, -40, -5, -5, -5, -5, -40, -20,
-      120, -20, 20, 5, 5, 20, -20, 120,
-  };
+// Moves `first` to the front, if it is in `moves`.
+void move_to_front(vector<Position> *moves, uint8_t first) {
+  auto it = std::find_if(moves->begin(), moves->end(), [&](const Position &pos) {
+    return pos.x + pos.y * 8 == first;
+  });
+  if (it != moves->end()) {
+    std::rotate(moves->begin(), it, it + 1);
+  }
+}
 
+void order_moves(vector<Position> *moves) {
   std::sort(moves->begin(), moves->end(), [](const Position &a, const Position &b) {
-    return weights[a.x + a.y * 8] > weights[b.x + b.y * 8];
+    return kDhconnellyWeights[a.x + a.y * 8] > kDhconnellyWeights[b.x + b.y * 8];
   });
 
 //  std::shuffle(moves->begin(), moves->end(), RandomEngine());
 }
 
+// Orders the moves of an interior node `depth` from the horizon, as selected by `ctx->options`. `tt_move` is the
+// table's best move, or EMPTY.
+void order_moves(const SearchState &state, uint8_t player, int depth, uint8_t tt_move, SearchContext *ctx,
+                 vector<Position> *moves) {
+  order_moves(moves);
+
+  const uint32_t options = ctx->options;
+  const bool use_history = (options & kOrderHistory) and depth >= kHistoryOrderingMinDepth;
+  const bool use_mobility = (options & kOrderMobility) and depth >= kMobilityOrderingMinDepth;
+  if (use_history or use_mobility) {
+    vector<std::pair<int64_t, Position>> keyed_moves;
+    keyed_moves.reserve(moves->size());
+    for (const auto &move_pos : *moves) {
+      const int square = move_pos.x + move_pos.y * 8;
+      int64_t key = 0;
+      if (use_mobility) {
+        SearchState next_state = state;
+        apply_move(&next_state, player, square);
+        key -= int64_t{popcount64(legal_moves_bits(next_state, player ^ 1))} << 32;
+      }
+      if (use_history) {
+        key += ctx->history[player][square].load(std::memory_order_relaxed);
+      }
+      keyed_moves.emplace_back(key, move_pos);
+    }
+    std::stable_sort(keyed_moves.begin(), keyed_moves.end(), [](const std::pair<int64_t, Position> &a,
+                                                                const std::pair<int64_t, Position> &b) {
+      return a.first > b.first;
+    });
+    for (size_t i = 0; i < moves->size(); ++i) {
+      (*moves)[i] = keyed_moves[i].second;
+    }
+  }
+
+  if (options & kOrderKillers) {
+    move_to_front(moves, ctx->killers[depth][1].load(std::memory_order_relaxed));
+    move_to_front(moves, ctx->killers[depth][0].load(std::memory_order_relaxed));
+  }
+  move_to_front(moves, tt_move);
+}
+
+// Enhanced transposition cutoff. Returns true, with the node's value in `value`, if the table shows that one of
+// `moves` leads to a position worth at least `beta` for `player`, searched at least `depth - 1` deep.
+bool enhanced_transposition_cutoff(const SearchState &state, uint8_t player, int depth, float beta,
+                                   const vector<Position> &moves, SearchContext *ctx, float *value) {
+  const uint8_t opponent = get_opponent(player);
+  for (const auto &move_pos : moves) {
+    SearchState next_state = state;
+    apply_move(&next_state, player, move_pos.x + move_pos.y * 8);
+    TTEntry entry;
+    ctx->count(&SearchCounters::tt_probes);
+    if (!ctx->table->probe(tt_key(next_state.hash, opponent, ctx->table_heuristic_type()), &entry)) {
+      continue;
+    }
+    ctx->count(&SearchCounters::tt_hits);
+    if (ctx->is_usable_depth(entry.depth, depth - 1) and entry.flag != TTFlag::LOWERBOUND and -entry.value >= beta) {
+      ctx->count(&SearchCounters::tt_cutoffs);
+      *value = -entry.value;
+      return true;
+    }
+  }
+  return false;
+}
+
 bool any_valid_move(const array<uint8_t, 64> &board, uint8_t player) {
   int num_found = 0;
   for (int y = 0; y < 8; ++y) {
@@ -236,8 +992,9 @@ bool any_valid_move(const array<uint8_t, 64> &board, uint8_t player) {
   return false;
 }
 
-// Assumes `move_pos` is valid.
-void apply_move(array<uint8_t, 64> *board, uint8_t player, Position move_pos) {
+// Assumes `move_pos` is valid. If `hash` is given, it is updated to the `zobrist_hash` of the new board.
+void apply_move(array<uint8_t, 64> *board, uint8_t player, Position move_pos, uint64_t *hash = nullptr) {
+  const auto &keys = Zobrist();
   Direction directions[] = {
       Direction::UP, Direction::UP_RIGHT, Direction::RIGHT, Direction::DOWN_RIGHT,
       Direction::DOWN, Direction::DOWN_LEFT, Direction::LEFT, Direction::UP_LEFT,
@@ -258,7 +1015,11 @@ void apply_move(array<uint8_t, 64> *board, uint8_t player, Position move_pos) {
     int search_y = move_pos.y + dy;
 
     while (search_x != end_x or search_y != end_y) {
-      (*board)[search_x + search_y * 8] = player;
+      const int i = search_x + search_y * 8;
+      (*board)[i] = player;
+      if (hash) {
+        *hash ^= keys.squares[i][BLACK] ^ keys.squares[i][WHITE];
+      }
       search_x += dx;
       search_y += dy;
     };
@@ -266,61 +1027,39 @@ void apply_move(array<uint8_t, 64> *board, uint8_t player, Position move_pos) {
 
   // `find_line_ending` assumes the query position is empty. So we fill it last.
   if (flipped_any) {
-    (*board)[move_pos.x + move_pos.y * 8] = player;
+    const int i = move_pos.x + move_pos.y * 8;
+    (*board)[i] = player;
+    if (hash) {
+      *hash ^= keys.squares[i][player];
+    }
   }
 
 }
 
 float weighted_parity_heuristic_1(const array<uint8_t, 64> &board, uint8_t player) {
-  // Same weights as:
-  // https://github.com/dhconnelly/paip-python/blob/master/paip/othello.py
-  static int weights[] = {
-      120, -20, 20, 5, 5, 20, -20, 120,
-      -20, -40, -5, -5, -5, -5, -40, -20,
-      20, -5, 15, 3, 3, 15, -5, 20,
-      5, -5, 3, 3, 3, 3, -5, 5,
-      5, -5, 3, 3, 3, 3, -5, 5,
-      20, -5, 15, 3, 3, 15, -5, 20,
-      -20, -40, -5, -5, -5, -5, -40, -20,
-      120, -20, 20, 5, 5, 20, -20, 120,
-  };
-
   int ret = 0;
   auto opponent = get_opponent(player);
   for (int i = 0; i < 64; ++i) {
     const auto value = board[i];
     if (value == player) {
-      ret += weights[i];
+      ret += kDhconnellyWeights[i];
     } else if (value == opponent) {
-      ret -= weights[i];
+      ret -= kDhconnellyWeights[i];
     }
   }
   return ret;
 }
 
 float weighted_parity_heuristic_2(const array<uint8_t, 64> &board, uint8_t player) {
-  // Same weights as:
-  // https://github.com/dhconnelly/paip-python/blob/master/paip/othello.py
-  static int weights[] = {
-      120, -20, 20, 5, 5, 20, -20, 120,
-      -20, -40, -5, -5, -5, -5, -40, -20,
-      20, -5, 15, 3, 3, 15, -5, 20,
-      5, -5, 3, 3, 3, 3, -5, 5,
-      5, -5, 3, 3, 3, 3, -5, 5,
-      20, -5, 15, 3, 3, 15, -5, 20,
-      -20, -40, -5, -5, -5, -5, -40, -20,
-      120, -20, 20, 5, 5, 20, -20, 120,
-  };
-
   int player_sum = 0;
   int opponent_sum = 0;
   auto opponent = get_opponent(player);
   for (int i = 0; i < 64; ++i) {
     const auto value = board[i];
     if (value == player) {
-      player_sum += weights[i];
+      player_sum += kDhconnellyWeights[i];
     } else if (value == opponent) {
-      opponent_sum += weights[i];
+      opponent_sum += kDhconnellyWeights[i];
     }
   }
 
@@ -330,27 +1069,15 @@ float weighted_parity_heuristic_2(const array<uint8_t, 64> &board, uint8_t playe
 }
 
 float weighted_parity_heuristic_3(const array<uint8_t, 64> &board, uint8_t player) {
-  // https://courses.cs.washington.edu/courses/cse573/04au/Project/mini1/RUSSIA/Final_Paper.pdf
-  static int weights[] = {
-      4, -3, 2, 2, 2, 2, -3, 4,
-      -3, -4, -1, -1, -1, -1, -4, -3,
-      2, -1, 1, 0, 0, 1, -1, 2,
-      2, -1, 0, 1, 1, 0, -1, 2,
-      2, -1, 0, 1, 1, 0, -1, 2,
-      2, -1, 1, 0, 0, 1, -1, 2,
-      -3, -4, -1, -1, -1, -1, -4, -3,
-      4, -3, 2, 2, 2, 2, -3, 4
-  };
-
   int player_sum = 0;
   int opponent_sum = 0;
   auto opponent = get_opponent(player);
   for (int i = 0; i < 64; ++i) {
     const auto value = board[i];
     if (value == player) {
-      player_sum += weights[i];
+      player_sum += kRussiaWeights[i];
     } else if (value == opponent) {
-      opponent_sum += weights[i];
+      opponent_sum += kRussiaWeights[i];
     }
   }
 
@@ -380,76 +1107,228 @@ float mobility_heuristic(const array<uint8_t, 64> &board, uint8_t player) {
       / (num_valid_moves_player + num_valid_moves_opponent + 1);
 }
 
+// Stable disks. See `stable_bits`.
 float permanent_disk_heuristic(const array<uint8_t, 64> &board, uint8_t player) {
-  std::function<bool(const array<uint8_t, 64> &board, int x, int y, Direction direction)> touches_border;
-  touches_border = [&](const array<uint8_t, 64> &board, int x, int y, Direction direction) -> bool {
-    int dx = 0, dy = 0;
-    direction_delta(direction, &dx, &dy);
+  uint64_t own, opp;
+  bitboards_from_board(board, player, &own, &opp);
+  const uint64_t stable = player == BLACK ? stable_bits(own, opp) : stable_bits(opp, own);
+  int player_permanent_count = popcount64(stable & own);
+  int opponent_permanent_count = popcount64(stable & opp);
 
-    uint8_t ref_value = board[x + y * 8];
-    int search_x = x;
-    int search_y = y;
+  return static_cast<float>(player_permanent_count - opponent_permanent_count + 1)
+      / (player_permanent_count + player_permanent_count + 1);
+}
 
-    bool ret = true;
-    while (true) {
-      search_x += dx;
-      search_y += dy;
-      if (search_x < 0 or search_x >= 8 or search_y < 0 or search_y >= 8) {
-        break;  // Out of range.
-      }
-      auto value = board[search_x + search_y * 8];
-      if (value != ref_value) {
-        // If we encounter another symbol before going out of range, it does not touch the border.
-        ret = false;
-        break;
-      }
-    };
-    return ret;
-  };
+// Pattern evaluator, heuristic `kPatternHeuristicType`. A pattern is a group of squares, indexed in base 3 by their
+// contents. The value of a position is a bias plus the weight of each pattern in each of the 8 symmetries of the board,
+// with one set of weights per game phase. The weights are fitted by pattern_evaluator.py to predict the final disk
+// difference of self-play games, and loaded with `load_pattern_weights`. Until then, every position is worth 0.
+constexpr int kPatternHeuristicType = 9;
+constexpr int kNumPatterns = 11;
+constexpr int kNumPatternPhases = 6;  // By the number of moves played, ten each. See `pattern_phase`.
+// Squares of each pattern, in the order of `pattern_bits`: the edge, the next three rows, the 3x3 and 2x5 corners, and
+// the diagonals of 8 to 4 squares. Same as pattern_evaluator.PATTERN_SQUARES.
+constexpr int kPatternSizes[kNumPatterns] = {8, 8, 8, 8, 9, 10, 8, 7, 6, 5, 4};
+
+// Patterns read twice among the 8 symmetries. A row read in a mirrored symmetry is the row of the unmirrored one,
+// reversed. The 3x3 corner and the main diagonal read in a symmetry with a diagonal flip are the squares of another
+// symmetry without it, transposed. `load_pattern_weights` adds the weights of each index and of its reversed or
+// transposed index, so that `pattern_heuristic` only reads these patterns in half the symmetries.
+enum class PatternFold {
+  kNone, kMirror, kTranspose
+};
+constexpr PatternFold kPatternFolds[kNumPatterns] = {
+    PatternFold::kMirror, PatternFold::kMirror, PatternFold::kMirror, PatternFold::kMirror, PatternFold::kTranspose,
+    PatternFold::kNone, PatternFold::kTranspose, PatternFold::kNone, PatternFold::kNone, PatternFold::kNone,
+    PatternFold::kNone,
+};
 
-  const auto is_definitely_permanent = [&](const array<uint8_t, 64> &board, int x, int y) {
-    Direction direction_pairs[][2] = {
-        {Direction::DOWN_LEFT, Direction::UP_RIGHT},
-        {Direction::DOWN_RIGHT, Direction::UP_LEFT},
-        {Direction::UP, Direction::DOWN},
-        {Direction::LEFT, Direction::RIGHT},
-    };
+struct PatternWeights {
+  bool is_loaded = false;
+  int offsets[kNumPatterns];  // Of each pattern's weights, within a phase.
+  int num_indices[kNumPatterns];  // 3^size.
+  int phase_size;  // Bias, then the weights of each pattern.
+  vector<float> weights;  // kNumPatternPhases * phase_size.
+  uint16_t ternary[1024];  // `ternary[bits]` is the sum of 3^i over the set bits i.
+};
 
-    for (const auto &pair : direction_pairs) {
-      // If we see any pairs not touching the border in at least one direction, this disk may not be permanent.
-      if (!touches_border(board, x, y, pair[0]) and !touches_border(board, x, y, pair[1])) {
-        return false;
+static PatternWeights &MutablePatternWeights() {
+  static PatternWeights ret = [] {
+    PatternWeights weights;
+    int offset = 1;
+    for (int i = 0; i < kNumPatterns; ++i) {
+      weights.offsets[i] = offset;
+      weights.num_indices[i] = static_cast<int>(std::pow(3, kPatternSizes[i]));
+      offset += weights.num_indices[i];
+    }
+    weights.phase_size = offset;
+    for (int bits = 0; bits < 1024; ++bits) {
+      int index = 0;
+      for (int i = 9; i >= 0; --i) {
+        index = index * 3 + ((bits >> i) & 1);
       }
+      weights.ternary[bits] = static_cast<uint16_t>(index);
     }
-    return true;
-  };
+    return weights;
+  }();
+  return ret;
+}
 
-  int player_permanent_count = 0;
-  int opponent_permanent_count = 0;
+static const PatternWeights &GetPatternWeights() {
+  return MutablePatternWeights();
+}
 
-  uint8_t opponent = get_opponent(player);
+// Index of pattern `i` with its squares reversed or transposed. See `kPatternFolds`.
+inline int folded_pattern_index(int i, int index) {
+  int digits[10];
+  for (int j = 0; j < kPatternSizes[i]; ++j, index /= 3) {
+    digits[j] = index % 3;
+  }
+  int ret = 0;
+  for (int j = kPatternSizes[i] - 1; j >= 0; --j) {
+    int folded_j = j;  // The main diagonal is its own transpose.
+    if (kPatternFolds[i] == PatternFold::kMirror) {
+      folded_j = kPatternSizes[i] - 1 - j;
+    } else if (kPatternSizes[i] == 9) {
+      folded_j = (j % 3) * 3 + j / 3;  // 3x3 corner.
+    }
+    ret = ret * 3 + digits[folded_j];
+  }
+  return ret;
+}
 
-  for (int y = 0; y < 8; ++y) {
-    for (int x = 0; x < 8; ++x) {
-      auto value = board[x + y * 8];
-      if (value == EMPTY) {
+// Reads weights written by `pattern_evaluator.save_weights`: the magic "OTHPATT1", the uint32 number of phases, number
+// of patterns and size of each pattern, then the float32 weights of each phase. Returns false, and leaves the weights
+// unchanged, if the file cannot be read or was written for other patterns. A null `filename` unloads the weights. Not
+// safe while searching.
+bool load_pattern_weights(const char *filename) {
+  PatternWeights &ret = MutablePatternWeights();
+  if (filename == nullptr) {
+    ret.is_loaded = false;
+    ret.weights.clear();
+    return true;
+  }
+  std::ifstream file(filename, std::ios::binary);
+  char magic[8];
+  uint32_t header[2 + kNumPatterns];
+  if (!file.read(magic, sizeof(magic)) or std::memcmp(magic, "OTHPATT1", sizeof(magic)) != 0
+      or !file.read(reinterpret_cast<char *>(header), sizeof(header))
+      or header[0] != kNumPatternPhases or header[1] != kNumPatterns
+      or !std::equal(kPatternSizes, kPatternSizes + kNumPatterns, header + 2)) {
+    return false;
+  }
+  vector<float> weights(static_cast<size_t>(kNumPatternPhases) * ret.phase_size);
+  if (!file.read(reinterpret_cast<char *>(weights.data()), weights.size() * sizeof(float))) {
+    return false;
+  }
+  for (int phase = 0; phase < kNumPatternPhases; ++phase) {
+    for (int i = 0; i < kNumPatterns; ++i) {
+      if (kPatternFolds[i] == PatternFold::kNone) {
         continue;
       }
-      if (is_definitely_permanent(board, x, y)) {
-        if (value == player) {
-          ++player_permanent_count;
-        } else if (value == opponent) {
-          ++opponent_permanent_count;
-        }
+      float *table = weights.data() + phase * ret.phase_size + ret.offsets[i];
+      const vector<float> original(table, table + ret.num_indices[i]);
+      for (int index = 0; index < ret.num_indices[i]; ++index) {
+        table[index] = original[index] + original[folded_pattern_index(i, index)];
       }
     }
   }
+  ret.weights = std::move(weights);
+  ret.is_loaded = true;
+  return true;
+}
 
-  return static_cast<float>(player_permanent_count - opponent_permanent_count + 1)
-      / (player_permanent_count + player_permanent_count + 1);
+// (x, y) -> (x, 7 - y)
+inline uint64_t flip_vertical(uint64_t bits) {
+  return __builtin_bswap64(bits);
 }
 
-float heuristic(const array<uint8_t, 64> &board, uint8_t player, int heuristic_type) {
+// (x, y) -> (7 - x, y)
+inline uint64_t mirror_horizontal(uint64_t bits) {
+  bits = ((bits >> 1) & 0x5555555555555555ULL) | ((bits & 0x5555555555555555ULL) << 1);
+  bits = ((bits >> 2) & 0x3333333333333333ULL) | ((bits & 0x3333333333333333ULL) << 2);
+  return ((bits >> 4) & 0x0F0F0F0F0F0F0F0FULL) | ((bits & 0x0F0F0F0F0F0F0F0FULL) << 4);
+}
+
+// (x, y) -> (y, x)
+inline uint64_t flip_diagonal(uint64_t bits) {
+  uint64_t t = 0x0F0F0F0F00000000ULL & (bits ^ (bits << 28));
+  bits ^= t ^ (t >> 28);
+  t = 0x3333000033330000ULL & (bits ^ (bits << 14));
+  bits ^= t ^ (t >> 14);
+  t = 0x5500550055005500ULL & (bits ^ (bits << 7));
+  return bits ^ t ^ (t >> 7);
+}
+
+// Squares of pattern `i`, packed into the low bits in the order of pattern_evaluator.PATTERN_SQUARES.
+inline uint32_t pattern_bits(uint64_t bits, int i) {
+  // Diagonal squares (k + j, j) are moved to row 7 by the multiplication, without carries.
+  const auto diagonal = [bits](uint64_t mask, int k) {
+    return static_cast<uint32_t>(((bits & mask) * 0x0101010101010101ULL) >> (56 + k));
+  };
+  switch (i) {
+    case 0: return static_cast<uint32_t>(bits & 0xFF);
+    case 1: return static_cast<uint32_t>((bits >> 8) & 0xFF);
+    case 2: return static_cast<uint32_t>((bits >> 16) & 0xFF);
+    case 3: return static_cast<uint32_t>((bits >> 24) & 0xFF);
+    case 4: return static_cast<uint32_t>((bits & 0x7) | ((bits >> 5) & 0x38) | ((bits >> 10) & 0x1C0));
+    case 5: return static_cast<uint32_t>((bits & 0x1F) | ((bits >> 3) & 0x3E0));
+    case 6: return diagonal(0x8040201008040201ULL, 0);
+    case 7: return diagonal(0x0080402010080402ULL, 1);
+    case 8: return diagonal(0x0000804020100804ULL, 2);
+    case 9: return diagonal(0x0000008040201008ULL, 3);
+    default: return diagonal(0x0000000080402010ULL, 4);
+  }
+}
+
+// Index of the weights used for a position with the disks `own | opp`. The last phase also has the 60th move.
+inline int pattern_phase(uint64_t own, uint64_t opp) {
+  return std::min(kNumPatternPhases - 1, (popcount64(own | opp) - 4) / 10);
+}
+
+// Predicted final disk difference for the owner of `own`, who is to move.
+float pattern_heuristic(uint64_t own, uint64_t opp) {
+  const PatternWeights &pattern_weights = GetPatternWeights();
+  if (!pattern_weights.is_loaded) {
+    return 0;
+  }
+  const float *weights = pattern_weights.weights.data() + pattern_phase(own, opp) * pattern_weights.phase_size;
+  float ret = weights[0];
+  const auto add_pattern = [&](int i, uint64_t own_t, uint64_t opp_t) {
+    const int index = pattern_weights.ternary[pattern_bits(own_t, i)]
+        + 2 * pattern_weights.ternary[pattern_bits(opp_t, i)];
+    ret += weights[pattern_weights.offsets[i] + index];
+  };
+  // The 8 symmetries of opening_book.transform, from one diagonal flip, two vertical flips and four mirrors. Folded
+  // patterns are skipped in the mirrored or diagonally flipped ones. See `kPatternFolds`.
+  for (int diagonal = 0; diagonal < 2; ++diagonal) {
+    const uint64_t own_d = diagonal ? flip_diagonal(own) : own;
+    const uint64_t opp_d = diagonal ? flip_diagonal(opp) : opp;
+    for (int vertical = 0; vertical < 2; ++vertical) {
+      const uint64_t own_t = vertical ? flip_vertical(own_d) : own_d;
+      const uint64_t opp_t = vertical ? flip_vertical(opp_d) : opp_d;
+      const uint64_t own_m = mirror_horizontal(own_t), opp_m = mirror_horizontal(opp_t);
+      for (int i = 0; i < 4; ++i) {  // Rows.
+        add_pattern(i, own_t, opp_t);
+      }
+      if (!diagonal) {
+        add_pattern(4, own_t, opp_t);  // 3x3 corner.
+        add_pattern(4, own_m, opp_m);
+        add_pattern(6, own_t, opp_t);  // Main diagonal.
+        add_pattern(6, own_m, opp_m);
+      }
+      add_pattern(5, own_t, opp_t);  // 2x5 corner.
+      add_pattern(5, own_m, opp_m);
+      for (int i = 7; i < kNumPatterns; ++i) {  // Shorter diagonals.
+        add_pattern(i, own_t, opp_t);
+        add_pattern(i, own_m, opp_m);
+      }
+    }
+  }
+  return ret;
+}
+
+float heuristic(const array<uint8_t, 64> &board, uint8_t player, int heuristic_type) {
   switch (heuristic_type) {
     case 0: return weighted_parity_heuristic_1(board, player);
     case 1: return weighted_parity_heuristic_2(board, player);
@@ -464,6 +1343,48 @@ float heuristic(const array<uint8_t, 64> &board, uint8_t player, int heuristic_t
           + permanent_disk_heuristic(board, player) * 6;
 //      return weighted_parity_heuristic_1(board, player) * 0.5 + mobility_heuristic(board, player) * 4
 //          + permanent_disk_heuristic(board, player) * 4;
+    case kPatternHeuristicType: {
+      uint64_t own, opp;
+      bitboards_from_board(board, player, &own, &opp);
+      return pattern_heuristic(own, opp);
+    }
+    default: return 0; // random
+  }
+}
+
+// Same values as `heuristic` of the board, from the running totals and bitboards of `state`.
+float heuristic(const SearchState &state, uint8_t player, int heuristic_type) {
+  const uint8_t opponent = player ^ 1;
+
+  const auto weighted_parity = [&](const int *sums) {
+    return static_cast<float>(sums[player] - sums[opponent] + 1)
+        / (std::abs(sums[player]) + std::abs(sums[opponent]) + 1);
+  };
+  const auto mobility = [&]() {
+    int num_valid_moves_player = popcount64(legal_moves_bits(state, player));
+    int num_valid_moves_opponent = popcount64(legal_moves_bits(state, opponent));
+    return static_cast<float>(num_valid_moves_player - num_valid_moves_opponent + 1)
+        / (num_valid_moves_player + num_valid_moves_opponent + 1);
+  };
+  const auto permanent_disk = [&]() {
+    const uint64_t stable = stable_bits(state.disks[BLACK], state.disks[WHITE]);
+    int player_permanent_count = popcount64(stable & state.disks[player]);
+    int opponent_permanent_count = popcount64(stable & state.disks[opponent]);
+    return static_cast<float>(player_permanent_count - opponent_permanent_count + 1)
+        / (player_permanent_count + player_permanent_count + 1);
+  };
+
+  switch (heuristic_type) {
+    case 0: return static_cast<float>(state.dhconnelly_sums[player] - state.dhconnelly_sums[opponent]);
+    case 1: return weighted_parity(state.dhconnelly_sums);
+    case 2: return weighted_parity(state.russia_sums);
+    case 3: return static_cast<float>(popcount64(state.disks[player]) - popcount64(state.disks[opponent]));
+    case 4: return mobility();
+    case 5: return permanent_disk();
+    case 6: return weighted_parity(state.dhconnelly_sums) + mobility();
+    case 7: return weighted_parity(state.dhconnelly_sums) + 0.5f * mobility();
+    case 8: return weighted_parity(state.dhconnelly_sums) * 4 + mobility() * 5 + permanent_disk() * 6;
+    case kPatternHeuristicType: return pattern_heuristic(state.disks[player], state.disks[opponent]);
     default: return 0; // random
   }
 }
@@ -528,27 +1449,96 @@ float minimax_ab(const array<uint8_t, 64> &board, uint8_t player, int depth,
   return best;
 }
 
+float minimax_ab_transposition(const SearchState &state,
+                               uint8_t player,
+                               int depth,
+                               float alpha,
+                               float beta,
+                               SearchContext *ctx);
+
+inline int probcut_stage(const SearchState &state) {
+  const int num_empty = 64 - popcount64(state.disks[BLACK] | state.disks[WHITE]);
+  return std::min(kProbCutNumStages - 1, std::max(0, 60 - num_empty) / 15);
+}
+
+// Multi-ProbCut (Buro, 1997). Returns true, with `alpha` or `beta` in `value`, if a shallow search predicts that the
+// search of the node to `depth` fails low or high. See `kMultiProbCut`. Neither the cutoff nor its value is stored in
+// the table.
+bool probcut(const SearchState &state, uint8_t player, int depth, float alpha, float beta, SearchContext *ctx,
+             float *value) {
+  for (const auto &params : kProbCutParameters[probcut_stage(state)][depth]) {
+    if (params.sigma <= 0) {
+      continue;
+    }
+    const float margin = kProbCutThreshold * params.sigma;
+    if (beta < kInfinity) {
+      const float bound = (beta + margin - params.intercept) / params.slope;
+      if (minimax_ab_transposition(state, player, params.shallow_depth, std::nextafter(bound, -kInfinity), bound,
+                                   ctx) >= bound) {
+        ctx->count(&SearchCounters::probcut_cutoffs);
+        *value = beta;
+        return true;
+      }
+    }
+    if (alpha > -kInfinity) {
+      const float bound = (alpha - margin - params.intercept) / params.slope;
+      if (minimax_ab_transposition(state, player, params.shallow_depth, bound, std::nextafter(bound, kInfinity),
+                                   ctx) <= bound) {
+        ctx->count(&SearchCounters::probcut_cutoffs);
+        *value = alpha;
+        return true;
+      }
+    }
+  }
+  return false;
+}
+
+// Value of a younger child for the player to move at the parent, within (alpha, beta). `child_state` has `opponent` to
+// move and is searched to `depth`. See `kPrincipalVariationSearch`.
+inline float search_younger_child(const SearchState &child_state, uint8_t opponent, int depth, float alpha, float beta,
+                                  SearchContext *ctx) {
+  if (!(ctx->options & kPrincipalVariationSearch) or alpha == -kInfinity) {
+    return -minimax_ab_transposition(child_state, opponent, depth, -beta, -alpha, ctx);
+  }
+  const float null_beta = std::nextafter(alpha, kInfinity);
+  float value = -minimax_ab_transposition(child_state, opponent, depth, -null_beta, -alpha, ctx);
+  if (value > alpha and value < beta and null_beta < beta) {
+    ctx->count(&SearchCounters::researches);
+    value = -minimax_ab_transposition(child_state, opponent, depth, -beta, -alpha, ctx);
+  }
+  return value;
+}
+
 // https://en.wikipedia.org/wiki/Negamax#Negamax_with_alpha_beta_pruning_and_transposition_tables
-float minimax_ab_transposition(const array<uint8_t, 64> &board,
+// The best move stored in the table is searched first.
+float minimax_ab_transposition(const SearchState &state,
                                uint8_t player,
                                int depth,
                                float alpha,
                                float beta,
-                               int heuristic_type,
-                               unordered_map<string, TTEntry> *table) {
+                               SearchContext *ctx) {
+  if (ctx->check_stop()) {
+    return 0;
+  }
+  ctx->count(&SearchCounters::nodes);
+
+  const int heuristic_type = ctx->heuristic_type;
   if (depth <= 0) {
-    return heuristic(board, player, heuristic_type);
+    ctx->count(&SearchCounters::leaves);
+    return heuristic(state, player, heuristic_type);
   }
 
   float alpha_orig = alpha;
 
-  const string board_str(reinterpret_cast<const char *>(board.data()), 64);
-  auto it = table->find(board_str);
-  bool is_valid_lookup = it != table->end();
+  const uint64_t key = tt_key(state.hash, player, ctx->table_heuristic_type());
+  TTEntry tt_entry;
+  bool is_valid_lookup = ctx->table->probe(key, &tt_entry);
+  ctx->count(&SearchCounters::tt_probes);
   if (is_valid_lookup) {
-    auto tt_entry = it->second;
-    if (tt_entry.depth >= depth) {
+    ctx->count(&SearchCounters::tt_hits);
+    if (ctx->is_usable_depth(tt_entry.depth, depth)) {
       if (tt_entry.flag == TTFlag::EXACT) {
+        ctx->count(&SearchCounters::tt_cutoffs);
         return tt_entry.value;
       } else if (tt_entry.flag == TTFlag::LOWERBOUND) {
         alpha = std::max(alpha, tt_entry.value);
@@ -557,87 +1547,751 @@ float minimax_ab_transposition(const array<uint8_t, 64> &board,
       }
 
       if (alpha >= beta) {
+        ctx->count(&SearchCounters::tt_cutoffs);
         return tt_entry.value;
       }
     }
   }
 
   vector<Position> moves;
-  find_valid_moves(board, player, &moves);
+  find_valid_moves(state, player, &moves);
   auto opponent = get_opponent(player);
-  if (moves.empty() and !any_valid_move(board, opponent)) {
+  if (moves.empty() and legal_moves_bits(state, opponent) == 0) {
     // Terminal node. Game ending condition.
-//    return heuristic(board, player, heuristic_type);
-    return static_cast<float>((parity_heuristic(board, player) > 0) ? 1 : -1) * 10000;
+    return static_cast<float>((popcount64(state.disks[player]) > popcount64(state.disks[opponent])) ? 1 : -1) * 10000;
   }
 
-  order_moves(&moves);
+  if ((ctx->options & kMultiProbCut) and heuristic_type == kProbCutHeuristicType and depth >= kProbCutMinDepth
+      and depth <= kProbCutMaxDepth and std::nextafter(alpha, kInfinity) >= beta) {
+    float value;
+    if (probcut(state, player, depth, alpha, beta, ctx, &value)) {
+      return value;
+    }
+  }
+
+  if ((ctx->options & kEnhancedTranspositionCutoff) and depth >= kEnhancedTranspositionCutoffMinDepth) {
+    float value;
+    if (enhanced_transposition_cutoff(state, player, depth, beta, moves, ctx, &value)) {
+      return value;
+    }
+  }
+
+  order_moves(state, player, depth, is_valid_lookup ? tt_entry.best_move : EMPTY, ctx, &moves);
 
   float best = -kInfinity;
-  for (const auto &move_pos : moves) {
-    array<uint8_t, 64> next_board = board;
-    apply_move(&next_board, player, move_pos);
-    best = std::max(best,
-                    -minimax_ab_transposition(next_board, opponent, depth - 1, -beta, -alpha, heuristic_type, table));
+  uint8_t best_move = EMPTY;
+  for (size_t i = 0; i < moves.size(); ++i) {
+    const auto &move_pos = moves[i];
+    SearchState next_state = state;
+    apply_move(&next_state, player, move_pos.x + move_pos.y * 8);
+    float value = (best_move == EMPTY)
+                  ? -minimax_ab_transposition(next_state, opponent, depth - 1, -beta, -alpha, ctx)
+                  : search_younger_child(next_state, opponent, depth - 1, alpha, beta, ctx);
+    if (value > best) {
+      best = value;
+      best_move = static_cast<uint8_t>(move_pos.x + move_pos.y * 8);
+    }
     alpha = std::max(alpha, best);
     if (alpha >= beta) {
+      ctx->record_cutoff(player, depth, best_move, i);
       break;
     }
   }
   if (best == -kInfinity) {
-    best = -minimax_ab_transposition(board, opponent, depth - 1, -beta, -alpha, heuristic_type, table);
+    best = -minimax_ab_transposition(state, opponent, depth - 1, -beta, -alpha, ctx);
+  }
+
+  if (ctx->stopped.load(std::memory_order_relaxed)) {
+    return 0;
   }
 
   // Add new entry.
-  auto &tt_entry = (*table)[board_str];
-  tt_entry.value = best;
+  TTFlag flag;
   if (best <= alpha_orig) {
-    tt_entry.flag = TTFlag::UPPERBOUND;
+    flag = TTFlag::UPPERBOUND;
+    best_move = EMPTY;
   } else if (best >= beta) {
-    tt_entry.flag = TTFlag::LOWERBOUND;
+    flag = TTFlag::LOWERBOUND;
   } else {
-    tt_entry.flag = TTFlag::EXACT;
+    flag = TTFlag::EXACT;
   }
-  tt_entry.depth = static_cast<uint8_t>(depth);  // Assume depth < 256.
+  ctx->table->store(key, best, flag, depth, best_move);
+  ctx->count(&SearchCounters::tt_stores);
 
   return best;
 }
 
-bool search_next_move(const array<uint8_t, 64> &board, uint8_t player, int depth,
-                      const std::function<float(const array<uint8_t, 64> &board, uint8_t player,
-                                                int depth)> &searcher, Position *next_move) {
+float minimax_ab_transposition(const array<uint8_t, 64> &board,
+                               uint8_t player,
+                               int depth,
+                               float alpha,
+                               float beta,
+                               int heuristic_type,
+                               TranspositionTable *table) {
+  SearchContext ctx;
+  ctx.heuristic_type = heuristic_type;
+  ctx.table = table;
+  return minimax_ab_transposition(make_search_state(board), player, depth, alpha, beta, &ctx);
+}
+
+// Nodes closer than this to the horizon are searched by a single thread.
+constexpr int kMinSplitDepth = 4;
+
+inline int num_search_threads(const SearchContext *ctx) {
+  return (ctx->num_threads > 0) ? ctx->num_threads : omp_get_max_threads();
+}
+
+// Parallel alpha-beta search with PV-splitting (Young Brothers Wait). The eldest child is searched first, itself with
+// PV-splitting, to establish a bound. Then the younger children are searched in parallel by
+// `minimax_ab_transposition` with the best bound found so far. Once a child fails high, the children that haven't
+// started are skipped. All threads share `ctx->table`.
+//
+// Only nodes along the leftmost path split, so parallel regions are never nested.
+float minimax_pv_split(const SearchState &state,
+                       uint8_t player,
+                       int depth,
+                       float alpha,
+                       float beta,
+                       SearchContext *ctx) {
+  if (depth < kMinSplitDepth) {
+    return minimax_ab_transposition(state, player, depth, alpha, beta, ctx);
+  }
+  if (ctx->check_stop()) {
+    return 0;
+  }
+  ctx->count(&SearchCounters::nodes);
+
+  const int heuristic_type = ctx->heuristic_type;
+  float alpha_orig = alpha;
+
+  const uint64_t key = tt_key(state.hash, player, ctx->table_heuristic_type());
+  TTEntry tt_entry;
+  bool is_valid_lookup = ctx->table->probe(key, &tt_entry);
+  ctx->count(&SearchCounters::tt_probes);
+  if (is_valid_lookup) {
+    ctx->count(&SearchCounters::tt_hits);
+    if (ctx->is_usable_depth(tt_entry.depth, depth)) {
+      if (tt_entry.flag == TTFlag::EXACT) {
+        ctx->count(&SearchCounters::tt_cutoffs);
+        return tt_entry.value;
+      } else if (tt_entry.flag == TTFlag::LOWERBOUND) {
+        alpha = std::max(alpha, tt_entry.value);
+      } else {  // UPPERBOUND
+        beta = std::min(beta, tt_entry.value);
+      }
+
+      if (alpha >= beta) {
+        ctx->count(&SearchCounters::tt_cutoffs);
+        return tt_entry.value;
+      }
+    }
+  }
+
   vector<Position> moves;
-  float best = -kInfinity;
+  find_valid_moves(state, player, &moves);
   auto opponent = get_opponent(player);
-  if (find_valid_moves(board, player, &moves) > 0) {
-    vector<float> values(moves.size());
+  if (moves.empty()) {
+    if (legal_moves_bits(state, opponent) == 0) {
+      // Terminal node. Game ending condition.
+      return static_cast<float>((popcount64(state.disks[player]) > popcount64(state.disks[opponent])) ? 1 : -1) * 10000;
+    }
+    return -minimax_pv_split(state, opponent, depth - 1, -beta, -alpha, ctx);
+  }
 
-#pragma omp parallel for schedule(auto)
-    for (int j = 0; j < moves.size(); ++j) {
-      const auto &move_pos = moves[j];
-      array<uint8_t, 64> next_board = board;
-      apply_move(&next_board, player, move_pos);
-      auto value = searcher(next_board, opponent, depth - 1);
+  order_moves(state, player, depth, is_valid_lookup ? tt_entry.best_move : EMPTY, ctx, &moves);
+
+  SearchState next_state = state;
+  apply_move(&next_state, player, moves[0].x + moves[0].y * 8);
+  float best = -minimax_pv_split(next_state, opponent, depth - 1, -beta, -alpha, ctx);
+  uint8_t best_move = static_cast<uint8_t>(moves[0].x + moves[0].y * 8);
+  int best_index = 0;
+  alpha = std::max(alpha, best);
+
+  if (alpha < beta) {
+    bool cutoff = false;
+#pragma omp parallel for schedule(dynamic, 1) num_threads(num_search_threads(ctx))
+    for (int j = 1; j < moves.size(); ++j) {
+      float child_alpha;
+      bool skip;
+#pragma omp critical(pv_split)
+      {
+        child_alpha = alpha;
+        skip = cutoff;
+      };
+      if (skip) {
+        continue;
+      }
+
+      SearchState child_state = state;
+      apply_move(&child_state, player, moves[j].x + moves[j].y * 8);
+      float value = search_younger_child(child_state, opponent, depth - 1, child_alpha, beta, ctx);
 
-#pragma omp critical
+#pragma omp critical(pv_split)
       {
         if (value > best) {
           best = value;
+          best_move = static_cast<uint8_t>(moves[j].x + moves[j].y * 8);
+          best_index = j;
+        }
+        alpha = std::max(alpha, best);
+        if (alpha >= beta) {
+          cutoff = true;
         }
       };
-      values[j] = value;
     }
+  }
+  if (best >= beta) {
+    ctx->record_cutoff(player, depth, best_move, best_index);
+  }
 
-    std::vector<Position> best_moves;
-    for (int i = 0; i < values.size(); ++i) {
-      if (values[i] == best) {
-        best_moves.push_back(moves[i]);
-      }
+  if (ctx->stopped.load(std::memory_order_relaxed)) {
+    return 0;
+  }
+
+  TTFlag flag;
+  if (best <= alpha_orig) {
+    flag = TTFlag::UPPERBOUND;
+    best_move = EMPTY;
+  } else if (best >= beta) {
+    flag = TTFlag::LOWERBOUND;
+  } else {
+    flag = TTFlag::EXACT;
+  }
+  ctx->table->store(key, best, flag, depth, best_move);
+  ctx->count(&SearchCounters::tt_stores);
+
+  return best;
+}
+
+// Value of the eldest root move, whose position `child_state` has `opponent` to move. See `kAspirationWindows`.
+// `previous_best` is the best value of the previous iteration, or null.
+float search_eldest_root_move(const SearchState &child_state, uint8_t opponent, int depth, const float *previous_best,
+                              SearchContext *ctx) {
+  constexpr float kMaxAspirationWindow = 100;
+  float window = kAspirationWindow;
+  float alpha = -kInfinity;
+  float beta = kInfinity;
+  if (previous_best != nullptr and (ctx->options & kAspirationWindows)) {
+    alpha = *previous_best - window;
+    beta = *previous_best + window;
+  }
+  while (true) {
+    const float value = -minimax_pv_split(child_state, opponent, depth, -beta, -alpha, ctx);
+    if ((value > alpha and value < beta) or ctx->stopped.load()) {
+      return value;
+    }
+    ctx->count(&SearchCounters::researches);
+    window *= 4;
+    if (value <= alpha) {
+      alpha = (window > kMaxAspirationWindow) ? -kInfinity : value - window;
+    } else {
+      beta = (window > kMaxAspirationWindow) ? kInfinity : value + window;
+    }
+  }
+}
+
+// Root of the parallel search. The first move is searched with `minimax_pv_split` and the rest in parallel.
+// `values[i]` is the value of `moves[i]` for `player`. It is exact if `moves[i]` is among the best moves. Otherwise it
+// may be an upper bound, lower than the best value. So ties for the best move are preserved. `previous_best` is the
+// best value of the previous iteration of iterative deepening, or null.
+void search_root_moves(const array<uint8_t, 64> &board, uint8_t player, int depth, const vector<Position> &moves,
+                       SearchContext *ctx, vector<float> *values, const float *previous_best = nullptr) {
+  auto opponent = get_opponent(player);
+  values->resize(moves.size());
+  const SearchState state = make_search_state(board);
+
+  SearchState next_state = state;
+  apply_move(&next_state, player, moves[0].x + moves[0].y * 8);
+  float best = search_eldest_root_move(next_state, opponent, depth - 1, previous_best, ctx);
+  (*values)[0] = best;
+
+#pragma omp parallel for schedule(dynamic, 1) num_threads(num_search_threads(ctx))
+  for (int j = 1; j < moves.size(); ++j) {
+    float alpha;
+#pragma omp critical(search_root)
+    {
+      // Search with a window just below the best value, so that moves of equal value are searched exactly.
+      alpha = std::nextafter(best, -kInfinity);
+    };
+
+    SearchState child_state = state;
+    apply_move(&child_state, player, moves[j].x + moves[j].y * 8);
+    float value = search_younger_child(child_state, opponent, depth - 1, alpha, kInfinity, ctx);
+    (*values)[j] = value;
+
+#pragma omp critical(search_root)
+    {
+      best = std::max(best, value);
+    };
+  }
+}
+
+using Searcher = std::function<float(const array<uint8_t, 64> &board, uint8_t player, int depth)>;
+
+// Searches all `moves` of `player` in parallel. `values[i]` is the value of `moves[i]`, from `player`'s perspective.
+void search_root_moves(const array<uint8_t, 64> &board, uint8_t player, int depth, const vector<Position> &moves,
+                       const Searcher &searcher, vector<float> *values) {
+  auto opponent = get_opponent(player);
+  values->resize(moves.size());
+
+#pragma omp parallel for schedule(auto)
+  for (int j = 0; j < moves.size(); ++j) {
+    const auto &move_pos = moves[j];
+    array<uint8_t, 64> next_board = board;
+    apply_move(&next_board, player, move_pos);
+    (*values)[j] = searcher(next_board, opponent, depth - 1);
+  }
+}
+
+// Picks one of the highest valued moves at random.
+Position pick_best_move(const vector<Position> &moves, const vector<float> &values) {
+  float best = *std::max_element(values.begin(), values.end());
+  std::vector<Position> best_moves;
+  for (int i = 0; i < values.size(); ++i) {
+    if (values[i] == best) {
+      best_moves.push_back(moves[i]);
+    }
+  }
+  auto n = static_cast<int>(best_moves.size());
+  return best_moves[std::uniform_int_distribution<decltype(n)>{0, n - 1}(RandomEngine())];
+}
+
+// Same, but ties are broken as set by `ctx.deterministic`.
+Position pick_best_move(const array<uint8_t, 64> &board, uint8_t player, const vector<Position> &moves,
+                        const vector<float> &values, const SearchContext &ctx) {
+  if (!ctx.deterministic) {
+    return pick_best_move(moves, values);
+  }
+  const uint64_t key = tt_key(zobrist_hash(board), player, ctx.heuristic_type);
+  std::seed_seq seed{static_cast<uint32_t>(ctx.seed), static_cast<uint32_t>(ctx.seed >> 32),
+                     static_cast<uint32_t>(key), static_cast<uint32_t>(key >> 32)};
+  std::mt19937 engine(seed);
+  float best = *std::max_element(values.begin(), values.end());
+  // In square order, since the order of `moves` can depend on earlier searches.
+  vector<Position> best_moves;
+  for (int i = 0; i < values.size(); ++i) {
+    if (values[i] == best) {
+      best_moves.push_back(moves[i]);
     }
-    auto n = static_cast<int>(best_moves.size());
-    *next_move = best_moves[std::uniform_int_distribution<decltype(n)>{0, n - 1}(RandomEngine())];
+  }
+  std::sort(best_moves.begin(), best_moves.end(), [](const Position &a, const Position &b) {
+    return a.x + a.y * 8 < b.x + b.y * 8;
+  });
+  auto n = static_cast<int>(best_moves.size());
+  return best_moves[std::uniform_int_distribution<decltype(n)>{0, n - 1}(engine)];
+}
+
+bool search_next_move(const array<uint8_t, 64> &board, uint8_t player, int depth, const Searcher &searcher,
+                      Position *next_move) {
+  vector<Position> moves;
+  if (find_valid_moves(board, player, &moves) > 0) {
+    vector<float> values;
+    search_root_moves(board, player, depth, moves, searcher, &values);
+    *next_move = pick_best_move(moves, values);
+    return true;
+  }
+  // No valid moves.
+  return false;
+}
+
+bool search_next_move(const array<uint8_t, 64> &board, uint8_t player, int depth, SearchContext *ctx,
+                      Position *next_move) {
+  vector<Position> moves;
+  if (find_valid_moves(board, player, &moves) > 0) {
+    order_moves(&moves);
+    vector<float> values;
+    search_root_moves(board, player, depth, moves, ctx, &values);
+    *next_move = pick_best_move(board, player, moves, values, *ctx);
     return true;
   }
   // No valid moves.
   return false;
 }
+
+// Iterative deepening. Searches to depth 1, 2, ... until `ctx` is stopped, or the depth reaches the number of empty
+// squares. Each iteration searches the root moves in the order of the previous iteration's values, best first, and the
+// table's best moves are searched first below the root. The first iteration always completes. `next_move` is the best
+// move of the deepest completed iteration and `depth_reached` is its depth.
+bool search_next_move_iterative(const array<uint8_t, 64> &board, uint8_t player, SearchContext *ctx,
+                                Position *next_move, int *depth_reached) {
+  vector<Position> moves;
+  if (find_valid_moves(board, player, &moves) == 0) {
+    // No valid moves.
+    return false;
+  }
+  order_moves(&moves);
+
+  const int max_depth = std::max(1, static_cast<int>(std::count(board.begin(), board.end(), EMPTY)));
+  const bool has_deadline = ctx->has_deadline;
+  const std::atomic<bool> *cancel = ctx->cancel;
+  vector<float> values;
+  float previous_best = 0;
+  for (int depth = 1; depth <= max_depth; ++depth) {
+    ctx->has_deadline = has_deadline and depth > 1;
+    ctx->cancel = (depth > 1) ? cancel : nullptr;
+    if (ctx->cancel != nullptr and ctx->cancel->load()) {
+      break;
+    }
+    search_root_moves(board, player, depth, moves, ctx, &values, (depth > 1) ? &previous_best : nullptr);
+    if (ctx->stopped.load()) {
+      break;
+    }
+    previous_best = *std::max_element(values.begin(), values.end());
+
+    *next_move = pick_best_move(board, player, moves, values, *ctx);
+    *depth_reached = depth;
+
+    vector<size_t> order(moves.size());
+    std::iota(order.begin(), order.end(), 0);
+    std::stable_sort(order.begin(), order.end(), [&](size_t a, size_t b) {
+      return values[a] > values[b];
+    });
+    vector<Position> sorted_moves;
+    for (auto i : order) {
+      sorted_moves.push_back(moves[i]);
+    }
+    moves = sorted_moves;
+  }
+  ctx->has_deadline = has_deadline;
+  ctx->cancel = cancel;
+  return true;
+}
+
+// Exact endgame solver. Works on bitboards, where bit `x + 8 * y` is square (x, y), from the perspective of the player
+// to move (`own`) and the opponent (`opp`). Values are final disk differences, own minus opponent, with perfect play by
+// both sides. There are no heuristic calls.
+
+constexpr int kEndgameInfinity = 65;
+// Nodes with at least this many empty squares check the deadline and use the transposition table.
+constexpr int kEndgameTableMinEmpties = 8;
+// Nodes with more empty squares than this order moves by the opponent's mobility (fastest-first). Nodes with fewer
+// only order by parity.
+constexpr int kFastestFirstMinEmpties = 7;
+// Mixed into endgame table keys, so that they don't collide with the keys of heuristic searches.
+constexpr uint64_t kEndgameKeySeed = 0xD6E8FEB86659FD93ULL;
+
+inline uint64_t endgame_key(uint64_t own, uint64_t opp) {
+  // splitmix64 finalizer.
+  auto mix = [](uint64_t x) {
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+    return x ^ (x >> 31);
+  };
+  return mix(own ^ kEndgameKeySeed) ^ mix(opp + kEndgameKeySeed);
+}
+
+// Quadrant of each square, as a bit. Parity of the number of empty squares in each quadrant is tracked, because
+// playing into a region with an odd number of empties tends to give the last move in that region.
+inline uint8_t quadrant_bit(int square) {
+  return static_cast<uint8_t>(1 << (((square % 8) >= 4) + 2 * ((square / 8) >= 4)));
+}
+
+// Solves one position. Keeps a linked list of the empty squares, in the order of `order_moves`, and the parity of each
+// quadrant. Each thread needs its own solver.
+class EndgameSolver {
+ public:
+  EndgameSolver(const array<uint8_t, 64> &board, SearchContext *ctx) : ctx_(ctx), counters_(ctx->thread_counters()) {
+    static const array<uint8_t, 64> square_order = [] {
+      vector<Position> squares;
+      for (uint8_t y = 0; y < 8; ++y) {
+        for (uint8_t x = 0; x < 8; ++x) {
+          squares.push_back(Position{x, y});
+        }
+      }
+      order_moves(&squares);
+      array<uint8_t, 64> ret{};
+      for (int i = 0; i < 64; ++i) {
+        ret[i] = static_cast<uint8_t>(squares[i].x + squares[i].y * 8);
+      }
+      return ret;
+    }();
+
+    int previous = kHead;
+    for (auto square : square_order) {
+      if (board[square] == EMPTY) {
+        next_[previous] = square;
+        previous_[square] = static_cast<uint8_t>(previous);
+        previous = square;
+        parity_ ^= quadrant_bit(square);
+        ++num_empties_;
+      }
+    }
+    next_[previous] = kTail;
+  }
+
+  int num_empties() const {
+    return num_empties_;
+  }
+
+  // Fail-soft alpha-beta. Returns 0 if `ctx` is stopped.
+  int solve(uint64_t own, uint64_t opp, int alpha, int beta, bool passed = false) {
+    if (counters_ != nullptr) {
+      ++counters_->nodes;
+    }
+    if (num_empties_ == 0) {
+      return popcount64(own) - popcount64(opp);
+    }
+    if (num_empties_ < kEndgameTableMinEmpties) {
+      return solve_shallow(own, opp, alpha, beta, passed);
+    }
+    if (ctx_->check_stop()) {
+      return 0;
+    }
+    return solve_deep(own, opp, alpha, beta, passed);
+  }
+
+  // Plays `square` and returns the flipped disks, which `undo` takes.
+  uint64_t play(uint64_t *own, uint64_t *opp, int square) {
+    uint64_t flipped = flipped_bits(*own, *opp, square);
+    *own |= flipped | (uint64_t{1} << square);
+    *opp ^= flipped;
+    remove_empty(square);
+    return flipped;
+  }
+
+  void undo(uint64_t *own, uint64_t *opp, int square, uint64_t flipped) {
+    *own ^= flipped | (uint64_t{1} << square);
+    *opp |= flipped;
+    restore_empty(square);
+  }
+
+ private:
+  static constexpr int kHead = 64;
+  static constexpr uint8_t kTail = 65;
+
+  void remove_empty(int square) {
+    next_[previous_[square]] = next_[square];
+    previous_[next_[square]] = previous_[square];
+    parity_ ^= quadrant_bit(square);
+    --num_empties_;
+  }
+
+  // Squares must be restored in the reverse order of their removal.
+  void restore_empty(int square) {
+    next_[previous_[square]] = static_cast<uint8_t>(square);
+    previous_[next_[square]] = static_cast<uint8_t>(square);
+    parity_ ^= quadrant_bit(square);
+    ++num_empties_;
+  }
+
+  // `own` has no legal move.
+  int solve_pass(uint64_t own, uint64_t opp, int alpha, int beta, bool passed) {
+    if (passed) {
+      // Neither player can move.
+      return popcount64(own) - popcount64(opp);
+    }
+    return -solve(opp, own, -beta, -alpha, true);
+  }
+
+  // Squares in odd quadrants first, without move generation.
+  int solve_shallow(uint64_t own, uint64_t opp, int alpha, int beta, bool passed) {
+    int best = -kEndgameInfinity;
+    for (int odd = 1; odd >= 0; --odd) {
+      for (int square = next_[kHead]; square != kTail; square = next_[square]) {
+        if (((parity_ & quadrant_bit(square)) != 0) != (odd == 1)) {
+          continue;
+        }
+        if (flipped_bits(own, opp, square) == 0) {
+          continue;
+        }
+        uint64_t flipped = play(&own, &opp, square);
+        int value = -solve(opp, own, -beta, -alpha);
+        undo(&own, &opp, square, flipped);
+
+        if (value > best) {
+          best = value;
+          if (value > alpha) {
+            alpha = value;
+            if (alpha >= beta) {
+              return best;
+            }
+          }
+        }
+      }
+    }
+    if (best == -kEndgameInfinity) {
+      return solve_pass(own, opp, alpha, beta, passed);
+    }
+    return best;
+  }
+
+  struct EndgameMove {
+    int square;
+    int priority;
+  };
+
+  // Moves that leave the opponent fewer replies first (fastest-first), then moves into odd quadrants.
+  int solve_deep(uint64_t own, uint64_t opp, int alpha, int beta, bool passed) {
+    const int alpha_orig = alpha;
+    const uint64_t key = endgame_key(own, opp);
+    TTEntry tt_entry;
+    bool is_valid_lookup = ctx_->table->probe(key, &tt_entry);
+    if (counters_ != nullptr) {
+      ++counters_->tt_probes;
+      counters_->tt_hits += is_valid_lookup;
+    }
+    if (is_valid_lookup) {
+      const int value = static_cast<int>(tt_entry.value);
+      if (tt_entry.flag == TTFlag::EXACT) {
+        count_tt_cutoff();
+        return value;
+      } else if (tt_entry.flag == TTFlag::LOWERBOUND) {
+        alpha = std::max(alpha, value);
+      } else {  // UPPERBOUND
+        beta = std::min(beta, value);
+      }
+      if (alpha >= beta) {
+        count_tt_cutoff();
+        return value;
+      }
+    }
+
+    EndgameMove moves[64];
+    int num_moves = 0;
+    uint64_t legal = legal_moves_bits(own, opp);
+    for (int square = next_[kHead]; square != kTail; square = next_[square]) {
+      if ((legal >> square & 1) == 0) {
+        continue;
+      }
+      int priority;
+      if (is_valid_lookup and square == tt_entry.best_move) {
+        priority = std::numeric_limits<int>::min();
+      } else {
+        uint64_t next_own = own;
+        uint64_t next_opp = opp;
+        play(&next_own, &next_opp, square);
+        priority = 2 * popcount64(legal_moves_bits(next_opp, next_own));
+        restore_empty(square);
+        if ((parity_ & quadrant_bit(square)) == 0) {
+          ++priority;
+        }
+      }
+      moves[num_moves++] = EndgameMove{square, priority};
+    }
+    if (num_moves == 0) {
+      return solve_pass(own, opp, alpha, beta, passed);
+    }
+    std::stable_sort(moves, moves + num_moves, [](const EndgameMove &a, const EndgameMove &b) {
+      return a.priority < b.priority;
+    });
+
+    int best = -kEndgameInfinity;
+    uint8_t best_move = EMPTY;
+    for (int i = 0; i < num_moves; ++i) {
+      const int square = moves[i].square;
+      uint64_t flipped = play(&own, &opp, square);
+      int value = -solve(opp, own, -beta, -alpha);
+      undo(&own, &opp, square, flipped);
+
+      if (value > best) {
+        best = value;
+        best_move = static_cast<uint8_t>(square);
+        alpha = std::max(alpha, value);
+        if (alpha >= beta) {
+          if (counters_ != nullptr) {
+            ++counters_->beta_cutoffs;
+            counters_->first_move_cutoffs += (i == 0);
+            counters_->cutoff_move_index_sum += i;
+          }
+          break;
+        }
+      }
+    }
+
+    if (ctx_->stopped.load(std::memory_order_relaxed)) {
+      return 0;
+    }
+
+    TTFlag flag;
+    if (best <= alpha_orig) {
+      flag = TTFlag::UPPERBOUND;
+      best_move = EMPTY;
+    } else if (best >= beta) {
+      flag = TTFlag::LOWERBOUND;
+    } else {
+      flag = TTFlag::EXACT;
+    }
+    ctx_->table->store(key, static_cast<float>(best), flag, num_empties_, best_move);
+    if (counters_ != nullptr) {
+      ++counters_->tt_stores;
+    }
+    return best;
+  }
+
+  void count_tt_cutoff() {
+    if (counters_ != nullptr) {
+      ++counters_->tt_cutoffs;
+    }
+  }
+
+  SearchContext *ctx_;
+  SearchCounters *counters_;  // This thread's, or null.
+  uint8_t next_[66];
+  uint8_t previous_[66];
+  uint8_t parity_ = 0;
+  int num_empties_ = 0;
+};
+
+int num_empty_squares(const array<uint8_t, 64> &board) {
+  return static_cast<int>(std::count(board.begin(), board.end(), EMPTY));
+}
+
+// Exact final disk difference for `player`, who is to move, with perfect play.
+int solve_endgame(const array<uint8_t, 64> &board, uint8_t player, SearchContext *ctx) {
+  uint64_t own, opp;
+  bitboards_from_board(board, player, &own, &opp);
+  EndgameSolver solver(board, ctx);
+  return solver.solve(own, opp, -kEndgameInfinity, kEndgameInfinity);
+}
+
+// Same as `search_root_moves`, but values are exact final disk differences. `values[i]` is exact if `moves[i]` is among
+// the best moves, and lower than the best value otherwise.
+void solve_root_moves(const array<uint8_t, 64> &board, uint8_t player, const vector<Position> &moves,
+                      SearchContext *ctx, vector<float> *values) {
+  uint64_t own, opp;
+  bitboards_from_board(board, player, &own, &opp);
+  values->resize(moves.size());
+
+  EndgameSolver first_solver(board, ctx);
+  uint64_t next_own = own, next_opp = opp;
+  first_solver.play(&next_own, &next_opp, moves[0].x + moves[0].y * 8);
+  int best = -first_solver.solve(next_opp, next_own, -kEndgameInfinity, kEndgameInfinity);
+  (*values)[0] = static_cast<float>(best);
+
+#pragma omp parallel for schedule(dynamic, 1) num_threads(num_search_threads(ctx))
+  for (int j = 1; j < moves.size(); ++j) {
+    int alpha;
+#pragma omp critical(solve_root)
+    {
+      // Window just below the best value, so that moves of equal value are solved exactly.
+      alpha = best - 1;
+    };
+
+    EndgameSolver solver(board, ctx);
+    uint64_t child_own = own, child_opp = opp;
+    solver.play(&child_own, &child_opp, moves[j].x + moves[j].y * 8);
+    int value = -solver.solve(child_opp, child_own, -kEndgameInfinity, -alpha);
+    (*values)[j] = static_cast<float>(value);
+
+#pragma omp critical(solve_root)
+    {
+      best = std::max(best, value);
+    };
+  }
+}
+
+// Picks one of the moves with the best final disk difference, which is `margin`. Returns false without solving if
+// `player` has no legal move. Results are meaningless if `ctx` is stopped.
+bool solve_next_move(const array<uint8_t, 64> &board, uint8_t player, SearchContext *ctx, Position *next_move,
+                     int *margin) {
+  vector<Position> moves;
+  if (find_valid_moves(board, player, &moves) == 0) {
+    return false;
+  }
+  order_moves(&moves);
+  vector<float> values;
+  solve_root_moves(board, player, moves, ctx, &values);
+  *next_move = pick_best_move(board, player, moves, values, *ctx);
+  *margin = static_cast<int>(*std::max_element(values.begin(), values.end()));
+  return true;
+}
@@ -1,30 +1,523 @@
 #include <cstdint>
 #include "othello.h"
 
+// Search settings of one side of a game played by `play_games`. Mirrored by `othello_ctypes.PlayerConfig`.
+struct PlayerConfig {
+  uint8_t strategy;
+  uint8_t depth;  // Ignored if `time_budget_ms` is not 0.
+  uint8_t endgame_empties;  // See `best_move`.
+  uint8_t num_threads;  // Search threads per move. 0 means the OpenMP default.
+  uint32_t time_budget_ms;  // If not 0, each move is searched with `best_move_timed` instead of to `depth`.
+  uint32_t options;  // See `best_move`.
+};
+
+constexpr int kMaxGameMoves = 60;
+
+// Mirrored by `othello_ctypes.GAME_RECORD_DTYPE`. Passes are not recorded.
+struct GameRecord {
+  float seconds[kMaxGameMoves];  // Search time of each move.
+  uint8_t moves[kMaxGameMoves];  // Linear index of each move.
+  uint8_t players[kMaxGameMoves];  // BLACK or WHITE.
+  uint8_t depths[kMaxGameMoves];  // Depth of each search. See `best_move_timed`.
+  uint8_t num_moves;
+  uint8_t black_score;
+  uint8_t white_score;
+};
+
+static_assert(sizeof(GameRecord) == 424, "GameRecord layout changed. Update othello_ctypes.GAME_RECORD_DTYPE.");
+
+// Instrumentation of one call to `best_move` or `best_move_timed`. Mirrored by `othello_ctypes.SEARCH_STATS_DTYPE`.
+struct SearchStats {
+  SearchCounters threads[kMaxCounterThreads];  // Indexed by OpenMP thread number. See `SearchCounters`.
+  double seconds;  // Measured in C++, around the search only.
+  uint32_t depth;  // Depth of the search the move comes from. The number of empty squares if solved.
+  uint32_t num_threads;  // Search threads used.
+};
+
+static_assert(sizeof(SearchStats) == 8256, "SearchStats layout changed. Update othello_ctypes.SEARCH_STATS_DTYPE.");
+
+// One position of a game played by `self_play_games`. Mirrored by `othello_ctypes.POSITION_RECORD_DTYPE`.
+struct PositionRecord {
+  uint64_t black;  // Bitboards. Bit `x + 8 * y` is square (x, y).
+  uint64_t white;
+  float score;  // Value of `best_move` for `player`. The final disk difference with perfect play if solved.
+  uint8_t player;  // To move. BLACK or WHITE.
+  uint8_t best_move;  // Linear index of the move found by the search. Not the move played after a random opening move.
+  uint8_t depth;  // Of the search. The number of empty squares if solved.
+  int8_t outcome;  // Final disk difference of the game, for `player`.
+};
+
+static_assert(sizeof(PositionRecord) == 24,
+              "PositionRecord layout changed. Update othello_ctypes.POSITION_RECORD_DTYPE.");
+
 extern "C" {
-void best_move(const char *board_str, uint8_t player, uint8_t strategy, uint8_t depth, uint8_t *out_x, uint8_t *out_y);
+void *tt_create(uint8_t size_log2);
+void tt_clear(void *table);
+void tt_destroy(void *table);
+void *search_control_create();
+void search_control_cancel(void *control);
+void search_control_reset(void *control);
+void search_control_destroy(void *control);
+void best_move(const char *board_str, uint8_t player, uint8_t strategy, uint8_t depth, uint8_t tt_size_log2,
+               void *table, uint8_t num_threads, uint8_t endgame_empties, uint32_t options, const uint64_t *seed,
+               const void *control, uint8_t *out_x, uint8_t *out_y, SearchStats *out_stats);
+void best_move_timed(const char *board_str, uint8_t player, uint8_t strategy, uint32_t time_budget_ms,
+                     uint8_t tt_size_log2, void *table, uint8_t num_threads, uint8_t endgame_empties, uint32_t options,
+                     const uint64_t *seed, const void *control, uint8_t *out_x, uint8_t *out_y, uint8_t *out_depth,
+                     SearchStats *out_stats);
+void solve_endgame(const char *board_str, uint8_t player, uint8_t tt_size_log2, void *table, uint8_t num_threads,
+                   uint8_t *out_x, uint8_t *out_y, int8_t *out_margin);
+void best_moves_batch(const uint8_t *boards, uint32_t num_boards, const uint8_t *players, const uint8_t *strategies,
+                      const uint8_t *depths, uint8_t tt_size_log2, void *table, uint8_t num_threads,
+                      uint32_t options, const uint64_t *seed, uint8_t *out_moves, float *out_scores);
+void best_move_squares(const uint8_t *squares, uint8_t player, uint8_t strategy, uint8_t depth, uint8_t tt_size_log2,
+                       void *table, uint8_t num_threads, uint8_t endgame_empties, uint32_t options,
+                       const uint64_t *seed, const void *control, uint8_t *out_x, uint8_t *out_y,
+                       SearchStats *out_stats);
+void best_move_timed_squares(const uint8_t *squares, uint8_t player, uint8_t strategy, uint32_t time_budget_ms,
+                             uint8_t tt_size_log2, void *table, uint8_t num_threads, uint8_t endgame_empties,
+                             uint32_t options, const uint64_t *seed, const void *control, uint8_t *out_x,
+                             uint8_t *out_y, uint8_t *out_depth, SearchStats *out_stats);
+uint8_t apply_move_squares(uint8_t *squares, uint8_t player, uint8_t square);
+uint64_t legal_moves_squares(const uint8_t *squares, uint8_t player);
+float heuristic_squares(const uint8_t *squares, uint8_t player, uint8_t strategy);
+uint8_t pattern_weights_load(const char *filename);
+void play_games(const PlayerConfig *black, const PlayerConfig *white, const uint8_t *start_squares,
+                const uint64_t *seeds, uint32_t num_games, uint8_t tt_size_log2, uint8_t num_threads,
+                GameRecord *out_records);
+void self_play_games(const PlayerConfig *config, const uint64_t *seeds, uint32_t num_games, uint8_t num_random_moves,
+                     uint8_t tt_size_log2, uint8_t num_threads, PositionRecord *out_positions,
+                     uint8_t *out_num_positions);
+}
+
+void *tt_create(uint8_t size_log2) {
+  return new TranspositionTable(size_log2);
+}
+
+void tt_clear(void *table) {
+  static_cast<TranspositionTable *>(table)->clear();
+}
+
+void tt_destroy(void *table) {
+  delete static_cast<TranspositionTable *>(table);
+}
+
+// A flag that stops the searches it is passed to, when set from another thread.
+void *search_control_create() {
+  return new std::atomic<bool>(false);
+}
+
+void search_control_cancel(void *control) {
+  static_cast<std::atomic<bool> *>(control)->store(true);
+}
+
+void search_control_reset(void *control) {
+  static_cast<std::atomic<bool> *>(control)->store(false);
+}
+
+void search_control_destroy(void *control) {
+  delete static_cast<std::atomic<bool> *>(control);
+}
+
+// If `table` is null, a temporary table of 2^tt_size_log2 buckets is used. Otherwise `table` must come from `tt_create`
+// and `tt_size_log2` is ignored. `num_threads` is the number of search threads, or 0 for the OpenMP default. Positions
+// with at most `endgame_empties` empty squares are solved exactly instead of searched to `depth`. 0 disables the
+// solver. `options` is a combination of the `SearchContext::options` bits, such as `kOrderKillers`. If `seed` is not
+// null, the search is deterministic: the move only depends on the board, `depth` and `*seed`, whatever `num_threads`
+// and the contents of `table`. See `SearchContext::deterministic`. If `control` is not null, it comes from
+// `search_control_create`, and `search_control_cancel` stops the search, which then leaves `out_x` and `out_y`
+// unchanged. If `out_stats` is not null, the search is instrumented and its counters are written there.
+void best_move(const char *board_str, uint8_t player, uint8_t strategy, uint8_t depth, uint8_t tt_size_log2,
+               void *table, uint8_t num_threads, uint8_t endgame_empties, uint32_t options, const uint64_t *seed,
+               const void *control, uint8_t *out_x, uint8_t *out_y, SearchStats *out_stats) {
+  array<uint8_t, 64> board = board_from_string(board_str);
+  best_move_squares(board.data(), player, strategy, depth, tt_size_log2, table, num_threads, endgame_empties, options,
+                    seed, control, out_x, out_y, out_stats);
+}
+
+static void set_seed(const uint64_t *seed, SearchContext *ctx) {
+  if (seed != nullptr) {
+    ctx->deterministic = true;
+    ctx->seed = *seed;
+  }
+}
+
+static void set_control(const void *control, SearchContext *ctx) {
+  ctx->cancel = static_cast<const std::atomic<bool> *>(control);
+}
+
+// Zeroes `stats`, if not null, and makes `ctx` count into it. Returns the start time of the search.
+static std::chrono::steady_clock::time_point start_stats(SearchStats *stats, SearchContext *ctx) {
+  if (stats != nullptr) {
+    *stats = SearchStats{};
+    ctx->counters = stats->threads;
+  }
+  return std::chrono::steady_clock::now();
+}
+
+static void finish_stats(const SearchContext &ctx, std::chrono::steady_clock::time_point start_time, int depth,
+                         SearchStats *stats) {
+  if (stats != nullptr) {
+    stats->seconds = std::chrono::duration<double>(std::chrono::steady_clock::now() - start_time).count();
+    stats->depth = static_cast<uint32_t>(depth);
+    stats->num_threads = static_cast<uint32_t>(num_search_threads(&ctx));
+  }
+}
+
+// Same as `best_move`, except the board is read in place from 64 squares in row-major order, each BLACK, WHITE or
+// EMPTY.
+void best_move_squares(const uint8_t *squares, uint8_t player, uint8_t strategy, uint8_t depth, uint8_t tt_size_log2,
+                       void *table, uint8_t num_threads, uint8_t endgame_empties, uint32_t options,
+                       const uint64_t *seed, const void *control, uint8_t *out_x, uint8_t *out_y,
+                       SearchStats *out_stats) {
+  array<uint8_t, 64> board;
+  std::copy(squares, squares + 64, board.begin());
+
+  std::unique_ptr<TranspositionTable> temporary_table;
+  auto *shared_table = static_cast<TranspositionTable *>(table);
+  if (shared_table == nullptr) {
+    temporary_table.reset(new TranspositionTable(tt_size_log2));
+    shared_table = temporary_table.get();
+  }
+  shared_table->new_search();
+
+  SearchContext ctx;
+  ctx.heuristic_type = strategy;
+  ctx.table = shared_table;
+  ctx.num_threads = num_threads;
+  ctx.options = options;
+  set_seed(seed, &ctx);
+  set_control(control, &ctx);
+  const auto search_start_time = start_stats(out_stats, &ctx);
+
+  Position next_move{};
+  bool has_next_move;
+  const int num_empties = num_empty_squares(board);
+  if (num_empties <= endgame_empties) {
+    int margin;
+    has_next_move = solve_next_move(board, player, &ctx, &next_move, &margin);
+  } else {
+    has_next_move = search_next_move(board, player, depth, &ctx, &next_move);
+  }
+  if (has_next_move and !ctx.stopped.load()) {
+    *out_x = next_move.x;
+    *out_y = next_move.y;
+  }
+  finish_stats(ctx, search_start_time, (num_empties <= endgame_empties) ? num_empties : depth, out_stats);
 }
 
-void best_move(const char *board_str, uint8_t player, uint8_t strategy, uint8_t depth, uint8_t *out_x, uint8_t *out_y) {
+// Iterative deepening until `time_budget_ms` passes. `out_depth` is the depth of the deepest completed search, which
+// `out_x` and `out_y` come from. See `best_move` for `tt_size_log2`, `table`, `num_threads`, `endgame_empties`,
+// `options`, `seed`, `control` and `out_stats`. With a seed, the move only depends on the depth reached, which still
+// depends on the time. Cancelling through `control` stops the search as if the time had run out. If the endgame solver
+// does not finish in time, the heuristic search is used with what is left of the budget, which always completes depth
+// 1. A solved position reports the number of empty squares as the depth.
+void best_move_timed(const char *board_str, uint8_t player, uint8_t strategy, uint32_t time_budget_ms,
+                     uint8_t tt_size_log2, void *table, uint8_t num_threads, uint8_t endgame_empties, uint32_t options,
+                     const uint64_t *seed, const void *control, uint8_t *out_x, uint8_t *out_y, uint8_t *out_depth,
+                     SearchStats *out_stats) {
   array<uint8_t, 64> board = board_from_string(board_str);
+  best_move_timed_squares(board.data(), player, strategy, time_budget_ms, tt_size_log2, table, num_threads,
+                          endgame_empties, options, seed, control, out_x, out_y, out_depth, out_stats);
+}
+
+// Same as `best_move_timed`, except the board is read in place. See `best_move_squares`.
+void best_move_timed_squares(const uint8_t *squares, uint8_t player, uint8_t strategy, uint32_t time_budget_ms,
+                             uint8_t tt_size_log2, void *table, uint8_t num_threads, uint8_t endgame_empties,
+                             uint32_t options, const uint64_t *seed, const void *control, uint8_t *out_x,
+                             uint8_t *out_y, uint8_t *out_depth, SearchStats *out_stats) {
+  const auto start_time = std::chrono::steady_clock::now();
+  array<uint8_t, 64> board;
+  std::copy(squares, squares + 64, board.begin());
 
-  // TODO: select based on `strategy`.
+  std::unique_ptr<TranspositionTable> temporary_table;
+  auto *shared_table = static_cast<TranspositionTable *>(table);
+  if (shared_table == nullptr) {
+    temporary_table.reset(new TranspositionTable(tt_size_log2));
+    shared_table = temporary_table.get();
+  }
+  shared_table->new_search();
 
-//  const auto searcher = [&](const array<uint8_t, 64> &board, uint8_t player, int depth) -> float {
-//    return -minimax(board, player, depth, strategy);
-//  };
-//  const auto searcher = [&](const array<uint8_t, 64> &board, uint8_t player, int depth) -> float {
-//    return -minimax_ab(board, player, depth, -kInfinity, kInfinity, strategy);
-//  };
-  auto searcher = [&](const array<uint8_t, 64> &board, uint8_t player, int depth) -> float {
-    unordered_map<string, TTEntry> table;
-    return -minimax_ab_transposition(board, player, depth, -kInfinity, kInfinity, strategy, &table);
-  };
+  SearchContext ctx;
+  ctx.heuristic_type = strategy;
+  ctx.table = shared_table;
+  ctx.num_threads = num_threads;
+  ctx.options = options;
+  set_seed(seed, &ctx);
+  set_control(control, &ctx);
+  ctx.has_deadline = true;
+  ctx.deadline = start_time + std::chrono::milliseconds(time_budget_ms);
+  const auto search_start_time = start_stats(out_stats, &ctx);
 
   Position next_move{};
-  bool has_next_move = search_next_move(board, player, depth, searcher, &next_move);
+  int depth_reached = 0;
+  const int num_empties = num_empty_squares(board);
+  if (num_empties <= endgame_empties) {
+    int margin;
+    bool has_next_move = solve_next_move(board, player, &ctx, &next_move, &margin);
+    if (!ctx.stopped.load()) {
+      if (has_next_move) {
+        *out_x = next_move.x;
+        *out_y = next_move.y;
+        *out_depth = static_cast<uint8_t>(num_empties);
+      }
+      finish_stats(ctx, search_start_time, num_empties, out_stats);
+      return;
+    }
+    ctx.stopped.store(false);
+  }
+  bool has_next_move = search_next_move_iterative(board, player, &ctx, &next_move, &depth_reached);
   if (has_next_move) {
     *out_x = next_move.x;
     *out_y = next_move.y;
+    *out_depth = static_cast<uint8_t>(depth_reached);
+  }
+  finish_stats(ctx, search_start_time, depth_reached, out_stats);
+}
+
+// Solves the position exactly. `out_margin` is the final disk difference for `player` with perfect play. `out_x` and
+// `out_y` are one of the best moves, if `player` has a legal move. See `best_move` for `tt_size_log2`, `table` and
+// `num_threads`.
+void solve_endgame(const char *board_str, uint8_t player, uint8_t tt_size_log2, void *table, uint8_t num_threads,
+                   uint8_t *out_x, uint8_t *out_y, int8_t *out_margin) {
+  array<uint8_t, 64> board = board_from_string(board_str);
+
+  std::unique_ptr<TranspositionTable> temporary_table;
+  auto *shared_table = static_cast<TranspositionTable *>(table);
+  if (shared_table == nullptr) {
+    temporary_table.reset(new TranspositionTable(tt_size_log2));
+    shared_table = temporary_table.get();
+  }
+  shared_table->new_search();
+
+  SearchContext ctx;
+  ctx.table = shared_table;
+  ctx.num_threads = num_threads;
+
+  Position next_move{};
+  int margin = 0;
+  if (solve_next_move(board, player, &ctx, &next_move, &margin)) {
+    *out_x = next_move.x;
+    *out_y = next_move.y;
+  } else {
+    margin = solve_endgame(board, player, &ctx);
+  }
+  *out_margin = static_cast<int8_t>(margin);
+}
+
+// Searches `num_boards` boards in parallel, one thread per board. `boards` holds 64 squares per board in row-major
+// order, each BLACK, WHITE or EMPTY. `players`, `strategies` and `depths` hold one value per board. `out_moves[i]` is
+// the linear index of the best move of board i, or EMPTY if there is none, and `out_scores[i]` is its value. All boards
+// share one transposition table. See `best_move` for `tt_size_log2`, `table`, `num_threads`, `options` and `seed`. With
+// a seed, the results do not depend on the number of threads or on which boards share the table.
+void best_moves_batch(const uint8_t *boards, uint32_t num_boards, const uint8_t *players, const uint8_t *strategies,
+                      const uint8_t *depths, uint8_t tt_size_log2, void *table, uint8_t num_threads,
+                      uint32_t options, const uint64_t *seed, uint8_t *out_moves, float *out_scores) {
+  std::unique_ptr<TranspositionTable> temporary_table;
+  auto *shared_table = static_cast<TranspositionTable *>(table);
+  if (shared_table == nullptr) {
+    temporary_table.reset(new TranspositionTable(tt_size_log2));
+    shared_table = temporary_table.get();
+  }
+  shared_table->new_search();
+
+  const int batch_threads = (num_threads > 0) ? num_threads : omp_get_max_threads();
+
+#pragma omp parallel for schedule(dynamic, 1) num_threads(batch_threads)
+  for (int64_t i = 0; i < num_boards; ++i) {
+    array<uint8_t, 64> board;
+    std::copy(boards + i * 64, boards + (i + 1) * 64, board.begin());
+
+    SearchContext ctx;
+    ctx.heuristic_type = strategies[i];
+    ctx.table = shared_table;
+    ctx.num_threads = 1;
+    ctx.options = options;
+    set_seed(seed, &ctx);
+
+    out_moves[i] = EMPTY;
+    out_scores[i] = 0;
+
+    vector<Position> moves;
+    if (find_valid_moves(board, players[i], &moves) == 0) {
+      continue;
+    }
+    order_moves(&moves);
+    vector<float> values;
+    search_root_moves(board, players[i], depths[i], moves, &ctx, &values);
+    Position next_move = pick_best_move(board, players[i], moves, values, ctx);
+    out_moves[i] = static_cast<uint8_t>(next_move.x + next_move.y * 8);
+    out_scores[i] = *std::max_element(values.begin(), values.end());
+  }
+}
+
+// Plays `square` (x + 8 * y) for `player` on the board in `squares`, in place. Returns the number of flipped disks,
+// or 0 if the move is not legal, in which case `squares` is unchanged. See `best_move_squares` for the layout.
+uint8_t apply_move_squares(uint8_t *squares, uint8_t player, uint8_t square) {
+  return static_cast<uint8_t>(play_move_in_place(squares, player, square));
+}
+
+// Bit `x + 8 * y` is set if (x, y) is a legal move for `player`.
+uint64_t legal_moves_squares(const uint8_t *squares, uint8_t player) {
+  uint64_t own, opp;
+  bitboards_from_squares(squares, player, &own, &opp);
+  return legal_moves_bits(own, opp);
+}
+
+// Static evaluation of the board for `player`, as at the horizon of a search with `strategy`.
+float heuristic_squares(const uint8_t *squares, uint8_t player, uint8_t strategy) {
+  array<uint8_t, 64> board;
+  std::copy(squares, squares + 64, board.begin());
+  return heuristic(board, player, strategy);
+}
+
+// See `load_pattern_weights`. Returns 1 on success.
+uint8_t pattern_weights_load(const char *filename) {
+  return static_cast<uint8_t>(load_pattern_weights(filename));
+}
+
+// Plays one game from `start_squares` to the end, with black moving first.
+static void play_game(const PlayerConfig &black, const PlayerConfig &white, const uint8_t *start_squares,
+                      TranspositionTable *table, GameRecord *record) {
+  array<uint8_t, 64> board;
+  std::copy(start_squares, start_squares + 64, board.begin());
+  *record = GameRecord{};
+
+  uint8_t player = BLACK;
+  int num_passes = 0;
+  while (num_passes < 2 && record->num_moves < kMaxGameMoves) {
+    const PlayerConfig &config = (player == BLACK) ? black : white;
+    uint8_t x = EMPTY, y = EMPTY, depth = config.depth;
+
+    const auto start_time = std::chrono::steady_clock::now();
+    if (config.time_budget_ms > 0) {
+      best_move_timed_squares(board.data(), player, config.strategy, config.time_budget_ms, 0, table,
+                              config.num_threads, config.endgame_empties, config.options, nullptr, nullptr, &x, &y,
+                              &depth, nullptr);
+    } else {
+      best_move_squares(board.data(), player, config.strategy, config.depth, 0, table, config.num_threads,
+                        config.endgame_empties, config.options, nullptr, nullptr, &x, &y, nullptr);
+      // The solver's depth, as in `best_move_timed`.
+      const int num_empties = num_empty_squares(board);
+      if (num_empties <= config.endgame_empties) {
+        depth = static_cast<uint8_t>(num_empties);
+      }
+    }
+    const std::chrono::duration<float> elapsed = std::chrono::steady_clock::now() - start_time;
+
+    if (x == EMPTY) {
+      ++num_passes;
+    } else {
+      num_passes = 0;
+      const int i = record->num_moves++;
+      record->seconds[i] = elapsed.count();
+      record->moves[i] = static_cast<uint8_t>(x + y * 8);
+      record->players[i] = player;
+      record->depths[i] = depth;
+      play_move_in_place(board.data(), player, x + y * 8);
+    }
+    player = get_opponent(player);
+  }
+
+  record->black_score = static_cast<uint8_t>(std::count(board.begin(), board.end(), BLACK));
+  record->white_score = static_cast<uint8_t>(std::count(board.begin(), board.end(), WHITE));
+}
+
+// Plays `num_games` games between `black` and `white` in parallel, one thread per game, without returning to the
+// caller between moves. `start_squares` is the starting board in the layout of `best_move_squares`, or null for the
+// standard starting position. Each game has its own transposition table of 2^tt_size_log2 buckets, and seeds the random
+// tie-breaking of its thread with `seeds[i]`, so a game is reproducible when its searches are single-threaded.
+// `num_threads` is the number of games played at the same time, or 0 for the OpenMP default.
+void play_games(const PlayerConfig *black, const PlayerConfig *white, const uint8_t *start_squares,
+                const uint64_t *seeds, uint32_t num_games, uint8_t tt_size_log2, uint8_t num_threads,
+                GameRecord *out_records) {
+  array<uint8_t, 64> standard_start;
+  if (start_squares == nullptr) {
+    standard_start = board_from_string("...........................WB......BW...........................");
+    start_squares = standard_start.data();
+  }
+
+  const int game_threads = (num_threads > 0) ? num_threads : omp_get_max_threads();
+
+#pragma omp parallel for schedule(dynamic, 1) num_threads(game_threads)
+  for (int64_t i = 0; i < num_games; ++i) {
+    TranspositionTable table(tt_size_log2);
+    std::seed_seq seed{static_cast<uint32_t>(seeds[i]), static_cast<uint32_t>(seeds[i] >> 32)};
+    RandomEngine().seed(seed);
+    play_game(*black, *white, start_squares, &table, &out_records[i]);
+  }
+}
+
+// Plays one game by `config` against itself from the standard starting position, and records every position where a
+// player has a legal move. Returns the number of positions.
+static int self_play_game(const PlayerConfig &config, int num_random_moves, TranspositionTable *table,
+                          PositionRecord *positions) {
+  array<uint8_t, 64> board = board_from_string("...........................WB......BW...........................");
+  int num_positions = 0;
+  uint8_t player = BLACK;
+  int num_passes = 0;
+  while (num_passes < 2 && num_positions < kMaxGameMoves) {
+    vector<Position> moves;
+    if (find_valid_moves(board, player, &moves) == 0) {
+      ++num_passes;
+      player = get_opponent(player);
+      continue;
+    }
+    num_passes = 0;
+    order_moves(&moves);
+    table->new_search();
+    SearchContext ctx;
+    ctx.heuristic_type = config.strategy;
+    ctx.table = table;
+    ctx.num_threads = config.num_threads;
+    ctx.options = config.options;
+
+    PositionRecord &record = positions[num_positions++];
+    bitboards_from_board(board, BLACK, &record.black, &record.white);
+    record.player = player;
+    vector<float> values;
+    const int num_empties = num_empty_squares(board);
+    if (num_empties <= config.endgame_empties) {
+      solve_root_moves(board, player, moves, &ctx, &values);
+      record.depth = static_cast<uint8_t>(num_empties);
+    } else {
+      search_root_moves(board, player, config.depth, moves, &ctx, &values);
+      record.depth = config.depth;
+    }
+    Position move = pick_best_move(board, player, moves, values, ctx);
+    record.best_move = static_cast<uint8_t>(move.x + move.y * 8);
+    record.score = *std::max_element(values.begin(), values.end());
+
+    if (num_positions <= num_random_moves) {
+      move = moves[std::uniform_int_distribution<size_t>{0, moves.size() - 1}(RandomEngine())];
+    }
+    apply_move(&board, player, move);
+    player = get_opponent(player);
+  }
+
+  const int margin = static_cast<int>(std::count(board.begin(), board.end(), BLACK))
+      - static_cast<int>(std::count(board.begin(), board.end(), WHITE));
+  for (int i = 0; i < num_positions; ++i) {
+    positions[i].outcome = static_cast<int8_t>(positions[i].player == BLACK ? margin : -margin);
+  }
+  return num_positions;
+}
+
+// Plays `num_games` games of `config` against itself in parallel, one thread per game, to record training positions.
+// The first `num_random_moves` moves of each game are picked at random, but their positions are still searched and
+// recorded. `config.time_budget_ms` is ignored. Game i writes its positions to `out_positions[i * kMaxGameMoves]`
+// onwards, and their number to `out_num_positions[i]`. See `play_games` for `seeds`, `tt_size_log2` and `num_threads`.
+void self_play_games(const PlayerConfig *config, const uint64_t *seeds, uint32_t num_games, uint8_t num_random_moves,
+                     uint8_t tt_size_log2, uint8_t num_threads, PositionRecord *out_positions,
+                     uint8_t *out_num_positions) {
+  const int game_threads = (num_threads > 0) ? num_threads : omp_get_max_threads();
+
+#pragma omp parallel for schedule(dynamic, 1) num_threads(game_threads)
+  for (int64_t i = 0; i < num_games; ++i) {
+    TranspositionTable table(tt_size_log2);
+    std::seed_seq seed{static_cast<uint32_t>(seeds[i]), static_cast<uint32_t>(seeds[i] >> 32)};
+    RandomEngine().seed(seed);
+    out_num_positions[i] = static_cast<uint8_t>(self_play_game(*config, num_random_moves, &table,
+                                                               out_positions + i * kMaxGameMoves));
   }
 }
@@ -28,6 +28,150 @@ TEST_CASE("ApplyMove", "flip") {
   REQUIRE(board[8 * 7 + 2] == WHITE);
 }
 
+TEST_CASE("PlayMoveInPlace", "same as apply_move") {
+  const array<uint8_t, 64> board =
+      board_from_string("..................WBBW....WBWB....WBB.....WWWW.....BW.....WB.W..");
+  for (uint8_t player : {BLACK, WHITE}) {
+    for (int square = 0; square < 64; ++square) {
+      array<uint8_t, 64> in_place = board;
+      const int num_flipped = play_move_in_place(in_place.data(), player, square);
+      const Position pos{.x = static_cast<uint8_t>(square % 8), .y = static_cast<uint8_t>(square / 8)};
+      if (board[square] != EMPTY || !is_valid_move(board, player, pos)) {
+        REQUIRE(num_flipped == 0);
+        REQUIRE(in_place == board);
+        continue;
+      }
+      array<uint8_t, 64> expected = board;
+      apply_move(&expected, player, pos);
+      REQUIRE(in_place == expected);
+      REQUIRE(num_flipped == std::count(expected.begin(), expected.end(), player) -
+                             std::count(board.begin(), board.end(), player) - 1);
+    }
+  }
+}
+
+TEST_CASE("ZobristHash", "incremental update") {
+  array<uint8_t, 64> board = board_from_string("..................WBBW....WBWB....WBB.....WWWW.....BW.....WB.W..");
+  uint64_t hash = zobrist_hash(board);
+  Position pos{.x = 2, .y=6};
+  apply_move(&board, BLACK, pos, &hash);
+  REQUIRE(hash == zobrist_hash(board));
+
+  pos = Position{.x = 3, .y=7};
+  apply_move(&board, WHITE, pos, &hash);
+  REQUIRE(hash == zobrist_hash(board));
+  REQUIRE(tt_key(hash, BLACK, 0) != tt_key(hash, WHITE, 0));
+  REQUIRE(tt_key(hash, BLACK, 0) != tt_key(hash, BLACK, 8));
+}
+
+TEST_CASE("SearchState", "incremental update") {
+  std::mt19937 engine(2);
+  array<uint8_t, 64> board = board_from_string("...........................WB......BW...........................");
+  SearchState state = make_search_state(board);
+  uint8_t player = BLACK;
+  while (true) {
+    vector<Position> moves;
+    if (find_valid_moves(board, player, &moves) == 0) {
+      if (!any_valid_move(board, get_opponent(player))) {
+        break;
+      }
+      player = get_opponent(player);
+      continue;
+    }
+    vector<Position> state_moves;
+    REQUIRE(find_valid_moves(state, player, &state_moves) == moves.size());
+
+    auto move_pos = moves[std::uniform_int_distribution<size_t>{0, moves.size() - 1}(engine)];
+    apply_move(&board, player, move_pos);
+    apply_move(&state, player, move_pos.x + move_pos.y * 8);
+    player = get_opponent(player);
+
+    SearchState expected = make_search_state(board);
+    REQUIRE(state.disks[BLACK] == expected.disks[BLACK]);
+    REQUIRE(state.disks[WHITE] == expected.disks[WHITE]);
+    REQUIRE(state.hash == expected.hash);
+    for (int heuristic_type = 0; heuristic_type <= 8; ++heuristic_type) {
+      REQUIRE(heuristic(state, player, heuristic_type) == heuristic(board, player, heuristic_type));
+    }
+  }
+}
+
+TEST_CASE("StableBits", "never flipped") {
+  // Corners are stable. So is the edge next to a corner of the same color. The X-square is not.
+  array<uint8_t, 64> board = board_from_string("BBW.............B...............................................");
+  SearchState state = make_search_state(board);
+  REQUIRE(stable_bits(state.disks[BLACK], state.disks[WHITE]) == 0b11);
+
+  // Every disk of a full board is stable.
+  board.fill(WHITE);
+  board[27] = BLACK;
+  state = make_search_state(board);
+  REQUIRE(stable_bits(state.disks[BLACK], state.disks[WHITE]) == ~uint64_t{0});
+
+  std::mt19937 engine(3);
+  for (int game = 0; game < 40; ++game) {
+    board = board_from_string("...........................WB......BW...........................");
+    uint8_t player = BLACK;
+    const int num_moves = std::uniform_int_distribution<int>{20, 58}(engine);
+    for (int i = 0; i < num_moves; ++i) {
+      vector<Position> moves;
+      if (find_valid_moves(board, player, &moves) > 0) {
+        apply_move(&board, player, moves[std::uniform_int_distribution<size_t>{0, moves.size() - 1}(engine)]);
+      }
+      player = get_opponent(player);
+    }
+    state = make_search_state(board);
+    const uint64_t stable = stable_bits(state.disks[BLACK], state.disks[WHITE]);
+
+    // Stable disks keep their color in random continuations.
+    for (int playout = 0; playout < 20; ++playout) {
+      SearchState next_state = state;
+      uint8_t next_player = player;
+      for (int num_passes = 0; num_passes < 2;) {
+        vector<Position> moves;
+        if (find_valid_moves(next_state, next_player, &moves) > 0) {
+          auto move_pos = moves[std::uniform_int_distribution<size_t>{0, moves.size() - 1}(engine)];
+          apply_move(&next_state, next_player, move_pos.x + move_pos.y * 8);
+          num_passes = 0;
+        } else {
+          ++num_passes;
+        }
+        next_player = get_opponent(next_player);
+        REQUIRE((next_state.disks[BLACK] & stable) == (state.disks[BLACK] & stable));
+      }
+    }
+  }
+}
+
+TEST_CASE("TranspositionTable", "store and replace") {
+  TranspositionTable table(1);
+  TTEntry entry{};
+  REQUIRE_FALSE(table.probe(42, &entry));
+
+  table.store(42, 1.5f, TTFlag::EXACT, 3);
+  REQUIRE(table.probe(42, &entry));
+  REQUIRE(entry.value == 1.5f);
+  REQUIRE(entry.flag == TTFlag::EXACT);
+  REQUIRE(entry.depth == 3);
+
+  // A shallower result for the same position does not replace a deeper one from the same search.
+  table.store(42, 2.5f, TTFlag::LOWERBOUND, 2);
+  REQUIRE(table.probe(42, &entry));
+  REQUIRE(entry.value == 1.5f);
+
+  // Fill the bucket. Keys 0, 2, 4, ... share bucket 0.
+  for (uint64_t key = 2; key <= 2 * TranspositionTable::kBucketSize; key += 2) {
+    table.store(key, 0.0f, TTFlag::EXACT, 5);
+  }
+  REQUIRE(table.probe(2 * TranspositionTable::kBucketSize, &entry));
+
+  // Entries from an older search are replaced before deeper ones from the current search.
+  table.new_search();
+  REQUIRE(table.probe(2, &entry));
+  table.store(1000, 0.0f, TTFlag::EXACT, 1);
+  REQUIRE(table.probe(1000, &entry));
+}
+
 // https://stackoverflow.com/questions/17074324/how-can-i-sort-two-vectors-in-the-same-way-with-criteria-that-uses-only-one-of
 template<typename T, typename Compare>
 std::vector<std::size_t> sort_permutation(
@@ -258,7 +402,7 @@ TEST_CASE("Minimax with alpha beta pruning. Depth 5", "check sorted costs") {
 
 TEST_CASE("Minimax with alpha beta pruning and lookup table. Depth 5", "check sorted costs") {
   auto searcher = [&](const array<uint8_t, 64> &board, uint8_t player, int depth) -> float {
-    unordered_map<string, TTEntry> table;
+    TranspositionTable table(16);
     return -minimax_ab_transposition(board, player, depth, -kInfinity, kInfinity, 0, &table);
   };
 
@@ -398,3 +542,310 @@ TEST_CASE("Minimax with alpha beta pruning and lookup table. Depth 5. End game."
   REQUIRE(moves[0].x == 4);
   REQUIRE(moves[0].y == 5);
 }
+
+TEST_CASE("Iterative deepening", "depth reached") {
+  TranspositionTable table(16);
+  SearchContext ctx;
+  ctx.heuristic_type = 8;
+  ctx.table = &table;
+
+  // Without a deadline, the search goes as deep as the number of empty squares.
+  array<uint8_t, 64> board = board_from_string("WWWWWWWWW.BWWBBWWBWBWBBBWWBWWWBBWWBBWWBBWWBW.WBBW.BBBBBB..BBBBBB");
+  Position next_move{};
+  int depth_reached = 0;
+  REQUIRE(search_next_move_iterative(board, BLACK, &ctx, &next_move, &depth_reached));
+  REQUIRE(depth_reached == 5);
+  REQUIRE(next_move.x == 4);
+  REQUIRE(next_move.y == 5);
+
+  // Depth 1 completes even if the deadline has already passed.
+  board = board_from_string("..................B..B....BWBW...WWWWW....BBBWW.................");
+  ctx.has_deadline = true;
+  ctx.deadline = std::chrono::steady_clock::now();
+  depth_reached = 0;
+  REQUIRE(search_next_move_iterative(board, BLACK, &ctx, &next_move, &depth_reached));
+  REQUIRE(depth_reached >= 1);
+  REQUIRE(is_valid_move(board, BLACK, next_move));
+
+  // A cancelled search also completes depth 1, and stops there.
+  const std::atomic<bool> cancel(true);
+  ctx.has_deadline = false;
+  ctx.cancel = &cancel;
+  ctx.stopped = false;
+  depth_reached = 0;
+  REQUIRE(search_next_move_iterative(board, BLACK, &ctx, &next_move, &depth_reached));
+  REQUIRE(depth_reached == 1);
+  REQUIRE(is_valid_move(board, BLACK, next_move));
+  REQUIRE(ctx.cancel == &cancel);
+}
+
+TEST_CASE("PV-split search", "ties are preserved") {
+  array<uint8_t, 64> board = board_from_string("..................WBBW....WBWB....WBB.....WWWW.....BW.....WB.W..");
+  vector<Position> moves;
+  find_valid_moves(board, BLACK, &moves);
+  order_moves(&moves);
+
+  for (int num_threads : {1, 4}) {
+    TranspositionTable table(16);
+    SearchContext ctx;
+    ctx.heuristic_type = 0;
+    ctx.table = &table;
+    ctx.num_threads = num_threads;
+
+    vector<float> values;
+    search_root_moves(board, BLACK, 5, moves, &ctx, &values);
+    REQUIRE(values.size() == 16);
+    REQUIRE(*std::max_element(values.begin(), values.end()) == -39);
+    REQUIRE(std::count(values.begin(), values.end(), -39) == 2);
+  }
+}
+
+// Plain negamax to the end of the game, on the array board.
+static int exact_negamax(const array<uint8_t, 64> &board, uint8_t player, bool passed) {
+  vector<Position> moves;
+  find_valid_moves(board, player, &moves);
+  auto opponent = get_opponent(player);
+  if (moves.empty()) {
+    if (passed) {
+      return static_cast<int>(std::count(board.begin(), board.end(), player)
+          - std::count(board.begin(), board.end(), opponent));
+    }
+    return -exact_negamax(board, opponent, true);
+  }
+  int best = -kEndgameInfinity;
+  for (const auto &move_pos : moves) {
+    array<uint8_t, 64> next_board = board;
+    apply_move(&next_board, player, move_pos);
+    best = std::max(best, -exact_negamax(next_board, opponent, false));
+  }
+  return best;
+}
+
+TEST_CASE("Search options", "same value") {
+  const char *board_strs[] = {
+      "..................WBBW....WBWB....WBB.....WWWW.....BW.....WB.W..",
+      "..................B..B....BWBW...WWWWW....BBBWW.................",
+      "..W.......WWB.....WWWBB..BBWBWB...BWWWB....WBW.....W............",
+  };
+  for (const char *board_str : board_strs) {
+    array<uint8_t, 64> board = board_from_string(board_str);
+    vector<Position> moves;
+    find_valid_moves(board, BLACK, &moves);
+    order_moves(&moves);
+
+    float expected = 0;
+    long expected_ties = 0;
+    for (uint32_t options : {0u, kOrderKillers, kOrderHistory, kOrderMobility, kEnhancedTranspositionCutoff,
+                             kPrincipalVariationSearch, kAspirationWindows, 63u}) {
+      TranspositionTable table(16);
+      SearchContext ctx;
+      ctx.heuristic_type = 8;
+      ctx.table = &table;
+      ctx.num_threads = 1;
+      ctx.options = options;
+
+      vector<float> values;
+      search_root_moves(board, BLACK, 6, moves, &ctx, &values);
+      const float value = *std::max_element(values.begin(), values.end());
+      if (options == 0) {
+        expected = value;
+        expected_ties = std::count(values.begin(), values.end(), value);
+      }
+      REQUIRE(value == expected);
+      REQUIRE(std::count(values.begin(), values.end(), value) == expected_ties);
+
+      // A previous value far from the real one makes the aspiration window fail, on both sides.
+      for (float previous_best : {value - 50, value + 50, value}) {
+        table.clear();
+        search_root_moves(board, BLACK, 6, moves, &ctx, &values, &previous_best);
+        REQUIRE(*std::max_element(values.begin(), values.end()) == expected);
+      }
+    }
+  }
+}
+
+TEST_CASE("Search counters", "counting does not change the search") {
+  array<uint8_t, 64> board = board_from_string("..................WBBW....WBWB....WBB.....WWWW.....BW.....WB.W..");
+  vector<Position> moves;
+  find_valid_moves(board, BLACK, &moves);
+  order_moves(&moves);
+
+  vector<float> values[2];
+  SearchCounters counters[kMaxCounterThreads];
+  for (int i = 0; i < 2; ++i) {
+    TranspositionTable table(16);
+    SearchContext ctx;
+    ctx.heuristic_type = 8;
+    ctx.table = &table;
+    ctx.num_threads = 1;
+    ctx.options = kDefaultSearchOptions | kAspirationWindows;
+    if (i == 1) {
+      ctx.counters = counters;
+    }
+    const float previous_best = 1000;
+    search_root_moves(board, BLACK, 6, moves, &ctx, &values[i], &previous_best);
+  }
+  REQUIRE(values[0] == values[1]);
+
+  REQUIRE(counters[0].nodes > counters[0].leaves);
+  REQUIRE(counters[0].leaves > 0);
+  REQUIRE(counters[0].tt_hits <= counters[0].tt_probes);
+  REQUIRE(counters[0].first_move_cutoffs <= counters[0].beta_cutoffs);
+  REQUIRE(counters[0].researches > 0);  // The aspiration window fails low.
+  REQUIRE(counters[1].nodes == 0);
+}
+
+TEST_CASE("Multi-ProbCut", "selective search only with its heuristic") {
+  const SearchState state = make_search_state(
+      board_from_string("..................B..B....BWBW...WWWWW....BBBWW................."));
+  for (int heuristic_type : {2, 8}) {
+    float values[2];
+    SearchCounters counters[2][kMaxCounterThreads];
+    TranspositionTable table(16);
+    for (int i = 0; i < 2; ++i) {
+      SearchContext ctx;
+      ctx.heuristic_type = heuristic_type;
+      ctx.table = &table;
+      ctx.counters = counters[i];
+      ctx.options = kDefaultSearchOptions | (i == 1 ? kMultiProbCut : 0);
+      // Both share the table, but neither uses the other's values.
+      values[i] = minimax_ab_transposition(state, BLACK, 8, -kInfinity, kInfinity, &ctx);
+    }
+    REQUIRE(counters[0][0].probcut_cutoffs == 0);
+    if (heuristic_type == kProbCutHeuristicType) {
+      REQUIRE(counters[1][0].probcut_cutoffs > 0);
+    } else {
+      REQUIRE(counters[1][0].probcut_cutoffs == 0);
+      REQUIRE(values[0] == values[1]);
+    }
+  }
+}
+
+TEST_CASE("Pattern evaluator", "same value in every symmetry") {
+  REQUIRE(flip_vertical(uint64_t{1}) == uint64_t{1} << 56);
+  REQUIRE(mirror_horizontal(uint64_t{1}) == uint64_t{1} << 7);
+  REQUIRE(flip_diagonal(uint64_t{1} << 1) == uint64_t{1} << 8);
+  // Squares (0, 0), (1, 1) and (2, 2).
+  REQUIRE(pattern_bits(0x40201ULL, 4) == 0x111);
+  REQUIRE(pattern_bits(0x40201ULL, 6) == 0x7);
+  REQUIRE(pattern_bits(0x40201ULL, 7) == 0);
+  REQUIRE(folded_pattern_index(0, 1) == 2187);
+  for (int i = 0; i < kNumPatterns; ++i) {
+    for (int index = 0; index < GetPatternWeights().num_indices[i]; index += 7) {
+      REQUIRE(folded_pattern_index(i, folded_pattern_index(i, index)) == index);
+    }
+  }
+
+  const SearchState state = make_search_state(
+      board_from_string("..................B..B....BWBW...WWWWW....BBBWW................."));
+  REQUIRE(!load_pattern_weights("does_not_exist.bin"));
+  REQUIRE(heuristic(state, BLACK, kPatternHeuristicType) == 0);
+
+  const char *filename = "pattern_weights_test.bin";
+  {
+    std::ofstream file(filename, std::ios::binary);
+    const uint32_t header[] = {kNumPatternPhases, kNumPatterns, 8, 8, 8, 8, 9, 10, 8, 7, 6, 5, 4};
+    file.write("OTHPATT1", 8);
+    file.write(reinterpret_cast<const char *>(header), sizeof(header));
+    std::mt19937 engine{3};
+    for (int i = 0; i < kNumPatternPhases * GetPatternWeights().phase_size; ++i) {
+      const float weight = std::uniform_real_distribution<float>{-1, 1}(engine);
+      file.write(reinterpret_cast<const char *>(&weight), sizeof(weight));
+    }
+  }
+  REQUIRE(load_pattern_weights(filename));
+  std::remove(filename);
+
+  const float value = heuristic(state, BLACK, kPatternHeuristicType);
+  REQUIRE(value != 0);
+  REQUIRE(heuristic(state, WHITE, kPatternHeuristicType) != value);
+  const uint64_t black = state.disks[BLACK], white = state.disks[WHITE];
+  for (const auto &transform : vector<std::function<uint64_t(uint64_t)>>{
+      flip_vertical, mirror_horizontal, flip_diagonal, [](uint64_t b) { return flip_diagonal(flip_vertical(b)); }}) {
+    REQUIRE(pattern_heuristic(transform(black), transform(white)) == Approx(value));
+  }
+  REQUIRE(load_pattern_weights(nullptr));
+  REQUIRE(heuristic(state, BLACK, kPatternHeuristicType) == 0);
+}
+
+TEST_CASE("Deterministic search", "same move whatever the threads and table") {
+  array<uint8_t, 64> board = board_from_string("..................WBBW....WBWB....WBB.....WWWW.....BW.....WB.W..");
+  vector<Position> moves;
+  find_valid_moves(board, BLACK, &moves);
+  order_moves(&moves);
+
+  vector<float> expected;
+  Position expected_move{};
+  for (int num_threads : {1, 4}) {
+    TranspositionTable table(12);
+    SearchContext ctx;
+    ctx.heuristic_type = 8;
+    ctx.table = &table;
+    ctx.num_threads = num_threads;
+    vector<float> values;
+    // Fills the table with deeper entries, which a deterministic search must not use.
+    search_root_moves(board, BLACK, 6, moves, &ctx, &values);
+
+    ctx.deterministic = true;
+    ctx.seed = 11;
+    search_root_moves(board, BLACK, 5, moves, &ctx, &values);
+    const float best = *std::max_element(values.begin(), values.end());
+    for (auto &value : values) {
+      // Values of moves that are not the best are only bounds.
+      value = (value == best) ? value : -kInfinity;
+    }
+    Position move = pick_best_move(board, BLACK, moves, values, ctx);
+    if (num_threads == 1) {
+      expected = values;
+      expected_move = move;
+    }
+    REQUIRE(values == expected);
+    REQUIRE(move.x == expected_move.x);
+    REQUIRE(move.y == expected_move.y);
+  }
+}
+
+TEST_CASE("Endgame solver", "exact margin") {
+  std::mt19937 engine(1);
+  for (int game = 0; game < 10; ++game) {
+    array<uint8_t, 64> board = board_from_string("...........................WB......BW...........................");
+    uint8_t player = BLACK;
+    while (num_empty_squares(board) > 9) {
+      vector<Position> moves;
+      if (find_valid_moves(board, player, &moves) > 0) {
+        apply_move(&board, player, moves[std::uniform_int_distribution<size_t>{0, moves.size() - 1}(engine)]);
+      } else if (!any_valid_move(board, get_opponent(player))) {
+        break;
+      }
+      player = get_opponent(player);
+    }
+
+    uint64_t own, opp;
+    bitboards_from_board(board, player, &own, &opp);
+    vector<Position> moves;
+    find_valid_moves(board, player, &moves);
+    REQUIRE(popcount64(legal_moves_bits(own, opp)) == moves.size());
+    for (const auto &move_pos : moves) {
+      array<uint8_t, 64> next_board = board;
+      apply_move(&next_board, player, move_pos);
+      uint64_t next_own, next_opp;
+      bitboards_from_board(next_board, player, &next_own, &next_opp);
+      REQUIRE((flipped_bits(own, opp, move_pos.x + move_pos.y * 8) | own | uint64_t{1} << (move_pos.x + move_pos.y * 8))
+                  == next_own);
+    }
+
+    TranspositionTable table(12);
+    SearchContext ctx;
+    ctx.table = &table;
+    REQUIRE(solve_endgame(board, player, &ctx) == exact_negamax(board, player, false));
+
+    Position next_move{};
+    int margin = 0;
+    if (solve_next_move(board, player, &ctx, &next_move, &margin)) {
+      array<uint8_t, 64> next_board = board;
+      apply_move(&next_board, player, next_move);
+      REQUIRE(margin == exact_negamax(board, player, false));
+      REQUIRE(-exact_negamax(next_board, get_opponent(player), false) == margin);
+    }
+  }
+}
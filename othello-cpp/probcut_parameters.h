@@ -0,0 +1,59 @@
+// Generated by calibrate_probcut.py from 396 positions. Do not edit.
+// Indexed by [stage][depth][check]. See ProbCutParameters in othello.h.
+#pragma once
+
+constexpr ProbCutParameters
+    kProbCutParameters[kProbCutNumStages][kProbCutMaxDepth + 1][kProbCutNumChecks] = {
+  {  // 60-46 empty squares.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 0.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 1.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 2.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 3.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 4.
+    {{0, 0.0f, 0.0f, 0.0f}, {1, 0.978359f, -0.009037f, 1.220764f}},  // Depth 5.
+    {{0, 0.0f, 0.0f, 0.0f}, {2, 0.987451f, -0.002253f, 1.074516f}},  // Depth 6.
+    {{1, 0.969523f, -0.100895f, 1.323228f}, {3, 1.042903f, 0.245078f, 1.042256f}},  // Depth 7.
+    {{2, 0.976492f, -0.025327f, 1.167487f}, {4, 0.96338f, 0.030153f, 0.915135f}},  // Depth 8.
+    {{1, 1.016934f, 0.156069f, 1.508517f}, {3, 1.093429f, 0.516711f, 1.245097f}},  // Depth 9.
+    {{2, 1.0408f, -0.498675f, 1.426058f}, {4, 1.044795f, -0.535338f, 1.109053f}},  // Depth 10.
+  },
+  {  // 45-31 empty squares.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 0.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 1.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 2.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 3.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 4.
+    {{0, 0.0f, 0.0f, 0.0f}, {1, 0.990373f, 2.786233f, 7.712872f}},  // Depth 5.
+    {{0, 0.0f, 0.0f, 0.0f}, {2, 1.445118f, -4.212784f, 7.668618f}},  // Depth 6.
+    {{1, 1.051562f, 3.85341f, 8.93345f}, {3, 1.168191f, 1.81989f, 4.80665f}},  // Depth 7.
+    {{2, 1.625002f, -5.735034f, 9.931639f}, {4, 1.439093f, -3.286533f, 6.080383f}},  // Depth 8.
+    {{1, 1.129538f, 5.499086f, 11.430607f}, {3, 1.284891f, 3.293365f, 7.556487f}},  // Depth 9.
+    {{2, 1.765929f, -7.307881f, 11.890315f}, {4, 1.582017f, -4.674058f, 7.889455f}},  // Depth 10.
+  },
+  {  // 30-16 empty squares.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 0.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 1.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 2.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 3.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 4.
+    {{0, 0.0f, 0.0f, 0.0f}, {1, 0.985656f, 5.399595f, 16.443849f}},  // Depth 5.
+    {{0, 0.0f, 0.0f, 0.0f}, {2, 1.067083f, -0.834393f, 11.773265f}},  // Depth 6.
+    {{1, 0.99076f, 8.466523f, 22.480719f}, {3, 1.128011f, 3.099729f, 14.447002f}},  // Depth 7.
+    {{2, 1.104333f, -1.36713f, 14.561205f}, {4, 1.152415f, -1.482399f, 9.178062f}},  // Depth 8.
+    {{1, 1.020769f, 11.218666f, 28.336069f}, {3, 1.212096f, 5.08257f, 20.398889f}},  // Depth 9.
+    {{2, 1.169477f, -1.901776f, 17.82357f}, {4, 1.238263f, -1.97802f, 12.409908f}},  // Depth 10.
+  },
+  {  // 15-0 empty squares.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 0.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 1.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 2.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 3.
+    {{0, 0.0f, 0.0f, 0.0f}, {0, 0.0f, 0.0f, 0.0f}},  // Depth 4.
+    {{0, 0.0f, 0.0f, 0.0f}, {1, 0.931879f, -1.787339f, 13.746642f}},  // Depth 5.
+    {{0, 0.0f, 0.0f, 0.0f}, {2, 0.420698f, -0.182662f, 7.369671f}},  // Depth 6.
+    {{1, 0.81566f, -2.572915f, 17.967932f}, {3, 0.955992f, -1.897702f, 12.829831f}},  // Depth 7.
+    {{2, 0.413919f, -0.225744f, 13.621083f}, {4, 0.488468f, -0.516714f, 13.139412f}},  // Depth 8.
+    {{1, 0.406505f, -2.839809f, 7.736882f}, {3, 0.463101f, -2.409765f, 5.682213f}},  // Depth 9.
+    {{2, 0.311558f, 0.853009f, 8.761827f}, {4, 0.359534f, 0.581542f, 8.48742f}},  // Depth 10.
+  },
+};
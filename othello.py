@@ -1,7 +1,165 @@
+import functools
 import re
 import numpy as np
 import matplotlib.pyplot as pt
 
+# Bit `x + 8 * y` of a bitboard is set if square (x, y) is occupied.
+FULL_MASK = 0xFFFFFFFFFFFFFFFF
+NOT_A_FILE = 0xFEFEFEFEFEFEFEFE  # Every square except x == 0.
+NOT_H_FILE = 0x7F7F7F7F7F7F7F7F  # Every square except x == 7.
+CORNER_MASK = (1 << 0) | (1 << 7) | (1 << 56) | (1 << 63)
+
+# (shift, mask) pairs. Positive shifts are left shifts. Directions are listed so that `i ^ 1` is the opposite of `i`.
+DIRECTIONS = [
+    (1, NOT_A_FILE),  # x + 1
+    (-1, NOT_H_FILE),  # x - 1
+    (8, FULL_MASK),  # y + 1
+    (-8, FULL_MASK),  # y - 1
+    (9, NOT_A_FILE),  # x + 1, y + 1
+    (-9, NOT_H_FILE),  # x - 1, y - 1
+    (7, NOT_H_FILE),  # x - 1, y + 1
+    (-7, NOT_A_FILE),  # x + 1, y - 1
+]
+
+
+def shift_bits(bits, shift, mask):
+    if shift > 0:
+        return (bits << shift) & mask & FULL_MASK
+    return (bits >> -shift) & mask
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+def iter_bits(bits):
+    """
+    Yields the linear index of each set bit, in increasing order.
+    """
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def legal_move_bits(own, opp):
+    empty = ~(own | opp) & FULL_MASK
+    moves = 0
+    for shift, mask in DIRECTIONS:
+        candidates = shift_bits(own, shift, mask) & opp
+        for _ in range(5):
+            candidates |= shift_bits(candidates, shift, mask) & opp
+        moves |= shift_bits(candidates, shift, mask) & empty
+    return moves
+
+
+def flipped_bits(own, opp, move_bit):
+    """
+    Opponent's disks that would be flipped by placing a disk at `move_bit`. Zero if the move is not legal.
+    """
+    flipped = 0
+    for shift, mask in DIRECTIONS:
+        line = 0
+        cur = shift_bits(move_bit, shift, mask)
+        while cur & opp:
+            line |= cur
+            cur = shift_bits(cur, shift, mask)
+        if cur & own:
+            flipped |= line
+    return flipped
+
+
+INTERIOR_MASK = 0x007E7E7E7E7E7E00  # Every square not on an edge.
+
+# Shift to a neighbor along each of the four axes: rows, columns, diagonals (x - y) and anti-diagonals (x + y).
+AXIS_SHIFTS = [1, 8, 9, 7]
+
+
+def _line_masks():
+    rows = [0xFF << (8 * y) for y in range(8)]
+    columns = [0x0101010101010101 << x for x in range(8)]
+    diagonals = [sum(1 << (x + 8 * y) for y in range(8) for x in range(8) if x - y == c) for c in range(-7, 8)]
+    anti_diagonals = [sum(1 << (x + 8 * y) for y in range(8) for x in range(8) if x + y == c) for c in range(15)]
+    return [rows, columns, diagonals, anti_diagonals]
+
+
+LINE_MASKS = _line_masks()
+
+
+@functools.lru_cache(maxsize=None)
+def edge_stable_bits(index):
+    """
+    Stable squares of an edge, of either color. A square is stable if it is occupied, and stays unchanged and stable
+    after any disk of either color is placed on any empty square of the edge.
+
+    :param index: Ternary index of the edge. The sum of 3^i * (0 if square i is empty, 1 for black, 2 for white).
+    """
+    cells = [index // 3 ** i % 3 for i in range(8)]
+    stable = sum(1 << i for i in range(8) if cells[i])
+    for i in range(8):
+        if cells[i] or not stable:
+            continue
+        for color in (1, 2):
+            next_cells = list(cells)
+            next_cells[i] = color
+            changed = 1 << i
+            for step in (-1, 1):
+                j = i + step
+                while 0 <= j < 8 and next_cells[j] == 3 - color:
+                    j += step
+                if 0 <= j < 8 and next_cells[j] == color:
+                    for k in range(i + step, j, step):
+                        next_cells[k] = color
+                        changed |= 1 << k
+            stable &= edge_stable_bits(sum(cell * 3 ** k for k, cell in enumerate(next_cells))) & ~changed
+    return stable
+
+
+def _edge_index(black_edge, white_edge):
+    return sum(3 ** i * (1 if black_edge >> i & 1 else 2 if white_edge >> i & 1 else 0) for i in range(8))
+
+
+def _gather_column(bits, x):
+    return sum((bits >> (x + 8 * y) & 1) << y for y in range(8))
+
+
+def _scatter_column(column, x):
+    return sum((column >> y & 1) << (x + 8 * y) for y in range(8))
+
+
+def stable_bits(black_bits, white_bits):
+    """
+    Disks of both colors that can never be flipped. Same as `stable_bits` in othello-cpp/othello.h.
+
+    Disks on the edges come from `edge_stable_bits`. Other disks are stable if, along each of the four axes, the line is
+    full or a neighbor is a stable disk of the same color.
+    """
+    stable = edge_stable_bits(_edge_index(black_bits & 0xFF, white_bits & 0xFF))
+    stable |= edge_stable_bits(_edge_index(black_bits >> 56, white_bits >> 56)) << 56
+    for x in (0, 7):
+        column_index = _edge_index(_gather_column(black_bits, x), _gather_column(white_bits, x))
+        stable |= _scatter_column(edge_stable_bits(column_index), x)
+
+    filled = black_bits | white_bits
+    full = [0] * len(LINE_MASKS)
+    for axis, lines in enumerate(LINE_MASKS):
+        for line in lines:
+            if filled & line == line:
+                full[axis] |= line
+    stable |= filled & INTERIOR_MASK & full[0] & full[1] & full[2] & full[3]
+
+    while True:
+        next_stable = stable
+        for bits in (black_bits, white_bits):
+            own_stable = stable & bits
+            candidates = bits & INTERIOR_MASK
+            for axis, shift in enumerate(AXIS_SHIFTS):
+                candidates &= (own_stable >> shift) | (own_stable << shift) | full[axis]
+            next_stable |= candidates
+        if next_stable == stable:
+            return stable
+        stable = next_stable
+
 
 class Board(object):
     def __init__(self, symbols=None):
@@ -9,10 +167,11 @@ class Board(object):
         :param symbols: List of 64 symbols {0, W, B} defining the starting board.
         """
         self.board_size = 8
-        self.data = [['0' for _ in range(self.board_size)] for _ in range(self.board_size)]
 
-        self.num_whites = 0
-        self.num_blacks = 0
+        # Two 64-bit bitboards. See `DIRECTIONS` for the bit layout.
+        self.black_bits = 0
+        self.white_bits = 0
+
         self.turns_played = 0
         self.most_recent_move = None
 
@@ -22,6 +181,34 @@ class Board(object):
                 xy = self.subscripts_from_linear_index(i)
                 self.force_place_symbol(xy, item)
 
+    @property
+    def data(self):
+        """
+        8x8 list of {0, W, B} symbols, indexed as data[y][x]. This is a copy. Use `force_place_symbol` to edit the
+        board.
+        """
+        ret = []
+        for y in range(self.board_size):
+            row = []
+            for x in range(self.board_size):
+                bit = 1 << (x + y * self.board_size)
+                if self.black_bits & bit:
+                    row.append('B')
+                elif self.white_bits & bit:
+                    row.append('W')
+                else:
+                    row.append('0')
+            ret.append(row)
+        return ret
+
+    @property
+    def num_blacks(self):
+        return popcount(self.black_bits)
+
+    @property
+    def num_whites(self):
+        return popcount(self.white_bits)
+
     def subscripts_from_linear_index(self, i):
         """
         Similar to Matlab function ind2sub, except this is in row-major order.
@@ -38,18 +225,16 @@ class Board(object):
         assert isinstance(xy, (tuple, list)) and len(xy) == 2
         self.turns_played = 0  # Reset turns when artifically placing pieces
         x, y = xy
+        assert self.is_on_board(x, y)
 
-        if self.data[y][x] == 'W':
-            self.num_whites -= 1
-        elif self.data[y][x] == 'B':
-            self.num_blacks -= 1
-
-        self.data[y][x] = symbol
+        bit = 1 << (x + y * self.board_size)
+        self.black_bits &= ~bit
+        self.white_bits &= ~bit
 
         if symbol == 'W':
-            self.num_whites += 1
+            self.white_bits |= bit
         elif symbol == 'B':
-            self.num_blacks += 1
+            self.black_bits |= bit
 
     def print(self):
         print('  {}'.format(' '.join([str(item) for item in range(8)])))
@@ -102,11 +287,33 @@ class Board(object):
         else:
             return 'W'
 
+    def get_player_bits(self, player):
+        """
+        :return: (player's bitboard, opponent's bitboard)
+        """
+        assert player in ('W', 'B')
+        if player == 'B':
+            return self.black_bits, self.white_bits
+        else:
+            return self.white_bits, self.black_bits
+
+    def set_player_bits(self, player, own, opp):
+        assert player in ('W', 'B')
+        if player == 'B':
+            self.black_bits, self.white_bits = own, opp
+        else:
+            self.white_bits, self.black_bits = own, opp
+
     def get_symbol(self, xy):
         x, y = xy
         assert self.is_on_board(x, y)
 
-        return self.data[y][x]
+        bit = 1 << (x + y * self.board_size)
+        if self.black_bits & bit:
+            return 'B'
+        elif self.white_bits & bit:
+            return 'W'
+        return '0'
 
     def is_on_board(self, x, y):
         return x >= 0 and x < self.board_size and y >= 0 and y < self.board_size
@@ -115,50 +322,25 @@ class Board(object):
         assert isinstance(xy, (tuple, list)) and len(xy) == 2
         assert player in ('W', 'B')
 
-        if self.get_symbol(xy) != '0':
-            return 0
-
-        board = self.data
-        opponent = self.get_opponent(player)
+        x, y = xy
+        assert self.is_on_board(x, y)
+        move_bit = 1 << (x + y * self.board_size)
 
-        self.turns_played += 1
+        own, opp = self.get_player_bits(player)
+        if (own | opp) & move_bit:
+            return 0
 
-        x, y = xy
-        board[y][x] = player
-        flip_tiles = set([])
-
-        for dx, dy in [[0, 1], [1, 0], [0, -1], [-1, 0], [1, 1], [1, -1], [-1, 1], [-1, -1]]:
-            x_cur, y_cur = x + dx, y + dy
-            flip_count = 0;
-            while self.is_on_board(x_cur, y_cur) and board[y_cur][x_cur] == opponent:
-                flip_count = flip_count + 1
-                x_cur, y_cur = x_cur + dx, y_cur + dy
-            if self.is_on_board(x_cur, y_cur) and board[y_cur][x_cur] == player and flip_count > 0:
-                while [x_cur, y_cur] != [x, y]:
-                    x_cur, y_cur = x_cur - dx, y_cur - dy
-                    flip_tiles.add((y_cur, x_cur))
-
-        board[y][x] = '0'
-
-        if len(flip_tiles) == 0:
+        flipped = flipped_bits(own, opp, move_bit)
+        if flipped == 0:
             return 0
 
         if not play_test:
-            for [y_cur, x_cur] in flip_tiles:
-                self.data[y_cur][x_cur] = player
-            num_tiles_converted = len(flip_tiles) - 1
-            if player == 'W':
-                self.num_whites += 1  # Increase by 1 for tile placed on board
-                self.num_whites += num_tiles_converted  # Increase again for each tile flipped
-                self.num_blacks -= num_tiles_converted  # Opponent loses those number of pieces
-            else:
-                self.num_blacks += 1  # Increase by 1 for tile placed on board
-                self.num_blacks += num_tiles_converted  # Increase again for each tile flipped
-                self.num_whites -= num_tiles_converted  # Opponent loses those number of pieces
-
-        self.most_recent_move = xy
+            self.set_player_bits(player, own | flipped | move_bit, opp & ~flipped)
+            self.turns_played += 1
+            self.most_recent_move = xy
 
-        return len(flip_tiles)
+        # Number of flipped tiles, plus the tile placed on board.
+        return popcount(flipped) + 1
 
     def is_valid_move(self, xy, player) -> bool:
         assert isinstance(xy, (tuple, list)) and len(xy) == 2
@@ -171,37 +353,52 @@ class Board(object):
         return score > 0
 
     def move(self, xy, player):
+        """
+        Applies a legal move.
+
+        :return: A flip record (player, move bit, flipped bits, previous most recent move) to be passed to `undo`.
+        """
         assert isinstance(xy, (tuple, list)) and len(xy) == 2
         assert player in ('W', 'B')
 
-        score = self.make_move(xy, player, play_test=False)
-        if score <= 0:
+        x, y = xy
+        move_bit = 1 << (x + y * self.board_size)
+        own, opp = self.get_player_bits(player)
+        flipped = 0
+        if self.is_on_board(x, y) and not (own | opp) & move_bit:
+            flipped = flipped_bits(own, opp, move_bit)
+        if flipped == 0:
             raise RuntimeError('Invalid move: {}, {}'.format(xy, player))
 
-        return score
+        record = (player, move_bit, flipped, self.most_recent_move)
+        self.set_player_bits(player, own | flipped | move_bit, opp & ~flipped)
+        self.turns_played += 1
+        self.most_recent_move = xy
+
+        return record
+
+    def undo(self, record):
+        """
+        Reverts a move made by `move`. Moves must be undone in the reverse order they were made.
+        """
+        player, move_bit, flipped, previous_move = record
+        own, opp = self.get_player_bits(player)
+        self.set_player_bits(player, own & ~(flipped | move_bit), opp | flipped)
+        self.turns_played -= 1
+        self.most_recent_move = previous_move
+
+    def get_legal_move_bits(self, player):
+        own, opp = self.get_player_bits(player)
+        return legal_move_bits(own, opp)
 
     def get_legal_moves(self, player):
-        linear_range = self.board_size ** 2
         legal_moves = []
-        for i in range(linear_range):
-            x, y = self.subscripts_from_linear_index(i)
-            if self.is_valid_move((x, y), player):
-                legal_moves.append((x, y))
+        for i in iter_bits(self.get_legal_move_bits(player)):
+            legal_moves.append(self.subscripts_from_linear_index(i))
         return legal_moves
 
     def get_scores(self):
-        b_count = 0
-        w_count = 0
-
-        linear_range = self.board_size ** 2
-        for i in range(linear_range):
-            x, y = self.subscripts_from_linear_index(i)
-            if self.data[y][x] == 'B':
-                b_count = b_count + 1
-            elif self.data[y][x] == 'W':
-                w_count = w_count + 1
-
-        return b_count, w_count
+        return popcount(self.black_bits), popcount(self.white_bits)
 
     def get_winner(self):
         b_count, w_count = self.get_scores()
@@ -211,17 +408,11 @@ class Board(object):
             return 'W'
 
     def get_corner_disk_count(self):
-        n = self.board_size - 1
-        corner_disks = []
-        corner_positions = [(0, 0), (0, n), (n, 0), (n, n)]
-        for pos in corner_positions:
-            corner_disks.append(self.data[pos[1]][pos[0]])
-
-        return corner_disks.count('B'), corner_disks.count('W')
+        return popcount(self.black_bits & CORNER_MASK), popcount(self.white_bits & CORNER_MASK)
 
     def search_different_tile(self, yx, tile, dir):
         y_cur, x_cur = yx
-        while self.is_on_board(x_cur, y_cur) and self.data[y_cur][x_cur] == tile:
+        while self.is_on_board(x_cur, y_cur) and self.get_symbol((x_cur, y_cur)) == tile:
             y_cur, x_cur = y_cur + dir[0], x_cur + dir[1]
 
         if not self.is_on_board(x_cur, y_cur):
@@ -230,39 +421,16 @@ class Board(object):
         return False
 
     def get_permanent_disk_count(self):
-        b_count = 0
-        w_count = 0
-
-        dir_pairs = [[[0, 1], [0, -1]], [[1, 0], [-1, 0]], [[1, 1], [-1, -1]], [[-1, 1], [1, -1]]]
-        for i in range(self.board_size):
-            for j in range(self.board_size):
-                tile = self.data[i][j]
-
-                if tile == '0':
-                    continue
-
-                is_permanent = True
-                for dir in dir_pairs:
-                    is_permanent = self.search_different_tile((i, j), tile, dir[0]) or self.search_different_tile(
-                        (i, j), tile, dir[1])
-                    if not is_permanent:
-                        break
-
-                if is_permanent:
-                    if tile == 'B':
-                        b_count = b_count + 1
-                    else:
-                        w_count = w_count + 1
-
-        return b_count, w_count
+        stable = stable_bits(self.black_bits, self.white_bits)
+        return popcount(stable & self.black_bits), popcount(stable & self.white_bits)
 
     def heuristic_count(self):
         b_count, w_count = self.get_scores()
         return b_count, w_count
 
     def heuristic_numMoves(self):
-        b_count = len(self.get_legal_moves('B'))
-        w_count = len(self.get_legal_moves('W'))
+        b_count = popcount(self.get_legal_move_bits('B'))
+        w_count = popcount(self.get_legal_move_bits('W'))
         return b_count, w_count
 
     def heuristic_weighted(self):
@@ -273,14 +441,12 @@ class Board(object):
 
     def get_weighted_sum(self, weights, player):
         assert len(weights) == self.board_size ** 2
+        own, opp = self.get_player_bits(player)
         ret = 0
-        for i in range(self.board_size ** 2):
-            xy = self.subscripts_from_linear_index(i)
-            player_symbol = self.get_symbol(xy)
-            if player_symbol == player:
-                ret += weights[i]
-            elif player_symbol == self.get_opponent(player):
-                ret -= weights[i]
+        for i in iter_bits(own):
+            ret += weights[i]
+        for i in iter_bits(opp):
+            ret -= weights[i]
         return ret
 
 
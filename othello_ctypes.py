@@ -1,10 +1,77 @@
 import ctypes
+import dataclasses
 import time
+import numpy as np
 from os import path
 from sys import platform
 from ctypes import cdll
 
+import othello
+from third_party import board_conversion
+
 ctypes_lib_dirname = path.realpath(path.join(path.dirname(__file__), 'othello-cpp/cmake-build-release/'))
+# Weights of the 'pattern' strategy, loaded at import if the file exists. See pattern_evaluator.py.
+PATTERN_WEIGHTS_FILENAME = path.realpath(path.join(path.dirname(__file__), 'pattern_weights.bin'))
+
+
+class PlayerConfig(ctypes.Structure):
+    """
+    Search settings of one side of a game played by `play_games`. Same layout as PlayerConfig in othello_ctypes.cc. See
+    `player_config`.
+    """
+    _fields_ = [
+        ('strategy', ctypes.c_uint8),
+        ('depth', ctypes.c_uint8),
+        ('endgame_empties', ctypes.c_uint8),
+        ('num_threads', ctypes.c_uint8),
+        ('time_budget_ms', ctypes.c_uint32),
+        ('options', ctypes.c_uint32),
+    ]
+
+
+MAX_GAME_MOVES = 60
+
+# Same layout as GameRecord in othello_ctypes.cc. Only the first `num_moves` entries of the per-move fields are used.
+# Passes are not recorded.
+GAME_RECORD_DTYPE = np.dtype([
+    ('seconds', np.float32, (MAX_GAME_MOVES,)),
+    ('moves', np.uint8, (MAX_GAME_MOVES,)),
+    ('players', np.uint8, (MAX_GAME_MOVES,)),
+    ('depths', np.uint8, (MAX_GAME_MOVES,)),
+    ('num_moves', np.uint8),
+    ('black_score', np.uint8),
+    ('white_score', np.uint8),
+], align=True)
+assert GAME_RECORD_DTYPE.itemsize == 424, GAME_RECORD_DTYPE.itemsize
+
+# Same layout as PositionRecord in othello_ctypes.cc. One position of a game played by `self_play_games`.
+POSITION_RECORD_DTYPE = np.dtype([
+    ('black', '<u8'),  # Bitboards. Bit `x + 8 * y` is square (x, y).
+    ('white', '<u8'),
+    ('score', '<f4'),  # Search value of `best_move` for `player`. The final disk difference if solved.
+    ('player', np.uint8),  # To move, 0 (black) or 1 (white).
+    ('best_move', np.uint8),  # Linear index. Not the move played after a random opening move.
+    ('depth', np.uint8),  # Of the search. The number of empty squares if solved.
+    ('outcome', np.int8),  # Final disk difference of the game, for `player`.
+])
+assert POSITION_RECORD_DTYPE.itemsize == 24, POSITION_RECORD_DTYPE.itemsize
+
+# Fields of SearchCounters in othello.h, in order.
+SEARCH_COUNTER_FIELDS = ('nodes', 'leaves', 'tt_probes', 'tt_hits', 'tt_cutoffs', 'tt_stores', 'beta_cutoffs',
+                         'first_move_cutoffs', 'cutoff_move_index_sum', 'researches', 'probcut_cutoffs')
+MAX_COUNTER_THREADS = 64
+
+# Same layout as SearchStats in othello_ctypes.cc. Each thread's counters are padded to 128 bytes.
+SEARCH_STATS_DTYPE = np.dtype({
+    'names': ['threads', 'seconds', 'depth', 'num_threads'],
+    'formats': [
+        (np.dtype({'names': list(SEARCH_COUNTER_FIELDS), 'formats': [np.uint64] * len(SEARCH_COUNTER_FIELDS),
+                   'itemsize': 128}), (MAX_COUNTER_THREADS,)),
+        np.float64, np.uint32, np.uint32,
+    ],
+    'offsets': [0, 128 * MAX_COUNTER_THREADS, 128 * MAX_COUNTER_THREADS + 8, 128 * MAX_COUNTER_THREADS + 12],
+    'itemsize': 8256,
+})
 
 lib = None
 if platform == "linux" or platform == "linux2":
@@ -15,6 +82,18 @@ else:
     raise NotImplemented(platform)
 
 if lib:
+    lib.tt_create.restype = ctypes.c_void_p
+    lib.tt_create.argtypes = [ctypes.c_uint8]
+    lib.tt_clear.restype = None
+    lib.tt_clear.argtypes = [ctypes.c_void_p]
+    lib.tt_destroy.restype = None
+    lib.tt_destroy.argtypes = [ctypes.c_void_p]
+    lib.search_control_create.restype = ctypes.c_void_p
+    lib.search_control_create.argtypes = []
+    for c_func_name in ('search_control_cancel', 'search_control_reset', 'search_control_destroy'):
+        getattr(lib, c_func_name).restype = None
+        getattr(lib, c_func_name).argtypes = [ctypes.c_void_p]
+
     c_func = getattr(lib, 'best_move')
     c_func.restype = None
     c_func.argtypes = [
@@ -22,53 +101,774 @@ if lib:
         ctypes.c_uint8,  # player index
         ctypes.c_uint8,  # strategy index
         ctypes.c_uint8,  # search depth
+        ctypes.c_uint8,  # log2 of the number of transposition table buckets
+        ctypes.c_void_p,  # transposition table handle, or null
+        ctypes.c_uint8,  # number of threads, or 0 for the OpenMP default
+        ctypes.c_uint8,  # maximum number of empty squares solved exactly, or 0
+        ctypes.c_uint32,  # search options
+        ctypes.POINTER(ctypes.c_uint64),  # seed of a deterministic search, or null
+        ctypes.c_void_p,  # search control handle, or null
         ctypes.POINTER(ctypes.c_uint8),
         ctypes.POINTER(ctypes.c_uint8),
+        ctypes.c_void_p,  # output stats, (1,) of SEARCH_STATS_DTYPE, or null
+    ]
+
+
+    c_func = getattr(lib, 'best_move_timed')
+    c_func.restype = None
+    c_func.argtypes = [
+        ctypes.c_char_p,  # board string
+        ctypes.c_uint8,  # player index
+        ctypes.c_uint8,  # strategy index
+        ctypes.c_uint32,  # time budget in milliseconds
+        ctypes.c_uint8,  # log2 of the number of transposition table buckets
+        ctypes.c_void_p,  # transposition table handle, or null
+        ctypes.c_uint8,  # number of threads, or 0 for the OpenMP default
+        ctypes.c_uint8,  # maximum number of empty squares solved exactly, or 0
+        ctypes.c_uint32,  # search options
+        ctypes.POINTER(ctypes.c_uint64),  # seed of a deterministic search, or null
+        ctypes.c_void_p,  # search control handle, or null
+        ctypes.POINTER(ctypes.c_uint8),
+        ctypes.POINTER(ctypes.c_uint8),
+        ctypes.POINTER(ctypes.c_uint8),
+        ctypes.c_void_p,  # output stats, (1,) of SEARCH_STATS_DTYPE, or null
+    ]
+
+    for c_func_name in ('best_move_squares', 'best_move_timed_squares'):
+        c_func = getattr(lib, c_func_name)
+        c_func.restype = None
+        # Same as the board string version, except the board is a pointer to 64 squares.
+        c_func.argtypes = [ctypes.POINTER(ctypes.c_uint8)] + getattr(lib, c_func_name[:-len('_squares')]).argtypes[1:]
+
+    c_func = getattr(lib, 'apply_move_squares')
+    c_func.restype = ctypes.c_uint8
+    c_func.argtypes = [
+        ctypes.POINTER(ctypes.c_uint8),  # 64 squares, modified in place
+        ctypes.c_uint8,  # player index
+        ctypes.c_uint8,  # linear index of the move
     ]
 
+    c_func = getattr(lib, 'legal_moves_squares')
+    c_func.restype = ctypes.c_uint64
+    c_func.argtypes = [
+        ctypes.POINTER(ctypes.c_uint8),  # 64 squares
+        ctypes.c_uint8,  # player index
+    ]
+
+    c_func = getattr(lib, 'heuristic_squares')
+    c_func.restype = ctypes.c_float
+    c_func.argtypes = [
+        ctypes.POINTER(ctypes.c_uint8),  # 64 squares
+        ctypes.c_uint8,  # player index
+        ctypes.c_uint8,  # strategy index
+    ]
+
+    c_func = getattr(lib, 'pattern_weights_load')
+    c_func.restype = ctypes.c_uint8
+    c_func.argtypes = [
+        ctypes.c_char_p,  # filename, or null to unload the weights
+    ]
+
+    c_func = getattr(lib, 'play_games')
+    c_func.restype = None
+    c_func.argtypes = [
+        ctypes.POINTER(PlayerConfig),  # black
+        ctypes.POINTER(PlayerConfig),  # white
+        ctypes.POINTER(ctypes.c_uint8),  # starting board, 64 squares, or null for the standard starting position
+        ctypes.POINTER(ctypes.c_uint64),  # seeds, (N,)
+        ctypes.c_uint32,  # number of games
+        ctypes.c_uint8,  # log2 of the number of transposition table buckets of each game
+        ctypes.c_uint8,  # number of games played at the same time, or 0 for the OpenMP default
+        ctypes.c_void_p,  # output records, (N,) of GAME_RECORD_DTYPE
+    ]
+
+    c_func = getattr(lib, 'self_play_games')
+    c_func.restype = None
+    c_func.argtypes = [
+        ctypes.POINTER(PlayerConfig),  # both players
+        ctypes.POINTER(ctypes.c_uint64),  # seeds, (N,)
+        ctypes.c_uint32,  # number of games
+        ctypes.c_uint8,  # number of random opening moves
+        ctypes.c_uint8,  # log2 of the number of transposition table buckets of each game
+        ctypes.c_uint8,  # number of games played at the same time, or 0 for the OpenMP default
+        ctypes.c_void_p,  # output positions, (N, MAX_GAME_MOVES) of POSITION_RECORD_DTYPE
+        ctypes.POINTER(ctypes.c_uint8),  # output number of positions of each game, (N,)
+    ]
+
+    c_func = getattr(lib, 'solve_endgame')
+    c_func.restype = None
+    c_func.argtypes = [
+        ctypes.c_char_p,  # board string
+        ctypes.c_uint8,  # player index
+        ctypes.c_uint8,  # log2 of the number of transposition table buckets
+        ctypes.c_void_p,  # transposition table handle, or null
+        ctypes.c_uint8,  # number of threads, or 0 for the OpenMP default
+        ctypes.POINTER(ctypes.c_uint8),
+        ctypes.POINTER(ctypes.c_uint8),
+        ctypes.POINTER(ctypes.c_int8),
+    ]
+
+    c_func = getattr(lib, 'best_moves_batch')
+    c_func.restype = None
+    c_func.argtypes = [
+        ctypes.POINTER(ctypes.c_uint8),  # boards, (N, 64)
+        ctypes.c_uint32,  # number of boards
+        ctypes.POINTER(ctypes.c_uint8),  # player indices, (N,)
+        ctypes.POINTER(ctypes.c_uint8),  # strategy indices, (N,)
+        ctypes.POINTER(ctypes.c_uint8),  # search depths, (N,)
+        ctypes.c_uint8,  # log2 of the number of transposition table buckets
+        ctypes.c_void_p,  # transposition table handle, or null
+        ctypes.c_uint8,  # number of threads, or 0 for the OpenMP default
+        ctypes.c_uint32,  # search options
+        ctypes.POINTER(ctypes.c_uint64),  # seed of a deterministic search, or null
+        ctypes.POINTER(ctypes.c_uint8),  # output moves, (N,)
+        ctypes.POINTER(ctypes.c_float),  # output scores, (N,)
+    ]
+
+player_indices = {
+    'B': 0,
+    'W': 1,
+}
+EMPTY_SQUARE = 255
+
+# Bits of the `options` argument of the searches. The transposition table's best move is always searched first. See
+# SearchContext in othello.h.
+ORDER_KILLERS = 1 << 0  # Killer moves, per remaining depth.
+ORDER_HISTORY = 1 << 1  # History heuristic.
+ORDER_MOBILITY = 1 << 2  # Order by the opponent's mobility, away from the horizon.
+ENHANCED_TRANSPOSITION_CUTOFF = 1 << 3
+PRINCIPAL_VARIATION_SEARCH = 1 << 4  # Null-window searches of all but the first move, re-searched on fail high.
+ASPIRATION_WINDOWS = 1 << 5  # Narrow root window around the previous iteration's value. Only used by best_move_timed.
+# Selective search: prunes nodes that shallow searches predict to fail high or low. Only used by the 'all' strategy. See
+# calibrate_probcut.py.
+MULTI_PROBCUT = 1 << 6
+DEFAULT_OPTIONS = ORDER_KILLERS | PRINCIPAL_VARIATION_SEARCH
+strategy_indices = {
+    'weighted_parity_1': 0,
+    'weighted_parity_2': 1,
+    'weighted_parity_3': 2,
+    'parity': 3,
+    'mobility': 4,
+    'perm_disk': 5,
+    'weighted_parity_and_mobility_1': 6,
+    'weighted_parity_and_mobility_2': 7,
+    'all': 8,
+    'pattern': 9,  # Needs weights. See `load_pattern_weights`.
+    'random': 255,
+}
+pattern_weights_loaded = False
+
+
+def load_pattern_weights(filename=PATTERN_WEIGHTS_FILENAME):
+    """
+    Replaces the weights of the 'pattern' strategy, for all searches. Must not be called while searching.
+
+    :param filename: A file written by `pattern_evaluator.save_weights`, or None to unload the weights.
+    """
+    global pattern_weights_loaded
+    if not lib.pattern_weights_load(None if filename is None else filename.encode('utf-8')):
+        raise ValueError('Could not load pattern weights from {}'.format(filename))
+    pattern_weights_loaded = filename is not None
+
+
+def _check_pattern_weights(strategy):
+    if strategy == 'pattern' and not pattern_weights_loaded:
+        raise ValueError('No pattern weights are loaded. See pattern_evaluator.py.')
+
+
+if path.isfile(PATTERN_WEIGHTS_FILENAME):
+    load_pattern_weights()
+
+
+class TranspositionTable(object):
+    def __init__(self, size_log2=20):
+        """
+        A transposition table that persists across `best_move` calls. It is shared by all search threads. Passing the
+        same table for every move of a game lets each search reuse the results of the previous ones.
+
+        :param size_log2: The table has 2^size_log2 buckets of 64 bytes.
+        """
+        assert 0 < size_log2 < 32, size_log2
+        self.size_log2 = size_log2
+        self.handle = lib.tt_create(size_log2)
+
+    def clear(self):
+        assert self.handle is not None
+        lib.tt_clear(self.handle)
+
+    def close(self):
+        if self.handle is not None:
+            lib.tt_destroy(self.handle)
+            self.handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        if lib is not None:
+            self.close()
+
+
+class SearchCancelled(Exception):
+    pass
+
+
+class SearchControl(object):
+    def __init__(self):
+        """
+        Stops a running `best_move` or `best_move_timed` from another thread. The ctypes calls release the GIL, so the
+        search runs while other Python threads call `cancel`. A control can be passed to any number of searches, and
+        stops all of them.
+        """
+        self.handle = lib.search_control_create()
+        self.is_cancelled = False
+
+    def cancel(self):
+        assert self.handle is not None
+        self.is_cancelled = True
+        lib.search_control_cancel(self.handle)
+
+    def reset(self):
+        """
+        Lets the control be used for new searches after `cancel`.
+        """
+        assert self.handle is not None
+        self.is_cancelled = False
+        lib.search_control_reset(self.handle)
+
+    def close(self):
+        if self.handle is not None:
+            lib.search_control_destroy(self.handle)
+            self.handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        if lib is not None:
+            self.close()
+
+
+@dataclasses.dataclass
+class SearchStats:
+    """
+    Instrumentation of one search, filled in place by `best_move` and `best_move_timed` when passed as `stats`. Counters
+    are summed over threads. See SearchCounters in othello.h.
+    """
+    nodes: int = 0
+    leaves: int = 0
+    tt_probes: int = 0
+    tt_hits: int = 0
+    tt_cutoffs: int = 0
+    tt_stores: int = 0
+    beta_cutoffs: int = 0
+    first_move_cutoffs: int = 0
+    cutoff_move_index_sum: int = 0
+    researches: int = 0
+    probcut_cutoffs: int = 0
+    thread_nodes: list = dataclasses.field(default_factory=list)  # Nodes searched by each thread.
+    depth: int = 0
+    seconds: float = 0.0  # Measured in C++, so it excludes the ctypes call overhead.
+
+    def _update(self, record):
+        """
+        :param record: A scalar of SEARCH_STATS_DTYPE.
+        """
+        threads = record['threads'][:record['num_threads']]
+        for name in SEARCH_COUNTER_FIELDS:
+            setattr(self, name, int(threads[name].sum()))
+        self.thread_nodes = [int(n) for n in threads['nodes']]
+        self.depth = int(record['depth'])
+        self.seconds = float(record['seconds'])
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        """
+        Fraction of beta cutoffs caused by the first move searched. Close to 1 means good move ordering.
+        """
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def mean_cutoff_move_index(self):
+        return self.cutoff_move_index_sum / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def thread_balance(self):
+        """
+        Mean over max of the nodes searched by each thread. 1 means the work was evenly split.
+        """
+        if not self.thread_nodes or max(self.thread_nodes) == 0:
+            return 0.0
+        return sum(self.thread_nodes) / len(self.thread_nodes) / max(self.thread_nodes)
+
+
+def _seed_argument(seed):
+    if seed is None:
+        return None
+    assert 0 <= seed < 2 ** 64, seed
+    return ctypes.byref(ctypes.c_uint64(seed))
+
+
+def _control_argument(control):
+    assert control is None or control.handle is not None
+    return ctypes.c_void_p(None if control is None else control.handle)
+
+
+def _stats_argument(stats):
+    """
+    :return: (output buffer or None, pointer argument).
+    """
+    if stats is None:
+        return None, ctypes.c_void_p(None)
+    buffer = np.zeros(1, dtype=SEARCH_STATS_DTYPE)
+    return buffer, ctypes.c_void_p(buffer.ctypes.data)
 
-def best_move(board, player, strategy, depth):
-    c_func_name = 'best_move'
-    c_func = getattr(lib, c_func_name)
-
-    player_indices = {
-        'B': 0,
-        'W': 1,
-    }
-    strategy_indices = {
-        'weighted_parity_1': 0,
-        'weighted_parity_2': 1,
-        'weighted_parity_3': 2,
-        'parity': 3,
-        'mobility': 4,
-        'perm_disk': 5,
-        'weighted_parity_and_mobility_1': 6,
-        'weighted_parity_and_mobility_2': 7,
-        'all': 8,
-        'random': 255,
-    }
 
+class NativeBoard(object):
+    def __init__(self, squares=None):
+        """
+        A board kept in a uint8 NumPy buffer that the C++ engine reads and updates in place. Passing it to `best_move`
+        or `best_move_timed` instead of a board string skips the string conversion on every move.
+
+        :param squares: 64 squares in row-major order, 0 (black), 1 (white) or 255 (empty). It is copied. If None, the
+        standard starting position is used.
+        """
+        if squares is None:
+            self.squares = np.full(64, EMPTY_SQUARE, dtype=np.uint8)
+            self.squares[[27, 36]] = player_indices['W']
+            self.squares[[28, 35]] = player_indices['B']
+        else:
+            self.squares = np.array(squares, dtype=np.uint8)
+            assert self.squares.shape == (64,), self.squares.shape
+        self.pointer = self.squares.ctypes.data_as(ctypes.POINTER(ctypes.c_uint8))
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        :param board: An `othello.Board`.
+        """
+        return cls(board_conversion.convert_to_our_cpp_array(board))
+
+    def to_board(self):
+        """
+        :return: A new `othello.Board` with the same disks.
+        """
+        ret = othello.Board()
+        ret.black_bits, ret.white_bits = self.get_bits()
+        return ret
+
+    def copy(self):
+        return NativeBoard(self.squares)
+
+    def get_bits(self):
+        """
+        :return: (black bits, white bits). Bit `x + 8 * y` is square (x, y).
+        """
+        black_bits, white_bits = np.packbits(self.squares.reshape(1, 64) == np.array([[0], [1]]), axis=1,
+                                             bitorder='little').view('<u8').ravel()
+        return int(black_bits), int(white_bits)
+
+    def get_legal_move_bits(self, player):
+        return lib.legal_moves_squares(self.pointer, player_indices[player])
+
+    def get_legal_moves(self, player):
+        return [(i % 8, i // 8) for i in othello.iter_bits(self.get_legal_move_bits(player))]
+
+    def is_valid_move(self, xy, player):
+        x, y = xy
+        return 0 <= x < 8 and 0 <= y < 8 and bool(self.get_legal_move_bits(player) >> (x + 8 * y) & 1)
+
+    def move(self, xy, player):
+        """
+        Applies a legal move in place.
+
+        :return: Number of flipped disks.
+        """
+        x, y = xy
+        num_flipped = 0
+        if 0 <= x < 8 and 0 <= y < 8:
+            num_flipped = lib.apply_move_squares(self.pointer, player_indices[player], x + 8 * y)
+        if num_flipped == 0:
+            raise RuntimeError('Invalid move: {}, {}'.format(xy, player))
+        return num_flipped
+
+    def get_scores(self):
+        return int(np.count_nonzero(self.squares == 0)), int(np.count_nonzero(self.squares == 1))
+
+    def get_winner(self):
+        b_count, w_count = self.get_scores()
+        if b_count >= w_count:
+            return 'B'
+        else:
+            return 'W'
+
+
+def _board_argument(board, c_func_name):
+    """
+    :return: (C function, board argument). Board strings go to `c_func_name` and `NativeBoard`s to its _squares variant.
+    """
+    if isinstance(board, NativeBoard):
+        return getattr(lib, c_func_name + '_squares'), board.pointer
+    return getattr(lib, c_func_name), ctypes.c_char_p(board.encode('utf-8'))
+
+
+def heuristic(board, player, strategy):
+    """
+    :param board: A `NativeBoard`.
+    :return: Value of `board` for `player` at the horizon of a search with `strategy`.
+    """
     assert player in player_indices
     assert strategy in strategy_indices
-    assert 0 < depth < 64, depth
+    _check_pattern_weights(strategy)
+    return lib.heuristic_squares(board.pointer, player_indices[player], strategy_indices[strategy])
+
+
+def _find_book_move(book, board, player):
+    if isinstance(board, NativeBoard):
+        move = book.find_move_bits(*board.get_bits(), player)
+        if move is None:
+            return None
+        return move % 8, move // 8
+    return book.find_move(board, player)
 
-    arg_board = ctypes.c_char_p(board.encode('utf-8'))
+
+def best_move(board, player, strategy, depth, tt_size_log2=16, table=None, num_threads=0, book=None,
+              endgame_empties=14, options=DEFAULT_OPTIONS, seed=None, stats=None, control=None):
+    """
+    :param board: Board string of 64 squares in row-major order, 'B', 'W' or '.'. Or a `NativeBoard`, which is read in
+    place.
+    :param tt_size_log2: If `table` is None, a temporary transposition table with 2^tt_size_log2 buckets of 64 bytes is
+    used.
+    :param table: A `TranspositionTable` to reuse, or None.
+    :param num_threads: Number of search threads. 0 uses the OpenMP default (OMP_NUM_THREADS, or the number of cores).
+    :param book: An `opening_book.OpeningBook`, or None. If the position is in the book, the book move is returned
+    without searching.
+    :param endgame_empties: Positions with at most this many empty squares are solved exactly with `solve_endgame`'s
+    solver, instead of searched to `depth`. 0 disables the solver. The random strategy never uses it, so that it stays
+    a weak baseline.
+    :param options: Combination of the search option bits, such as `ORDER_KILLERS`.
+    :param seed: If not None, the search is deterministic: the move only depends on the board, `depth` and `seed`,
+    whatever `num_threads` and the contents of `table`. Table entries are then only reused at the depth they were
+    searched to, which costs some speed. If None, ties between equally valued moves are broken at random.
+    :param stats: A `SearchStats`, filled in place with the search's counters, or None. Instrumentation slows the search
+    slightly. Left unchanged for book moves.
+    :param control: A `SearchControl`, or None. If it is cancelled before the search ends, `SearchCancelled` is raised.
+    """
+    c_func, arg_board = _board_argument(board, 'best_move')
+
+    if book is not None:
+        start_time = time.time()
+        move = _find_book_move(book, board, player)
+        if move is not None:
+            return move, time.time() - start_time
+
+    assert player in player_indices
+    assert strategy in strategy_indices
+    _check_pattern_weights(strategy)
+    assert 0 < depth < 64, depth
+    assert 0 < tt_size_log2 < 32, tt_size_log2
+    assert table is None or table.handle is not None
+    assert 0 <= num_threads < 256, num_threads
+    assert 0 <= endgame_empties <= 64, endgame_empties
+    assert 0 <= options < 2 ** 32, options
 
     arg_player = ctypes.c_uint8(player_indices[player])
     arg_strategy = ctypes.c_uint8(strategy_indices[strategy])
     arg_depth = ctypes.c_uint8(depth)
+    arg_tt_size_log2 = ctypes.c_uint8(tt_size_log2)
+    arg_table = ctypes.c_void_p(None if table is None else table.handle)
+    arg_num_threads = ctypes.c_uint8(num_threads)
+    arg_endgame_empties = ctypes.c_uint8(0 if strategy == 'random' else endgame_empties)
 
     arg_x = ctypes.c_uint8(255)
     arg_y = ctypes.c_uint8(255)
+    stats_buffer, arg_stats = _stats_argument(stats)
 
     start_time = time.time()
     c_func(
-        arg_board, arg_player, arg_strategy, arg_depth, arg_x, arg_y
+        arg_board, arg_player, arg_strategy, arg_depth, arg_tt_size_log2, arg_table, arg_num_threads,
+        arg_endgame_empties, ctypes.c_uint32(options), _seed_argument(seed), _control_argument(control), arg_x, arg_y,
+        arg_stats
     )
     elapsed = time.time() - start_time
+    if stats is not None:
+        stats._update(stats_buffer[0])
 
     x, y = arg_x.value, arg_y.value
+    if control is not None and control.is_cancelled and (x == 255 or y == 255):
+        raise SearchCancelled()
 
     if x == 255 or y == 255:
         return None, elapsed
     return (x, y), elapsed
+
+
+def best_move_timed(board, player, strategy, time_budget_ms, tt_size_log2=16, table=None, num_threads=0, book=None,
+                    endgame_empties=14, options=DEFAULT_OPTIONS, seed=None, stats=None, control=None):
+    """
+    Iterative deepening search that stops when `time_budget_ms` has passed. Depth 1 is always searched to completion.
+    If the endgame solver does not finish within the budget, the result of the heuristic search is returned. See
+    `best_move` for the other parameters.
+
+    :return: (move, depth, elapsed). `move` is the best move found by the deepest completed search and `depth` is its
+    depth, or 0 for a book move. A solved position has the number of empty squares as its depth. `move` is None if
+    there is no legal move. With a `seed`, `move` only depends on `depth`, which still depends on the time. Cancelling
+    `control` stops the search early, as if the time had run out.
+    """
+    c_func, arg_board = _board_argument(board, 'best_move_timed')
+
+    if book is not None:
+        start_time = time.time()
+        move = _find_book_move(book, board, player)
+        if move is not None:
+            return move, 0, time.time() - start_time
+
+    assert player in player_indices
+    assert strategy in strategy_indices
+    _check_pattern_weights(strategy)
+    assert time_budget_ms >= 0, time_budget_ms
+    assert 0 < tt_size_log2 < 32, tt_size_log2
+    assert table is None or table.handle is not None
+    assert 0 <= num_threads < 256, num_threads
+    assert 0 <= endgame_empties <= 64, endgame_empties
+    assert 0 <= options < 2 ** 32, options
+
+    arg_player = ctypes.c_uint8(player_indices[player])
+    arg_strategy = ctypes.c_uint8(strategy_indices[strategy])
+    arg_time_budget_ms = ctypes.c_uint32(time_budget_ms)
+    arg_tt_size_log2 = ctypes.c_uint8(tt_size_log2)
+    arg_table = ctypes.c_void_p(None if table is None else table.handle)
+    arg_num_threads = ctypes.c_uint8(num_threads)
+    arg_endgame_empties = ctypes.c_uint8(0 if strategy == 'random' else endgame_empties)
+
+    arg_x = ctypes.c_uint8(255)
+    arg_y = ctypes.c_uint8(255)
+    arg_depth = ctypes.c_uint8(0)
+    stats_buffer, arg_stats = _stats_argument(stats)
+
+    start_time = time.time()
+    c_func(
+        arg_board, arg_player, arg_strategy, arg_time_budget_ms, arg_tt_size_log2, arg_table, arg_num_threads,
+        arg_endgame_empties, ctypes.c_uint32(options), _seed_argument(seed), _control_argument(control), arg_x, arg_y,
+        arg_depth, arg_stats
+    )
+    elapsed = time.time() - start_time
+    if stats is not None:
+        stats._update(stats_buffer[0])
+
+    x, y = arg_x.value, arg_y.value
+
+    if x == 255 or y == 255:
+        return None, 0, elapsed
+    return (x, y), arg_depth.value, elapsed
+
+
+def solve_endgame(board, player, tt_size_log2=20, table=None, num_threads=0):
+    """
+    Solves the position exactly, to the end of the game. Only practical with about 20 empty squares or fewer. See
+    `best_move` for the parameters.
+
+    :return: (move, margin, elapsed). `move` is one of the best moves, or None if `player` has no legal move.
+    `margin` is the final disk difference for `player` with perfect play from both sides.
+    """
+    c_func = getattr(lib, 'solve_endgame')
+
+    assert player in player_indices
+    assert 0 < tt_size_log2 < 32, tt_size_log2
+    assert table is None or table.handle is not None
+    assert 0 <= num_threads < 256, num_threads
+
+    arg_x = ctypes.c_uint8(255)
+    arg_y = ctypes.c_uint8(255)
+    arg_margin = ctypes.c_int8(0)
+
+    start_time = time.time()
+    c_func(
+        ctypes.c_char_p(board.encode('utf-8')), ctypes.c_uint8(player_indices[player]), ctypes.c_uint8(tt_size_log2),
+        ctypes.c_void_p(None if table is None else table.handle), ctypes.c_uint8(num_threads), arg_x, arg_y, arg_margin
+    )
+    elapsed = time.time() - start_time
+
+    x, y = arg_x.value, arg_y.value
+
+    if x == 255 or y == 255:
+        return None, arg_margin.value, elapsed
+    return (x, y), arg_margin.value, elapsed
+
+
+def _per_board_indices(values, indices, num_boards):
+    """
+    Broadcasts a single name or index, or a sequence of them, to a contiguous uint8 array of length `num_boards`.
+    """
+    if isinstance(values, str):
+        values = indices[values]
+    elif not np.isscalar(values):
+        values = [indices[item] if isinstance(item, str) else item for item in values]
+    ret = np.ascontiguousarray(np.broadcast_to(np.asarray(values, dtype=np.uint8), (num_boards,)))
+    return ret
+
+
+def best_moves_batch(boards, players, strategies, depths, tt_size_log2=16, table=None, num_threads=0, out_moves=None,
+                     out_scores=None, options=DEFAULT_OPTIONS, seed=None):
+    """
+    Searches many boards in one call. Boards are searched in parallel, one thread per board.
+
+    :param boards: uint8 array of shape (N, 64). Squares are in row-major order and are 0 (black), 1 (white) or 255
+    (empty). See `board_conversion.convert_to_our_cpp_array`.
+    :param players: 'B' or 'W', or one per board. Player indices are also accepted.
+    :param strategies: A strategy name, or one per board. Strategy indices are also accepted.
+    :param depths: Search depth, or one per board.
+    :param tt_size_log2: See `best_move`. All boards share the table.
+    :param out_moves: Optional uint8 array of shape (N,) to write the moves to.
+    :param out_scores: Optional float32 array of shape (N,) to write the scores to.
+    :param options: See `best_move`.
+    :param seed: See `best_move`. With a seed, the results do not depend on `num_threads` or on the other boards.
+    :return: (moves, scores). moves[i] is the linear index (x + 8 * y) of the best move of board i, or 255 if there is
+    no legal move. scores[i] is its value for players[i].
+    """
+    c_func = getattr(lib, 'best_moves_batch')
+
+    boards = np.ascontiguousarray(boards, dtype=np.uint8)
+    assert boards.ndim == 2 and boards.shape[1] == 64, boards.shape
+    num_boards = boards.shape[0]
+
+    players = _per_board_indices(players, player_indices, num_boards)
+    strategies = _per_board_indices(strategies, strategy_indices, num_boards)
+    depths = _per_board_indices(depths, {}, num_boards)
+    if strategy_indices['pattern'] in strategies:
+        _check_pattern_weights('pattern')
+
+    assert np.all((boards == 0) | (boards == 1) | (boards == EMPTY_SQUARE))
+    assert np.all(players <= 1)
+    assert np.all(np.isin(strategies, list(strategy_indices.values()))), strategies
+    assert np.all((depths > 0) & (depths < 64))
+    assert 0 < tt_size_log2 < 32, tt_size_log2
+    assert table is None or table.handle is not None
+    assert 0 <= num_threads < 256, num_threads
+    assert 0 <= options < 2 ** 32, options
+
+    if out_moves is None:
+        out_moves = np.empty(num_boards, dtype=np.uint8)
+    if out_scores is None:
+        out_scores = np.empty(num_boards, dtype=np.float32)
+    assert out_moves.dtype == np.uint8 and out_moves.shape == (num_boards,) and out_moves.flags.c_contiguous
+    assert out_scores.dtype == np.float32 and out_scores.shape == (num_boards,) and out_scores.flags.c_contiguous
+
+    uint8_ptr = ctypes.POINTER(ctypes.c_uint8)
+    c_func(
+        boards.ctypes.data_as(uint8_ptr), ctypes.c_uint32(num_boards), players.ctypes.data_as(uint8_ptr),
+        strategies.ctypes.data_as(uint8_ptr), depths.ctypes.data_as(uint8_ptr), ctypes.c_uint8(tt_size_log2),
+        ctypes.c_void_p(None if table is None else table.handle), ctypes.c_uint8(num_threads), ctypes.c_uint32(options),
+        _seed_argument(seed), out_moves.ctypes.data_as(uint8_ptr),
+        out_scores.ctypes.data_as(ctypes.POINTER(ctypes.c_float)),
+    )
+
+    return out_moves, out_scores
+
+
+def player_config(strategy, depth=1, time_budget_ms=0, endgame_empties=14, num_threads=1, options=DEFAULT_OPTIONS):
+    """
+    :param strategy: A name from `strategy_indices`.
+    :param depth: Search depth. Ignored if `time_budget_ms` is not 0.
+    :param time_budget_ms: If not 0, every move is searched as in `best_move_timed` with this budget.
+    :param endgame_empties: See `best_move`.
+    :param num_threads: Search threads per move. 0 uses the OpenMP default.
+    :param options: See `best_move`.
+    :return: A `PlayerConfig` for `play_games`.
+    """
+    assert strategy in strategy_indices
+    _check_pattern_weights(strategy)
+    assert 0 < depth < 64, depth
+    assert 0 <= time_budget_ms < 2 ** 32, time_budget_ms
+    assert 0 <= endgame_empties <= 64, endgame_empties
+    assert 0 <= num_threads < 256, num_threads
+    assert 0 <= options < 2 ** 32, options
+    return PlayerConfig(strategy=strategy_indices[strategy], depth=depth,
+                        endgame_empties=0 if strategy == 'random' else endgame_empties, num_threads=num_threads,
+                        time_budget_ms=time_budget_ms, options=options)
+
+
+def play_games(black, white, seeds, start_board=None, tt_size_log2=16, num_threads=0):
+    """
+    Plays whole games in C++, one thread per game. Black moves first. There is no Python call between moves.
+
+    :param black: `PlayerConfig` of black.
+    :param white: `PlayerConfig` of white.
+    :param seeds: One seed per game, for the random choice between equally valued moves. A game is reproducible from
+    its seed if both configs use one search thread.
+    :param start_board: A `NativeBoard` to start from, or None for the standard starting position.
+    :param tt_size_log2: Each game has its own transposition table with 2^tt_size_log2 buckets of 64 bytes.
+    :param num_threads: Number of games played at the same time. 0 uses the OpenMP default.
+    :return: Array of shape (len(seeds),) and dtype `GAME_RECORD_DTYPE`.
+    """
+    c_func = getattr(lib, 'play_games')
+
+    seeds = np.ascontiguousarray(seeds, dtype=np.uint64).reshape(-1)
+    num_games = seeds.shape[0]
+    assert isinstance(black, PlayerConfig) and isinstance(white, PlayerConfig)
+    assert 0 < tt_size_log2 < 32, tt_size_log2
+    assert 0 <= num_threads < 256, num_threads
+
+    records = np.zeros(num_games, dtype=GAME_RECORD_DTYPE)
+    c_func(
+        ctypes.byref(black), ctypes.byref(white), None if start_board is None else start_board.pointer,
+        seeds.ctypes.data_as(ctypes.POINTER(ctypes.c_uint64)), ctypes.c_uint32(num_games),
+        ctypes.c_uint8(tt_size_log2), ctypes.c_uint8(num_threads), records.ctypes.data_as(ctypes.c_void_p),
+    )
+    return records
+
+
+def play_game(black, white, seed=0, start_board=None, tt_size_log2=16):
+    """
+    Plays one game in C++. See `play_games`.
+
+    :return: A record of `GAME_RECORD_DTYPE`. `record['moves'][:record['num_moves']]` are the linear indices of the
+    moves in the order they were played.
+    """
+    return play_games(black, white, [seed], start_board=start_board, tt_size_log2=tt_size_log2, num_threads=1)[0]
+
+
+def self_play_games(config, seeds, num_random_moves=0, tt_size_log2=16, num_threads=0):
+    """
+    Plays games of `config` against itself in C++, one thread per game, and records every position where a player has
+    a legal move.
+
+    :param config: `PlayerConfig` of both players. `time_budget_ms` must be 0.
+    :param seeds: One seed per game, for the random opening moves and the random choice between equally valued moves.
+    :param num_random_moves: The first moves of each game are picked at random. Their positions are still searched.
+    :param tt_size_log2: Each game has its own transposition table with 2^tt_size_log2 buckets of 64 bytes.
+    :param num_threads: Number of games played at the same time. 0 uses the OpenMP default.
+    :return: Array of `POSITION_RECORD_DTYPE`. The positions of each game are contiguous and in order, and games are in
+    the order of `seeds`.
+    """
+    c_func = getattr(lib, 'self_play_games')
+
+    seeds = np.ascontiguousarray(seeds, dtype=np.uint64).reshape(-1)
+    num_games = seeds.shape[0]
+    assert isinstance(config, PlayerConfig) and config.time_budget_ms == 0
+    assert 0 <= num_random_moves <= MAX_GAME_MOVES, num_random_moves
+    assert 0 < tt_size_log2 < 32, tt_size_log2
+    assert 0 <= num_threads < 256, num_threads
+
+    positions = np.zeros((num_games, MAX_GAME_MOVES), dtype=POSITION_RECORD_DTYPE)
+    num_positions = np.zeros(num_games, dtype=np.uint8)
+    c_func(
+        ctypes.byref(config), seeds.ctypes.data_as(ctypes.POINTER(ctypes.c_uint64)), ctypes.c_uint32(num_games),
+        ctypes.c_uint8(num_random_moves), ctypes.c_uint8(tt_size_log2), ctypes.c_uint8(num_threads),
+        positions.ctypes.data_as(ctypes.c_void_p), num_positions.ctypes.data_as(ctypes.POINTER(ctypes.c_uint8)),
+    )
+    return positions[np.arange(MAX_GAME_MOVES) < num_positions[:, None]]
@@ -0,0 +1,225 @@
+"""
+Fits the weights of the 'pattern' strategy (heuristic 9), and writes them to pattern_weights.bin, where othello_ctypes
+loads them at import. See `pattern_heuristic` in othello.h.
+
+    python pattern_evaluator.py --num-games 2000
+    python pattern_evaluator.py --dataset selfplay
+
+Games start from random openings and are played by the 'all' strategy, with the endgame solved exactly. With
+--dataset, the positions of a self_play_dataset.py directory are used instead. Every position is labelled with the final
+disk difference for the player to move. For each game phase, the bias and pattern weights
+that predict the label are fitted by ridge regression, solved with conjugate gradients.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import opening_book
+import othello_ctypes
+import self_play_dataset
+
+# Same as kPatternSizes in othello.h. Square `x + 8 * y` is (x, y). Pattern i is indexed by the sum of
+# 3^j * (0 if square j of the pattern is empty, 1 if it is the player's, 2 if it is the opponent's).
+PATTERN_SQUARES = [
+    list(range(0, 8)),  # Edge.
+    list(range(8, 16)),
+    list(range(16, 24)),
+    list(range(24, 32)),
+    [0, 1, 2, 8, 9, 10, 16, 17, 18],  # 3x3 corner.
+    [0, 1, 2, 3, 4, 8, 9, 10, 11, 12],  # 2x5 corner.
+] + [[k + 9 * j for j in range(8 - k)] for k in range(5)]  # Diagonals of 8 to 4 squares.
+PATTERN_NAMES = ['edge', 'row 2', 'row 3', 'row 4', 'corner 3x3', 'corner 2x5', 'diagonal 8', 'diagonal 7',
+                 'diagonal 6', 'diagonal 5', 'diagonal 4']
+NUM_PHASES = 6
+MAGIC = b'OTHPATT1'
+
+
+def pattern_offsets():
+    """
+    :return: (offset of each pattern's weights within a phase, number of weights of a phase). The bias comes first.
+    """
+    offsets = []
+    offset = 1
+    for squares in PATTERN_SQUARES:
+        offsets.append(offset)
+        offset += 3 ** len(squares)
+    return offsets, offset
+
+
+def phase(num_disks):
+    """
+    Same as `pattern_phase` in othello.h.
+    """
+    return np.minimum(NUM_PHASES - 1, (np.asarray(num_disks) - 4) // 10)
+
+
+def _symmetry_squares():
+    """
+    :return: int array of shape (8, 64). Row s has the square of the board that goes to each square in symmetry s. See
+    `opening_book.transform`.
+    """
+    ret = np.zeros((opening_book.NUM_SYMMETRIES, 64), dtype=np.int64)
+    for symmetry in range(opening_book.NUM_SYMMETRIES):
+        for square in range(64):
+            ret[symmetry, opening_book.transform(1 << square, symmetry).bit_length() - 1] = square
+    return ret
+
+
+def feature_indices(own, opp):
+    """
+    :param own: bool array of shape (N, 64), the squares of the player to move.
+    :param opp: bool array of shape (N, 64), the squares of the opponent.
+    :return: int array of shape (N, 1 + 8 * number of patterns). Indices of the weights of each position within its
+    phase, starting with the bias. A position's value is the sum of these weights.
+    """
+    cells = np.asarray(own, dtype=np.int64) + 2 * np.asarray(opp, dtype=np.int64)
+    offsets, _ = pattern_offsets()
+    columns = [np.zeros(cells.shape[0], dtype=np.int64)]
+    for squares in _symmetry_squares():
+        transformed = cells[:, squares]
+        for offset, pattern_squares in zip(offsets, PATTERN_SQUARES):
+            powers = 3 ** np.arange(len(pattern_squares), dtype=np.int64)
+            columns.append(offset + transformed[:, pattern_squares] @ powers)
+    return np.stack(columns, axis=1)
+
+
+def predict(weights, own, opp):
+    """
+    :param weights: float array of shape (NUM_PHASES, number of weights of a phase).
+    :return: float array of shape (N,). Predicted final disk difference of each position, for the player to move.
+    """
+    indices = feature_indices(own, opp)
+    phases = phase(np.count_nonzero(own, axis=1) + np.count_nonzero(opp, axis=1))
+    return weights[phases[:, None], indices].sum(axis=1)
+
+
+def self_play_positions(num_games, depth=4, num_random_moves=8, endgame_empties=14, seed=0):
+    """
+    :return: (own, opp, labels). own and opp are bool arrays of shape (N, 64) with the squares of the player to move
+    and of the opponent. labels is the final disk difference for the player to move.
+    """
+    config = othello_ctypes.player_config('all', depth=depth, endgame_empties=endgame_empties)
+    seeds = np.random.default_rng(seed).integers(0, 2 ** 64, size=num_games, dtype=np.uint64)
+    return dataset_positions(othello_ctypes.self_play_games(config, seeds, num_random_moves=num_random_moves))
+
+
+def dataset_positions(positions):
+    """
+    :param positions: Array of `othello_ctypes.POSITION_RECORD_DTYPE`, such as a slice of a `self_play_dataset.Dataset`.
+    :return: (own, opp, labels). See `self_play_positions`.
+    """
+    own, opp = self_play_dataset.own_and_opponent(positions)
+    return own, opp, positions['outcome'].astype(np.float64)
+
+
+def fit(own, opp, labels, l2=100.0, num_iterations=200):
+    """
+    Ridge regression of `labels` on the pattern weights, separately for each phase.
+
+    :param l2: Penalty on the squared weights, except the bias.
+    :return: float32 array of shape (NUM_PHASES, number of weights of a phase).
+    """
+    _, phase_size = pattern_offsets()
+    weights = np.zeros((NUM_PHASES, phase_size), dtype=np.float64)
+    indices = feature_indices(own, opp)
+    phases = phase(np.count_nonzero(own, axis=1) + np.count_nonzero(opp, axis=1))
+    penalty = np.full(phase_size, l2)
+    penalty[0] = 0
+    for phase_index in range(NUM_PHASES):
+        phase_indices = indices[phases == phase_index]
+        phase_labels = labels[phases == phase_index]
+        if len(phase_labels) == 0:
+            continue
+        flat_indices = phase_indices.ravel()
+
+        def normal_matvec(w):
+            # (A^T A + penalty) w, where row i of A has a 1 at each of phase_indices[i].
+            row_sums = w[phase_indices].sum(axis=1)
+            return np.bincount(flat_indices, weights=np.repeat(row_sums, phase_indices.shape[1]),
+                               minlength=phase_size) + penalty * w
+
+        # Conjugate gradients on the normal equations.
+        rhs = np.bincount(flat_indices, weights=np.repeat(phase_labels, phase_indices.shape[1]), minlength=phase_size)
+        w = np.zeros(phase_size)
+        residual = rhs.copy()
+        direction = residual.copy()
+        residual_norm = residual @ residual
+        for _ in range(num_iterations):
+            product = normal_matvec(direction)
+            step = residual_norm / (direction @ product)
+            w += step * direction
+            residual -= step * product
+            next_residual_norm = residual @ residual
+            if next_residual_norm <= 1e-12 * (rhs @ rhs):
+                break
+            direction = residual + (next_residual_norm / residual_norm) * direction
+            residual_norm = next_residual_norm
+        weights[phase_index] = w
+    return weights.astype(np.float32)
+
+
+def save_weights(filename, weights):
+    """
+    Writes the format read by `load_pattern_weights` in othello.h.
+    """
+    _, phase_size = pattern_offsets()
+    weights = np.asarray(weights, dtype='<f4')
+    assert weights.shape == (NUM_PHASES, phase_size), weights.shape
+    header = np.array([NUM_PHASES, len(PATTERN_SQUARES)] + [len(squares) for squares in PATTERN_SQUARES], dtype='<u4')
+    with open(filename, 'wb') as f:
+        f.write(MAGIC)
+        f.write(header.tobytes())
+        f.write(weights.tobytes())
+
+
+def load_weights(filename):
+    """
+    :return: float32 array of shape (NUM_PHASES, number of weights of a phase).
+    """
+    _, phase_size = pattern_offsets()
+    with open(filename, 'rb') as f:
+        assert f.read(len(MAGIC)) == MAGIC, filename
+        header = np.frombuffer(f.read(4 * (2 + len(PATTERN_SQUARES))), dtype='<u4')
+        assert list(header) == [NUM_PHASES, len(PATTERN_SQUARES)] + [len(squares) for squares in PATTERN_SQUARES]
+        return np.frombuffer(f.read(), dtype='<f4').reshape(NUM_PHASES, phase_size).copy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--num-games', type=int, default=2000)
+    parser.add_argument('--depth', type=int, default=4, help='Search depth of the self-play games.')
+    parser.add_argument('--random-moves', type=int, default=8, help='Random opening moves of each game.')
+    parser.add_argument('--dataset', help='Fit to the positions of this dataset instead of playing games.')
+    parser.add_argument('--l2', type=float, default=100.0)
+    parser.add_argument('--validation', type=float, default=0.1,
+                        help='Fraction of games held out, to report error. The end of the dataset with --dataset.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=othello_ctypes.PATTERN_WEIGHTS_FILENAME)
+    args = parser.parse_args()
+
+    start_time = time.time()
+    if args.dataset:
+        dataset = self_play_dataset.Dataset(args.dataset)
+        num_training = len(dataset) - int(len(dataset) * args.validation)
+        training = dataset_positions(dataset[:num_training])
+        validation = dataset_positions(dataset[num_training:])
+    else:
+        num_validation_games = int(args.num_games * args.validation)
+        training = self_play_positions(args.num_games - num_validation_games, depth=args.depth,
+                                       num_random_moves=args.random_moves, seed=args.seed)
+        validation = self_play_positions(num_validation_games, depth=args.depth, num_random_moves=args.random_moves,
+                                         seed=args.seed + 1)
+    print('{} positions in {:.1f} seconds'.format(len(training[2]), time.time() - start_time), flush=True)
+
+    weights = fit(*training, l2=args.l2)
+    for name, (own, opp, labels) in [('Training', training), ('Validation', validation)]:
+        if len(labels):
+            print('{} error: {:.2f} disks'.format(name, np.sqrt(np.mean((predict(weights, own, opp) - labels) ** 2))))
+    save_weights(args.output, weights)
+    print('Wrote {}.'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
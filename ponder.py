@@ -0,0 +1,129 @@
+"""
+Searches on the opponent's time. After the engine moves, `Ponder.start` searches the engine's answer to each of the
+opponent's replies in a background thread, deepening one depth at a time over all replies, until it is stopped or
+reaches its maximum depth. When the opponent's move is known, `Ponder.take` stops the thread and hands over the result
+for that reply. The work spent on the other replies is discarded, but everything stays in the shared transposition
+table, so a search that still has to be run afterwards starts warm.
+
+The ctypes calls release the GIL, so the thread searches while the main thread waits for input.
+"""
+
+import threading
+
+import numpy as np
+
+import othello_ctypes
+
+
+def opponent(player):
+    return 'W' if player == 'B' else 'B'
+
+
+def likely_replies(board, player, num_replies, depth=2):
+    """
+    :param board: An `othello_ctypes.NativeBoard` with `player` to move.
+    :return: The `num_replies` legal moves of `player` after which the other player's shallow search scores lowest.
+    """
+    replies = board.get_legal_moves(player)
+    if num_replies is None or len(replies) <= num_replies:
+        return replies
+    boards = []
+    for reply in replies:
+        next_board = board.copy()
+        next_board.move(reply, player)
+        boards.append(next_board.squares)
+    _, scores = othello_ctypes.best_moves_batch(np.array(boards), opponent(player), 'all', depth, tt_size_log2=12)
+    return [replies[i] for i in np.argsort(scores, kind='stable')[:num_replies]]
+
+
+class Ponder(object):
+    def __init__(self, table, strategy='all', num_threads=0, book=None, max_replies=None, max_depth=20,
+                 endgame_empties=14, seed=None):
+        """
+        :param table: `othello_ctypes.TranspositionTable` shared with the engine's own searches.
+        :param max_replies: Ponder only on this many likely replies. See `likely_replies`. If None, all replies are
+        searched.
+        :param max_depth: The thread stops after searching every reply to this depth.
+        Other parameters are passed to `othello_ctypes.best_move` and should match the engine's own searches, so that
+        a pondered result is the move the engine would have found.
+        """
+        self.table = table
+        self.strategy = strategy
+        self.num_threads = num_threads
+        self.book = book
+        self.max_replies = max_replies
+        self.max_depth = max_depth
+        self.endgame_empties = endgame_empties
+        self.seed = seed
+
+        self.lock = threading.Lock()
+        self.thread = None
+        self.control = None
+        self.results = {}  # Reply to (move, depth) of the deepest completed search.
+
+    def start(self, board, player):
+        """
+        Starts pondering and returns immediately. A previous ponder is stopped first.
+
+        :param board: An `othello_ctypes.NativeBoard`, after the engine's move. It is copied.
+        :param player: The opponent, who is to move on `board`.
+        """
+        self.stop()
+        self.results = {}
+        engine_player = opponent(player)
+        boards = {}
+        for reply in likely_replies(board, player, self.max_replies):
+            boards[reply] = board.copy()
+            boards[reply].move(reply, player)
+        # Deeper searches than the number of empty squares after the reply are all the same.
+        num_empty = int(np.count_nonzero(board.squares == othello_ctypes.EMPTY_SQUARE)) - 1
+        max_depth = min(self.max_depth, max(1, num_empty))
+        self.control = othello_ctypes.SearchControl()
+        self.thread = threading.Thread(target=self._run, args=(boards, engine_player, max_depth, self.control),
+                                       daemon=True)
+        self.thread.start()
+
+    def _run(self, boards, player, max_depth, control):
+        for depth in range(1, max_depth + 1):
+            for reply, board in boards.items():
+                try:
+                    move, _ = othello_ctypes.best_move(
+                        board, player, self.strategy, depth, table=self.table, num_threads=self.num_threads,
+                        book=self.book, endgame_empties=self.endgame_empties, seed=self.seed, control=control)
+                except othello_ctypes.SearchCancelled:
+                    return
+                with self.lock:
+                    self.results[reply] = (move, depth)
+                if control.is_cancelled:
+                    return
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def poll(self):
+        """
+        :return: dict from reply to (move, depth) of its deepest completed search, so far.
+        """
+        with self.lock:
+            return dict(self.results)
+
+    def stop(self):
+        """
+        Cancels the running search, and waits for the thread to end.
+        """
+        if self.thread is None:
+            return
+        self.control.cancel()
+        self.thread.join()
+        self.control.close()
+        self.thread = None
+        self.control = None
+
+    def take(self, reply):
+        """
+        Stops pondering, and hands over the result for the opponent's actual move.
+
+        :return: (move, depth), or None if `reply` was not searched to depth 1.
+        """
+        self.stop()
+        return self.results.get(reply)
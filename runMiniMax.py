@@ -1,5 +1,4 @@
 import othello
-import copy
 import math
 class MiniMax(object):
 
@@ -18,7 +17,7 @@ class MiniMax(object):
         minimax_move = None
         minimax_score = -math.inf
 
-        board = copy.deepcopy(initial_board)
+        board = initial_board
 
         if not legal_moves:
             if not board.get_legal_moves(board.get_opponent(player)):
@@ -37,10 +36,9 @@ class MiniMax(object):
             return -sc, None
 
         for move in legal_moves:
-            board = copy.deepcopy(initial_board)
-            board.make_move(move, player, play_test=False)
-
+            record = board.move(move, player)
             sc , _ = MiniMax.minimax_new_play(board, board.get_opponent(player), depth-1)
+            board.undo(record)
             sc = -1*sc
             if sc > minimax_score:
                 minimax_score = sc
@@ -61,12 +59,10 @@ class MiniMax(object):
         minimax_move = None
         minimax_score = 0
 
-        initial_board = copy.deepcopy(board)
         b_temp, w_temp = board.heuristic_weighted()
         for move in legal_moves:
             temp_score = 0
-            board = copy.deepcopy(initial_board)
-            board.make_move(move, player, play_test=False)
+            record = board.move(move, player)
 
             if player == 'B':
                 temp_score = b_temp
@@ -74,6 +70,7 @@ class MiniMax(object):
                 temp_score = w_temp
 
             b_score, w_score, _ = MiniMax.minimax_play(board, board.get_opponent(player), depth - 1)
+            board.undo(record)
             if player == 'B':
                 if b_score + temp_score > minimax_score:
                     minimax_score = b_score + temp_score
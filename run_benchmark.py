@@ -0,0 +1,234 @@
+"""
+Times every engine at each depth on the fixed positions of benchmark_positions.json, and writes the results as JSON.
+Saved results can be compared to flag slowdowns.
+
+    python run_benchmark.py --output baseline.json
+    (change something, rebuild)
+    python run_benchmark.py --output new.json --baseline baseline.json
+
+or, to compare two saved files without running anything,
+
+    python run_benchmark.py --compare baseline.json new.json
+
+The comparison prints every (engine, depth) whose total time over all positions, or whose time on one position, grew
+by more than --threshold, and exits with status 1 if there is any. The cpp engine is single-threaded, with a fresh
+transposition table for every search and the endgame solver disabled, so its node counts are deterministic and are
+compared too. A changed node count is reported but is not a failure, since it is expected when the search changes.
+
+Each search is repeated --repeats times and the fastest is kept. Python's random module is seeded with --seed before
+each engine, and the cpp engine breaks ties with --seed, so the recorded moves are the same from run to run.
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+from os import path
+
+import numpy as np
+
+import othello
+import othello_ctypes
+import runMiniMax
+from alphaBeta import alphaBeta
+from run_evaluation import find_move_third_party_dhconnelly
+
+POSITIONS_FILENAME = path.join(path.dirname(path.realpath(__file__)), 'benchmark_positions.json')
+
+DEFAULT_DEPTHS = {
+    'cpp': [1, 2, 3, 4, 5, 6, 7, 8],
+    'dhconnelly': [1, 2, 3, 4],
+    'alphabeta': [1, 2, 3],
+    'minimax': [1, 2, 3],
+}
+
+# Differences smaller than this are timer noise, whatever the ratio.
+MIN_SECONDS_DIFFERENCE = 2e-3
+
+
+def load_positions(filename=POSITIONS_FILENAME):
+    with open(filename, 'r') as f:
+        return json.load(f)['positions']
+
+
+def find_move(engine, board_str, player, depth, stats=None, seed=0):
+    """
+    :param board_str: Board string, as in `othello_ctypes.best_move`.
+    :param stats: `othello_ctypes.SearchStats` filled by the cpp engine, or None.
+    :param seed: Seed of the cpp engine's choice between equally valued moves.
+    :return: (move, seconds).
+    """
+    if engine == 'cpp':
+        return othello_ctypes.best_move(board_str, player, 'all', depth=depth, num_threads=1, endgame_empties=0,
+                                        seed=seed, stats=stats)
+    board = othello.Board(board_str.replace('.', '0'))
+    start_time = time.time()
+    if engine == 'dhconnelly':
+        move, _ = find_move_third_party_dhconnelly(board, player, depth=depth)
+    elif engine == 'alphabeta':
+        move = alphaBeta(state=board, depth=depth, player=player)
+    elif engine == 'minimax':
+        move = runMiniMax.MiniMax.minimax_search(board, player, depth=depth)
+    else:
+        raise ValueError('Unknown engine: {}'.format(engine))
+    return move, time.time() - start_time
+
+
+def benchmark(engines, depths=None, repeats=5, seed=0, positions=None):
+    """
+    :param depths: dict from engine name to a list of depths. Defaults to `DEFAULT_DEPTHS`.
+    :param seed: Seeds Python's random module before each engine, and the cpp engine's tie-breaking.
+    :return: List of results, one per engine, depth and position.
+    """
+    depths = depths or DEFAULT_DEPTHS
+    positions = positions or load_positions()
+    results = []
+    for engine in engines:
+        random.seed(seed)
+        np.random.seed(seed)
+        # Warm up: the first cpp search also builds the static tables.
+        find_move(engine, positions[0]['board'], positions[0]['player'], 1, seed=seed)
+        for depth in depths[engine]:
+            total_seconds = 0
+            for position in positions:
+                stats = othello_ctypes.SearchStats() if engine == 'cpp' else None
+                times = []
+                for _ in range(repeats):
+                    move, seconds = find_move(engine, position['board'], position['player'], depth, stats=stats,
+                                              seed=seed)
+                    times.append(stats.seconds if stats is not None else seconds)
+                result = {
+                    'engine': engine,
+                    'depth': depth,
+                    'position': position['name'],
+                    'phase': position['phase'],
+                    'seconds': min(times),
+                    'median_seconds': float(np.median(times)),
+                    'move': None if move is None else list(move),
+                }
+                if stats is not None:
+                    result['nodes'] = stats.nodes
+                results.append(result)
+                total_seconds += result['seconds']
+            print('{:>10} depth {}: {:.4f} seconds'.format(engine, depth, total_seconds), flush=True)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=path.dirname(path.realpath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _key(result):
+    return result['engine'], result['depth'], result['position']
+
+
+def _totals(results):
+    totals = {}
+    for result in results:
+        key = (result['engine'], result['depth'], 'total')
+        totals[key] = totals.get(key, 0) + result['seconds']
+    return totals
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    :param baseline: Benchmark output, as written by `main`.
+    :param current: Same, for the version being checked.
+    :param threshold: Relative slowdown that is flagged. 0.2 flags anything more than 20% slower.
+    :return: List of (engine, depth, position, baseline seconds, current seconds) that got slower. Position is 'total'
+    for the sum over all positions.
+    """
+    old_seconds = {_key(r): r['seconds'] for r in baseline['results']}
+    new_seconds = {_key(r): r['seconds'] for r in current['results']}
+    old_seconds.update(_totals(r for r in baseline['results'] if _key(r) in new_seconds))
+    new_seconds.update(_totals(r for r in current['results'] if _key(r) in old_seconds))
+
+    slowdowns = []
+    for key in sorted(set(old_seconds) & set(new_seconds), key=lambda k: (k[0], k[1], k[2] != 'total', k[2])):
+        old, new = old_seconds[key], new_seconds[key]
+        if new > old * (1 + threshold) and new - old > MIN_SECONDS_DIFFERENCE:
+            slowdowns.append(key + (old, new))
+    return slowdowns
+
+
+def node_count_changes(baseline, current):
+    """
+    :return: List of (engine, depth, position, baseline nodes, current nodes) that differ.
+    """
+    old_nodes = {_key(r): r['nodes'] for r in baseline['results'] if 'nodes' in r}
+    changes = []
+    for result in current['results']:
+        key = _key(result)
+        if key in old_nodes and result.get('nodes') != old_nodes[key]:
+            changes.append(key + (old_nodes[key], result.get('nodes')))
+    return changes
+
+
+def print_comparison(baseline, current, threshold=0.2):
+    """
+    :return: True if nothing got slower.
+    """
+    for engine, depth, position, old, new in node_count_changes(baseline, current):
+        print('Node count changed: {} depth {} {}: {} -> {}'.format(engine, depth, position, old, new))
+    slowdowns = compare(baseline, current, threshold=threshold)
+    for engine, depth, position, old, new in slowdowns:
+        print('SLOWER: {} depth {} {}: {:.4f} -> {:.4f} seconds ({:+.1%})'.format(
+            engine, depth, position, old, new, new / old - 1))
+    if not slowdowns:
+        print('No slowdowns above {:.0%}.'.format(threshold))
+    return not slowdowns
+
+
+def load_results(filename):
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', nargs='+', choices=sorted(DEFAULT_DEPTHS), default=sorted(DEFAULT_DEPTHS),
+                        help='Engines to time.')
+    parser.add_argument('--max-depth', type=int, help='Only time depths up to this one.')
+    parser.add_argument('--repeats', type=int, default=5, help='Number of times each search is run.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON file to write the results to.')
+    parser.add_argument('--baseline', help='Saved results to compare the new results to.')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='Compare two saved results without running the benchmark.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Relative slowdown that is flagged.')
+    args = parser.parse_args()
+
+    if args.compare:
+        ok = print_comparison(load_results(args.compare[0]), load_results(args.compare[1]), threshold=args.threshold)
+        raise SystemExit(0 if ok else 1)
+
+    depths = {engine: [d for d in engine_depths if args.max_depth is None or d <= args.max_depth]
+              for engine, engine_depths in DEFAULT_DEPTHS.items()}
+    current = {
+        'meta': {
+            'git_revision': git_revision(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'repeats': args.repeats,
+            'seed': args.seed,
+        },
+        'results': benchmark(args.engines, depths=depths, repeats=args.repeats, seed=args.seed),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=1, sort_keys=True)
+
+    if args.baseline:
+        ok = print_comparison(load_results(args.baseline), current, threshold=args.threshold)
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
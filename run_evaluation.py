@@ -93,20 +93,26 @@ def play_against_dhconnelly_use_cpp(our_depth=3, their_depth=3):
     board.force_place_symbol((3, 4), 'W')
     board.force_place_symbol((4, 3), 'W')
 
+    # Our engine reads `native_board` in place. Every move is applied to both boards.
+    native_board = othello_ctypes.NativeBoard.from_board(board)
+
     total_runtime = 0
     total_runtime_theirs = 0
+    table = othello_ctypes.TranspositionTable()
 
     while True:
-        move_b, elapsed_seconds = othello_ctypes.best_move(board_conversion.convert_to_our_cpp_board(board), player='B',
-                                                           strategy='all', depth=our_depth)
+        move_b, elapsed_seconds = othello_ctypes.best_move(native_board, player='B', strategy='all', depth=our_depth,
+                                                           table=table)
         total_runtime += elapsed_seconds
         if move_b is not None:
             board.make_move(move_b, 'B', play_test=False)
+            native_board.move(move_b, 'B')
 
         move_w, elapsed_seconds = find_move_third_party_dhconnelly(board, 'W', depth=their_depth)
         total_runtime_theirs += elapsed_seconds
         if move_w is not None:
             board.make_move(move_w, 'W', play_test=False)
+            native_board.move(move_w, 'W')
 
         if move_b is None and move_w is None:
             break
@@ -116,7 +122,7 @@ def play_against_dhconnelly_use_cpp(our_depth=3, their_depth=3):
     return board.get_winner(), total_runtime, total_runtime_theirs
 
 
-def play_against_our_baseline(our_depth=3, their_depth=3):
+def baseline_start_board():
     board = othello.Board()
 
     for i in range(8):
@@ -129,21 +135,29 @@ def play_against_our_baseline(our_depth=3, their_depth=3):
     board.force_place_symbol((3, 4), 'W')
     board.force_place_symbol((4, 3), 'W')
 
+    return othello_ctypes.NativeBoard.from_board(board)
+
+
+def play_against_our_baseline(our_depth=3, their_depth=3):
+    # Both sides search the same buffer in place, so there is no conversion between moves.
+    board = baseline_start_board()
+
     total_runtime = 0
     total_runtime_theirs = 0
+    table = othello_ctypes.TranspositionTable()
 
     while True:
-        move_b, elapsed_seconds = othello_ctypes.best_move(board_conversion.convert_to_our_cpp_board(board),
-                                                           player='B', strategy='all', depth=our_depth)
+        move_b, elapsed_seconds = othello_ctypes.best_move(board, player='B', strategy='all', depth=our_depth,
+                                                           table=table)
         total_runtime += elapsed_seconds
         if move_b is not None:
-            board.make_move(move_b, 'B', play_test=False)
+            board.move(move_b, 'B')
 
-        move_w, elapsed_seconds = othello_ctypes.best_move(board_conversion.convert_to_our_cpp_board(board),
-                                                           player='W', strategy='random', depth=their_depth)
+        move_w, elapsed_seconds = othello_ctypes.best_move(board, player='W', strategy='random', depth=their_depth,
+                                                           table=table)
         total_runtime_theirs += elapsed_seconds
         if move_w is not None:
-            board.make_move(move_w, 'W', play_test=False)
+            board.move(move_w, 'W')
 
         if move_b is None and move_w is None:
             break
@@ -152,10 +166,32 @@ def play_against_our_baseline(our_depth=3, their_depth=3):
     return board.get_winner(), total_runtime, total_runtime_theirs
 
 
-def runtime_fixed_board(depth):
-    board = othello.Board('..................B..B....BWBW...WWWWW....BBBWW.................'.replace('.', '0'))
-    _, elapsed_seconds = othello_ctypes.best_move(board_conversion.convert_to_our_cpp_board(board), player='B',
-                                                  strategy='all', depth=depth)
+def play_against_our_baseline_native(our_depth=3, their_depth=3, num_games=1, seed=0):
+    """
+    Same games as `play_against_our_baseline`, played entirely in C++ with `othello_ctypes.play_games`, several at a
+    time.
+
+    :return: (winners, our total runtimes, their total runtimes), one item per game.
+    """
+    records = othello_ctypes.play_games(othello_ctypes.player_config('all', depth=our_depth),
+                                        othello_ctypes.player_config('random', depth=their_depth),
+                                        seeds=np.arange(seed, seed + num_games), start_board=baseline_start_board())
+    winners = ['B' if record['black_score'] >= record['white_score'] else 'W' for record in records]
+    is_ours = records['players'] == 0
+    is_played = np.arange(othello_ctypes.MAX_GAME_MOVES) < records['num_moves'][:, None]
+    total_runtimes = np.sum(records['seconds'] * (is_played & is_ours), axis=1)
+    total_runtimes_theirs = np.sum(records['seconds'] * (is_played & ~is_ours), axis=1)
+    return winners, total_runtimes, total_runtimes_theirs
+
+
+FIXED_BOARD = '..................B..B....BWBW...WWWWW....BBBWW.................'
+
+
+def runtime_fixed_board(depth, stats=None, num_threads=0, options=othello_ctypes.DEFAULT_OPTIONS, strategy='all'):
+    board = othello.Board(FIXED_BOARD.replace('.', '0'))
+    _, elapsed_seconds = othello_ctypes.best_move(othello_ctypes.NativeBoard.from_board(board), player='B',
+                                                  strategy=strategy, depth=depth, num_threads=num_threads,
+                                                  options=options, stats=stats)
     return elapsed_seconds
 
 
@@ -193,7 +229,7 @@ def winrate_benchmark2():
     # for our_depth, their_depth in [(1, d), (2, d), (3, d), (4, d), (5, d), (6, d), ]:
     # for our_depth, their_depth in [(1, 2), (2, 2), (3, 2), (4, 2), (5, 2), (6, 2), ]:
     # for our_depth, their_depth in [(1, 3), (2, 3), (3, 3), (4, 3), (5, 3), (6, 3), ]:
-        winners = [play_against_our_baseline(our_depth=our_depth, their_depth=their_depth)[0] for _ in range(30)]
+        winners, _, _ = play_against_our_baseline_native(our_depth=our_depth, their_depth=their_depth, num_games=30)
         print('our depth: {}, their depth: {}'.format(our_depth, their_depth))
         print(winners)
         rate = win_rate(winners, 'B')
@@ -225,9 +261,99 @@ def runtime_benchmark2():
     print('(depth {}): {:.5f} seconds'.format(depth, np.mean(total_runtimes)))
 
 
+def search_stats_report(max_depth=10, num_threads=0, options=othello_ctypes.DEFAULT_OPTIONS):
+    """
+    Prints the search counters of the fixed board at each depth, each with a fresh transposition table. Compare runs to
+    see whether a slowdown comes from searching more nodes (move ordering, pruning), from fewer table hits, or from
+    slower nodes.
+    """
+    print('{:>5} {:>11} {:>9} {:>11} {:>8} {:>8} {:>8} {:>9} {:>7} {:>8}'.format(
+        'depth', 'nodes', 'seconds', 'nodes/s', 'tt hit', 'tt cut', 'first', 'cut idx', 're', 'balance'))
+    for depth in range(1, max_depth + 1):
+        stats = othello_ctypes.SearchStats()
+        runtime_fixed_board(depth, stats=stats, num_threads=num_threads, options=options)
+        print('{:>5} {:>11} {:>9.4f} {:>11.0f} {:>8.3f} {:>8} {:>8.3f} {:>9.3f} {:>7} {:>8.2f}'.format(
+            depth, stats.nodes, stats.seconds, stats.nodes_per_second, stats.tt_hit_rate, stats.tt_cutoffs,
+            stats.first_move_cutoff_rate, stats.mean_cutoff_move_index, stats.researches, stats.thread_balance))
+    print('Per-thread nodes at depth {}: {}'.format(max_depth, stats.thread_nodes))
+
+
+def probcut_benchmark(max_depth=10, game_depth=6, num_games=40, num_opening_moves=4):
+    """
+    Compares the search with and without `othello_ctypes.MULTI_PROBCUT`. Prints the nodes and time on the fixed board
+    at each depth, then the win rate of the selective search against the full search at `game_depth`. Each plays black
+    in half the games, after `num_opening_moves` random moves.
+    """
+    full_options = othello_ctypes.DEFAULT_OPTIONS
+    probcut_options = othello_ctypes.DEFAULT_OPTIONS | othello_ctypes.MULTI_PROBCUT
+    print('{:>5} {:>11} {:>11} {:>7} {:>9} {:>9}'.format(
+        'depth', 'nodes', 'probcut', 'ratio', 'seconds', 'probcut'))
+    for depth in range(1, max_depth + 1):
+        full_stats, probcut_stats = othello_ctypes.SearchStats(), othello_ctypes.SearchStats()
+        runtime_fixed_board(depth, stats=full_stats, num_threads=1, options=full_options)
+        runtime_fixed_board(depth, stats=probcut_stats, num_threads=1, options=probcut_options)
+        print('{:>5} {:>11} {:>11} {:>7.3f} {:>9.4f} {:>9.4f}'.format(
+            depth, full_stats.nodes, probcut_stats.nodes, probcut_stats.nodes / full_stats.nodes, full_stats.seconds,
+            probcut_stats.seconds))
+
+    full = othello_ctypes.player_config('all', depth=game_depth, options=full_options)
+    probcut = othello_ctypes.player_config('all', depth=game_depth, options=probcut_options)
+    wins, draws, num_played = paired_games(probcut, full, num_games, num_opening_moves)
+    print('Depth {}: selective search won {}, drew {} and lost {} of {} games against the full search'.format(
+        game_depth, wins, draws, num_played - wins - draws, num_played))
+
+
+def paired_games(first, second, num_games, num_opening_moves):
+    """
+    Plays `first` against `second`, each as black in half the games. Both sides search deterministically apart from
+    ties, so each pair of games starts from its own random opening of `num_opening_moves` moves.
+
+    :return: (wins of `first`, draws, number of games).
+    """
+    rng = random.Random(0)
+    wins, draws = 0, 0
+    for game in range(num_games // 2):
+        start_board = othello_ctypes.NativeBoard()
+        for player in ['B', 'W'] * (num_opening_moves // 2):
+            start_board.move(rng.choice(start_board.get_legal_moves(player)), player)
+        as_black = othello_ctypes.play_game(first, second, seed=game, start_board=start_board)
+        as_white = othello_ctypes.play_game(second, first, seed=game, start_board=start_board)
+        wins += int(as_black['black_score'] > as_black['white_score']) + int(
+            as_white['white_score'] > as_white['black_score'])
+        draws += int(as_black['black_score'] == as_black['white_score']) + int(
+            as_white['white_score'] == as_white['black_score'])
+    return wins, draws, 2 * (num_games // 2)
+
+
+def pattern_benchmark(max_depth=10, game_depth=4, num_games=40, num_opening_moves=4):
+    """
+    Compares the 'pattern' strategy to 'all'. Prints the nodes and time of each on the fixed board at each depth, then
+    the win rate of 'pattern' against 'all' at `game_depth`. Needs the weights written by pattern_evaluator.py.
+    """
+    if not othello_ctypes.pattern_weights_loaded:
+        print('No pattern weights. Run pattern_evaluator.py first.')
+        return
+    print('{:>5} {:>11} {:>11} {:>9} {:>9}'.format('depth', 'all', 'pattern', 'seconds', 'pattern'))
+    for depth in range(1, max_depth + 1):
+        all_stats, pattern_stats = othello_ctypes.SearchStats(), othello_ctypes.SearchStats()
+        runtime_fixed_board(depth, stats=all_stats, num_threads=1)
+        runtime_fixed_board(depth, stats=pattern_stats, num_threads=1, strategy='pattern')
+        print('{:>5} {:>11} {:>11} {:>9.4f} {:>9.4f}'.format(
+            depth, all_stats.nodes, pattern_stats.nodes, all_stats.seconds, pattern_stats.seconds))
+
+    wins, draws, num_played = paired_games(othello_ctypes.player_config('pattern', depth=game_depth),
+                                           othello_ctypes.player_config('all', depth=game_depth), num_games,
+                                           num_opening_moves)
+    print("Depth {}: 'pattern' won {}, drew {} and lost {} of {} games against 'all'".format(
+        game_depth, wins, draws, num_played - wins - draws, num_played))
+
+
 if __name__ == '__main__':
     runtime_benchmark()
     runtime_benchmark2()
+    search_stats_report()
+    probcut_benchmark()
+    pattern_benchmark()
     winrate_benchmark1()
     winrate_benchmark2()
     winrate_benchmark3()
@@ -1,6 +1,9 @@
 import othello
 import time
 import othello_ctypes
+import opening_book
+import ponder
+from os import path
 import matplotlib.pyplot as pt
 import numpy as np
 from third_party import board_conversion
@@ -11,6 +14,18 @@ gui_y = None
 
 search_depths = [11] * 2 + [10] * 4 + [9]
 
+# If not None, the computer searches as deep as it can within this many milliseconds per move, instead of following
+# `search_depths`.
+search_time_budget_ms = None
+
+# If True, the computer searches its answers to the user's possible moves while the user thinks. See ponder.py.
+ponder_enabled = True
+# If not None, only this many of the user's likely moves are pondered on.
+ponder_max_replies = None
+
+# Generated by opening_book.py. Not used if the file does not exist.
+opening_book_filename = path.join(path.dirname(__file__), 'opening_book.npy')
+
 
 def search_depth_at_turn(turn):
     if turn >= len(search_depths):
@@ -21,6 +36,41 @@ def search_depth_at_turn(turn):
     return ret
 
 
+def load_opening_book():
+    if not path.isfile(opening_book_filename):
+        return None
+    book = opening_book.OpeningBook(opening_book_filename)
+    print('Loaded {} positions from {}'.format(len(book), opening_book_filename))
+    return book
+
+
+def make_ponder(table, book):
+    if not ponder_enabled:
+        return None
+    # With a time budget, pondering goes as deep as it can. The table is then warm for the timed search.
+    max_depth = max(search_depths) if search_time_budget_ms is None else 64
+    return ponder.Ponder(table, book=book, max_replies=ponder_max_replies, max_depth=max_depth)
+
+
+def find_computer_move(native_board, turn, table, book, pondered=None):
+    """
+    :param native_board: An `othello_ctypes.NativeBoard` kept in sync with the game board.
+    :param pondered: (move, depth) found by pondering on this position, or None. Without a time budget, it is played if
+    it is deep enough.
+    """
+    if search_time_budget_ms is None:
+        depth = search_depth_at_turn(turn)
+        if pondered is not None and pondered[1] >= depth:
+            print('Pondered to depth {}'.format(pondered[1]))
+            return pondered[0], 0.0
+        return othello_ctypes.best_move(native_board, player='B', strategy='all', depth=depth, table=table, book=book)
+    xy, depth, elapsed_seconds = othello_ctypes.best_move_timed(native_board, player='B', strategy='all',
+                                                                time_budget_ms=search_time_budget_ms, table=table,
+                                                                book=book)
+    print('Search depth: {}'.format(depth))
+    return xy, elapsed_seconds
+
+
 def open_window():
     fig = pt.figure()
     ax = fig.add_subplot(111)
@@ -51,19 +101,26 @@ def main():
 
     turn = 0
     total_elapsed_seconds = 0
+    table = othello_ctypes.TranspositionTable()
+    book = load_opening_book()
+    native_board = othello_ctypes.NativeBoard.from_board(game.board)
+    pondering = make_ponder(table, book)
+    pondered = None
 
     while True:
-        computer_xy, elapsed_seconds = othello_ctypes.best_move(
-            board_conversion.convert_to_our_cpp_board(game.board), player='B', strategy='all',
-            depth=search_depth_at_turn(turn))
+        computer_xy, elapsed_seconds = find_computer_move(native_board, turn, table, book, pondered)
+        pondered = None
         print(computer_xy, elapsed_seconds)
         total_elapsed_seconds += elapsed_seconds
         if computer_xy is not None:
             game.board.make_move(computer_xy, 'B', play_test=False)
+            native_board.move(computer_xy, 'B')
             game.board.print()  # Print after placing the W symbol.
 
         user_can_move = len(game.board.get_legal_moves('W')) > 0
         if user_can_move:
+            if pondering is not None:
+                pondering.start(native_board, 'W')
             user_entered_legal_move = False
             while not user_entered_legal_move:
                 input_string = game.get_user_input_string()  # Prompts for console input.
@@ -72,6 +129,9 @@ def main():
                     print('Invalid move: {}'.format(xy))
                     continue
                 game.board.make_move(xy, 'W', play_test=False)
+                native_board.move(xy, 'W')
+                if pondering is not None:
+                    pondered = pondering.take(xy)
                 game.board.print()  # Print after placing the W symbol.
                 user_entered_legal_move = True
 
@@ -80,6 +140,8 @@ def main():
         if computer_xy is None and not user_can_move:
             break
 
+    if pondering is not None:
+        pondering.stop()
     print(game.board.get_winner() + ' wins!')
     print('Total run time: {} seconds'.format(total_elapsed_seconds))
     return game.board.get_winner()
@@ -96,21 +158,28 @@ def main_gui():
 
     turn = 0
     total_elapsed_seconds = 0
+    table = othello_ctypes.TranspositionTable()
+    book = load_opening_book()
+    native_board = othello_ctypes.NativeBoard.from_board(game.board)
+    pondering = make_ponder(table, book)
+    pondered = None
 
     while True:
-        computer_xy, elapsed_seconds = othello_ctypes.best_move(
-            board_conversion.convert_to_our_cpp_board(game.board), player='B', strategy='all',
-            depth=search_depth_at_turn(turn))
+        computer_xy, elapsed_seconds = find_computer_move(native_board, turn, table, book, pondered)
+        pondered = None
         print(computer_xy, elapsed_seconds)
         total_elapsed_seconds += elapsed_seconds
         if computer_xy is not None:
             game.board.make_move(computer_xy, 'B', play_test=False)
+            native_board.move(computer_xy, 'B')
             game.board.print()  # Print after placing the W symbol.
             print(board_conversion.convert_to_our_cpp_board(game.board))
             game.board.plot(ax)
 
         user_can_move = len(game.board.get_legal_moves('W')) > 0
         if user_can_move:
+            if pondering is not None:
+                pondering.start(native_board, 'W')
             user_entered_legal_move = False
             while not user_entered_legal_move:
                 xy = get_input_from_gui()
@@ -118,6 +187,9 @@ def main_gui():
                     print('Invalid move: {}'.format(xy))
                     continue
                 game.board.make_move(xy, 'W', play_test=False)
+                native_board.move(xy, 'W')
+                if pondering is not None:
+                    pondered = pondering.take(xy)
                 game.board.print()  # Print after placing the W symbol.
                 print(board_conversion.convert_to_our_cpp_board(game.board))
                 game.board.plot(ax)
@@ -131,6 +203,8 @@ def main_gui():
         if computer_xy is None and not user_can_move:
             break
 
+    if pondering is not None:
+        pondering.stop()
     print(game.board.get_winner() + ' wins!')
     print('Total run time: {} seconds'.format(total_elapsed_seconds))
     return game.board.get_winner()
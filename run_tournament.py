@@ -0,0 +1,275 @@
+"""
+Plays many games between engine configurations in parallel, and streams the results to a JSONL or CSV file.
+
+Engines are given as engine:strategy:depth. For example,
+
+    python run_tournament.py --black cpp:all:1 cpp:all:2 cpp:all:3 --white dhconnelly:weighted:3 \
+        --games 100 --workers 8 --omp-threads 1 --output results.jsonl
+
+plays 100 games for each of the three pairings. Running the same command again skips the games already in
+results.jsonl.
+
+Engines:
+    cpp          othello_ctypes.best_move. `strategy` is a name from othello_ctypes.strategy_indices.
+    dhconnelly   Alpha-beta search of third_party/dhconnelly.py with its weighted score. `strategy` is ignored.
+    alphabeta    alphaBeta.alphaBeta. `strategy` is ignored.
+    minimax      runMiniMax.MiniMax.minimax_search. `strategy` is ignored.
+"""
+
+import argparse
+import collections
+import csv
+import json
+import multiprocessing
+import time
+from os import path
+
+import numpy as np
+
+import opening_book
+import othello
+import othello_ctypes
+import runMiniMax
+from alphaBeta import alphaBeta
+from run_evaluation import find_move_third_party_dhconnelly
+from third_party import board_conversion
+
+EngineSpec = collections.namedtuple('EngineSpec', ['engine', 'strategy', 'depth'])
+
+ENGINES = ('cpp', 'dhconnelly', 'alphabeta', 'minimax')
+
+RESULT_FIELDS = ['black', 'white', 'game', 'winner', 'black_score', 'white_score', 'num_moves', 'black_seconds',
+                 'white_seconds']
+
+
+def parse_engine_spec(spec):
+    parts = spec.split(':')
+    if len(parts) != 3:
+        raise argparse.ArgumentTypeError('Expected engine:strategy:depth. Got {}'.format(spec))
+    engine, strategy, depth = parts
+    if engine not in ENGINES:
+        raise argparse.ArgumentTypeError('Unknown engine: {}'.format(engine))
+    if engine == 'cpp' and strategy not in othello_ctypes.strategy_indices:
+        raise argparse.ArgumentTypeError('Unknown strategy: {}'.format(strategy))
+    if engine == 'cpp' and strategy == 'pattern' and not othello_ctypes.pattern_weights_loaded:
+        raise argparse.ArgumentTypeError('No pattern weights are loaded. See pattern_evaluator.py.')
+    if not depth.isdigit() or int(depth) <= 0:
+        raise argparse.ArgumentTypeError('Invalid depth: {}'.format(depth))
+    return EngineSpec(engine, strategy, int(depth))
+
+
+def format_engine_spec(spec):
+    return '{}:{}:{}'.format(*spec)
+
+
+def find_move(spec, board, player, table, omp_threads, book=None):
+    if spec.engine == 'cpp':
+        move, _ = othello_ctypes.best_move(board_conversion.convert_to_our_cpp_board(board), player=player,
+                                           strategy=spec.strategy, depth=spec.depth, table=table,
+                                           num_threads=omp_threads, book=book)
+        return move
+    elif spec.engine == 'dhconnelly':
+        move, _ = find_move_third_party_dhconnelly(board, player, depth=spec.depth)
+        return move
+    elif spec.engine == 'alphabeta':
+        return alphaBeta(state=board, depth=spec.depth, player=player)
+    elif spec.engine == 'minimax':
+        return runMiniMax.MiniMax.minimax_search(board, player, depth=spec.depth)
+    raise ValueError('Unknown engine: {}'.format(spec.engine))
+
+
+def play_native_game(black, white, omp_threads=0, seed=0):
+    """
+    Plays a game between two cpp engines entirely in C++. See `play_game`.
+    """
+    record = othello_ctypes.play_game(
+        othello_ctypes.player_config(black.strategy, depth=black.depth, num_threads=omp_threads),
+        othello_ctypes.player_config(white.strategy, depth=white.depth, num_threads=omp_threads), seed=seed)
+    num_moves = int(record['num_moves'])
+    seconds = record['seconds'][:num_moves]
+    is_black = record['players'][:num_moves] == othello_ctypes.player_indices['B']
+    black_score, white_score = int(record['black_score']), int(record['white_score'])
+    return {
+        'black': format_engine_spec(black),
+        'white': format_engine_spec(white),
+        'winner': 'B' if black_score >= white_score else 'W',
+        'black_score': black_score,
+        'white_score': white_score,
+        'num_moves': num_moves,
+        'black_seconds': float(np.sum(seconds[is_black])),
+        'white_seconds': float(np.sum(seconds[~is_black])),
+    }
+
+
+def play_game(black, white, omp_threads=0, book=None, seed=0):
+    """
+    Plays one game from the standard starting position. Black moves first. Games between two cpp engines without a book
+    are played by `play_native_game`.
+
+    :param book: An `opening_book.OpeningBook` used by the cpp engines, or None.
+    :param seed: Seed of the random choice between equally valued moves of the cpp engines. Only used by
+    `play_native_game`.
+    :return: dict with the fields in `RESULT_FIELDS`, except `game`.
+    """
+    if black.engine == 'cpp' and white.engine == 'cpp' and book is None:
+        return play_native_game(black, white, omp_threads=omp_threads, seed=seed)
+
+    board = othello.Game(othello.Board()).board
+    specs = {'B': black, 'W': white}
+    seconds = {'B': 0.0, 'W': 0.0}
+    num_moves = 0
+
+    with othello_ctypes.TranspositionTable() as table:
+        player = 'B'
+        num_passes = 0
+        while num_passes < 2:
+            start_time = time.time()
+            move = find_move(specs[player], board, player, table, omp_threads, book=book)
+            seconds[player] += time.time() - start_time
+
+            if move is None:
+                num_passes += 1
+            else:
+                board.move(move, player)
+                num_passes = 0
+                num_moves += 1
+            player = board.get_opponent(player)
+
+    black_score, white_score = board.get_scores()
+    return {
+        'black': format_engine_spec(black),
+        'white': format_engine_spec(white),
+        'winner': board.get_winner(),
+        'black_score': black_score,
+        'white_score': white_score,
+        'num_moves': num_moves,
+        'black_seconds': seconds['B'],
+        'white_seconds': seconds['W'],
+    }
+
+
+def game_key(black, white, game):
+    return black, white, int(game)
+
+
+# Opening books loaded by this worker process, by filename.
+_books = {}
+
+
+def _play_task(task):
+    black, white, game, omp_threads, book_filename = task
+    book = None
+    if book_filename is not None:
+        if book_filename not in _books:
+            _books[book_filename] = opening_book.OpeningBook(book_filename)
+        book = _books[book_filename]
+    result = play_game(black, white, omp_threads=omp_threads, book=book, seed=game)
+    result['game'] = game
+    return result
+
+
+class ResultFile(object):
+    """
+    Appends results to a JSONL file, or a CSV file if the filename ends with .csv. Each result is flushed as soon as it
+    is written. A last line without a newline, left by a run that was killed while writing, is ignored by `read` and
+    removed before the next result is appended.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.is_csv = filename.endswith('.csv')
+        self.file = None
+        self.csv_writer = None
+
+    def read(self):
+        if not path.isfile(self.filename):
+            return []
+        with open(self.filename, 'r', newline='') as f:
+            lines = f.readlines()
+        if lines and not lines[-1].endswith('\n'):
+            lines.pop()
+        if self.is_csv:
+            return list(csv.DictReader(lines))
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def __enter__(self):
+        # Removes a partial last line. The file is then empty if not even the CSV header was complete.
+        if path.isfile(self.filename):
+            with open(self.filename, 'r+b') as f:
+                f.truncate(f.read().rfind(b'\n') + 1)
+        is_new = not path.isfile(self.filename) or path.getsize(self.filename) == 0
+        self.file = open(self.filename, 'a', newline='')
+        if self.is_csv:
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=RESULT_FIELDS)
+            if is_new:
+                self.csv_writer.writeheader()
+        return self
+
+    def write(self, result):
+        if self.is_csv:
+            self.csv_writer.writerow(result)
+        else:
+            self.file.write(json.dumps(result, sort_keys=True) + '\n')
+        self.file.flush()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.file.close()
+
+
+def print_summary(results):
+    pairings = collections.OrderedDict()
+    for result in results:
+        pairings.setdefault((result['black'], result['white']), []).append(result['winner'])
+    for (black, white), winners in pairings.items():
+        black_wins = winners.count('B')
+        print('{} (B) vs {} (W): black won {} out of {} games ({:.3f})'.format(
+            black, white, black_wins, len(winners), black_wins / len(winners)))
+
+
+def run_tournament(blacks, whites, num_games, output, num_workers=1, omp_threads=1, book_filename=None):
+    result_file = ResultFile(output)
+    previous_results = result_file.read()
+    finished = {game_key(r['black'], r['white'], r['game']) for r in previous_results}
+
+    tasks = []
+    for black in blacks:
+        for white in whites:
+            for game in range(num_games):
+                if game_key(format_engine_spec(black), format_engine_spec(white), game) not in finished:
+                    tasks.append((black, white, game, omp_threads, book_filename))
+
+    print('{} games already played. {} to go.'.format(len(finished), len(tasks)))
+
+    results = list(previous_results)
+    with result_file, multiprocessing.Pool(num_workers) as pool:
+        for result in pool.imap_unordered(_play_task, tasks):
+            result_file.write(result)
+            results.append(result)
+            print(result['winner'], end='', flush=True)
+    print()
+
+    print_summary(results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--black', type=parse_engine_spec, nargs='+', required=True,
+                        help='Engines playing black, as engine:strategy:depth.')
+    parser.add_argument('--white', type=parse_engine_spec, nargs='+', required=True,
+                        help='Engines playing white. Every black engine plays every white engine.')
+    parser.add_argument('--games', type=int, default=10, help='Number of games per pairing.')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help='Number of games played at the same time.')
+    parser.add_argument('--omp-threads', type=int, default=1,
+                        help='Search threads per game for the cpp engine. 0 uses the OpenMP default.')
+    parser.add_argument('--book', help='Opening book used by the cpp engines. See opening_book.py.')
+    parser.add_argument('--output', required=True, help='Results file, .jsonl or .csv. Appended to if it exists.')
+    args = parser.parse_args()
+
+    run_tournament(args.black, args.white, args.games, args.output, num_workers=args.workers,
+                   omp_threads=args.omp_threads, book_filename=args.book)
+
+
+if __name__ == '__main__':
+    main()
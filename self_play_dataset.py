@@ -0,0 +1,223 @@
+"""
+Generates labelled positions to tune heuristics and train evaluators, from games the C++ engine plays against itself
+in parallel. Each position has its side to move, search score, best move and the final outcome of its game. See
+`othello_ctypes.POSITION_RECORD_DTYPE`.
+
+    python self_play_dataset.py --output selfplay --num-games 100000 --depth 4
+
+A dataset is a directory of .npy files of POSITION_RECORD_DTYPE, chunk_000000.npy onwards, each with at most
+--chunk-size positions. Running the command again on the same directory appends to it. Pass another --seed for new
+games. `Dataset` memory-maps the chunks, so reading does not load the whole dataset.
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+import othello_ctypes
+
+CHUNK_PATTERN = 'chunk_{:06d}.npy'
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def _chunk_filenames(directory):
+    return sorted(glob.glob(os.path.join(directory, CHUNK_PATTERN.replace('{:06d}', '[0-9]' * 6))))
+
+
+class DatasetWriter(object):
+    def __init__(self, directory, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Appends positions to the dataset in `directory`, which is created if needed. Full chunks are written as soon as
+        they fill up, and the last partial chunk on `flush` or `close`. It is rewritten as more positions are appended,
+        so at most `chunk_size` positions are kept in memory.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_size = chunk_size
+        filenames = _chunk_filenames(directory)
+        self.chunk_index = len(filenames)
+        self.buffer = np.zeros(chunk_size, dtype=othello_ctypes.POSITION_RECORD_DTYPE)
+        self.num_buffered = 0
+        if filenames:
+            last_chunk = np.load(filenames[-1])
+            assert last_chunk.dtype == othello_ctypes.POSITION_RECORD_DTYPE, last_chunk.dtype
+            if len(last_chunk) < chunk_size:
+                self.chunk_index -= 1
+                self.buffer[:len(last_chunk)] = last_chunk
+                self.num_buffered = len(last_chunk)
+
+    def append(self, positions):
+        """
+        :param positions: Array of `othello_ctypes.POSITION_RECORD_DTYPE`.
+        """
+        assert positions.dtype == othello_ctypes.POSITION_RECORD_DTYPE, positions.dtype
+        start = 0
+        while start < len(positions):
+            count = min(len(positions) - start, self.chunk_size - self.num_buffered)
+            self.buffer[self.num_buffered:self.num_buffered + count] = positions[start:start + count]
+            self.num_buffered += count
+            start += count
+            if self.num_buffered == self.chunk_size:
+                self._write_chunk()
+                self.chunk_index += 1
+                self.num_buffered = 0
+
+    def _write_chunk(self):
+        # Written to a temporary file first, so that a reader never sees a partial chunk.
+        filename = os.path.join(self.directory, CHUNK_PATTERN.format(self.chunk_index))
+        temporary_filename = filename + '.tmp'
+        with open(temporary_filename, 'wb') as f:
+            np.save(f, self.buffer[:self.num_buffered])
+        os.replace(temporary_filename, filename)
+
+    def flush(self):
+        if self.num_buffered:
+            self._write_chunk()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Dataset(object):
+    def __init__(self, directory):
+        """
+        Read-only view of the dataset in `directory`. Chunks are memory-mapped, and indexing reads only the rows it
+        selects. Chunks appended after construction are not seen.
+        """
+        self.chunks = [np.load(filename, mmap_mode='r') for filename in _chunk_filenames(directory)]
+        for chunk in self.chunks:
+            assert chunk.dtype == othello_ctypes.POSITION_RECORD_DTYPE, chunk.dtype
+        self.offsets = np.cumsum([0] + [len(chunk) for chunk in self.chunks])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, key):
+        """
+        :param key: An int, a slice or an array of ints.
+        :return: A record for an int, otherwise a new array of `othello_ctypes.POSITION_RECORD_DTYPE`.
+        """
+        if isinstance(key, (int, np.integer)):
+            index = key + len(self) if key < 0 else key
+            if not 0 <= index < len(self):
+                raise IndexError(key)
+            chunk_index = np.searchsorted(self.offsets, index, side='right') - 1
+            return self.chunks[chunk_index][index - self.offsets[chunk_index]]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1:
+                return self._read_range(start, stop)
+            key = np.arange(start, stop, step)
+        indices = np.asarray(key, dtype=np.int64)
+        indices = np.where(indices < 0, indices + len(self), indices)
+        if np.any((indices < 0) | (indices >= len(self))):
+            raise IndexError(key)
+        ret = np.empty(indices.shape, dtype=othello_ctypes.POSITION_RECORD_DTYPE)
+        chunk_indices = np.searchsorted(self.offsets, indices, side='right') - 1
+        for chunk_index in np.unique(chunk_indices):
+            selected = chunk_indices == chunk_index
+            ret[selected] = self.chunks[chunk_index][indices[selected] - self.offsets[chunk_index]]
+        return ret
+
+    def _read_range(self, start, stop):
+        parts = []
+        for chunk, offset in zip(self.chunks, self.offsets):
+            if offset < stop and start < offset + len(chunk):
+                parts.append(chunk[max(start - offset, 0):stop - offset])
+        if not parts:
+            return np.zeros(0, dtype=othello_ctypes.POSITION_RECORD_DTYPE)
+        return np.concatenate(parts)
+
+    def iter_chunks(self):
+        """
+        Yields the memory-mapped chunks in order, to go through the dataset one chunk at a time.
+        """
+        for chunk in self.chunks:
+            yield chunk
+
+
+def unpack_bitboards(bits):
+    """
+    :param bits: uint64 array of shape (N,), such as the 'black' field of positions.
+    :return: bool array of shape (N, 64). Square `x + 8 * y` is (x, y).
+    """
+    bits = np.ascontiguousarray(bits, dtype='<u8')
+    return np.unpackbits(bits.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little').astype(bool)
+
+
+def unpack_squares(positions):
+    """
+    :return: uint8 array of shape (N, 64), in the layout of `othello_ctypes.NativeBoard`.
+    """
+    ret = np.full((len(positions), 64), othello_ctypes.EMPTY_SQUARE, dtype=np.uint8)
+    ret[unpack_bitboards(positions['black'])] = 0
+    ret[unpack_bitboards(positions['white'])] = 1
+    return ret
+
+
+def own_and_opponent(positions):
+    """
+    :return: (own, opp). bool arrays of shape (N, 64) with the squares of the player to move and of the opponent.
+    """
+    black, white = unpack_bitboards(positions['black']), unpack_bitboards(positions['white'])
+    is_white = (positions['player'] == 1)[:, None]
+    return np.where(is_white, white, black), np.where(is_white, black, white)
+
+
+def generate(directory, config, num_games, num_random_moves=8, batch_size=256, seed=0, chunk_size=DEFAULT_CHUNK_SIZE,
+             tt_size_log2=16, num_threads=0):
+    """
+    Plays `num_games` games with `othello_ctypes.self_play_games`, `batch_size` at a time, and appends their positions
+    to the dataset in `directory`.
+
+    :param config: `othello_ctypes.PlayerConfig` of both players.
+    :return: Number of positions appended.
+    """
+    rng = np.random.default_rng(seed)
+    num_positions = 0
+    start_time = time.time()
+    with DatasetWriter(directory, chunk_size=chunk_size) as writer:
+        for start in range(0, num_games, batch_size):
+            seeds = rng.integers(0, 2 ** 64, size=min(batch_size, num_games - start), dtype=np.uint64)
+            positions = othello_ctypes.self_play_games(config, seeds, num_random_moves=num_random_moves,
+                                                       tt_size_log2=tt_size_log2, num_threads=num_threads)
+            writer.append(positions)
+            num_positions += len(positions)
+            elapsed = time.time() - start_time
+            print('{} games, {} positions, {:.0f} positions per second'.format(
+                start + len(seeds), num_positions, num_positions / elapsed if elapsed > 0 else 0), flush=True)
+    return num_positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', required=True, help='Dataset directory. Appended to if it exists.')
+    parser.add_argument('--num-games', type=int, default=10000)
+    parser.add_argument('--strategy', default='all', choices=sorted(othello_ctypes.strategy_indices))
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--endgame-empties', type=int, default=14,
+                        help='Positions with this many empty squares or fewer are solved exactly.')
+    parser.add_argument('--random-moves', type=int, default=8, help='Random opening moves of each game.')
+    parser.add_argument('--batch-size', type=int, default=256, help='Games per call to the engine.')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Positions per .npy file.')
+    parser.add_argument('--threads', type=int, default=0, help='Games played at the same time. 0 uses all cores.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = othello_ctypes.player_config(args.strategy, depth=args.depth, endgame_empties=args.endgame_empties)
+    generate(args.output, config, args.num_games, num_random_moves=args.random_moves, batch_size=args.batch_size,
+             seed=args.seed, chunk_size=args.chunk_size, num_threads=args.threads)
+    print('{} positions in {}'.format(len(Dataset(args.output)), args.output))
+
+
+if __name__ == '__main__':
+    main()
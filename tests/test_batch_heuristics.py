@@ -0,0 +1,68 @@
+import random
+import numpy as np
+import othello
+import alphaBeta
+import batch_heuristics
+
+
+def random_boards(num_boards, seed=0):
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(num_boards):
+        board = othello.Game(othello.Board()).board
+        player = 'B'
+        for _ in range(rng.randint(0, 60)):
+            legal_moves = board.get_legal_moves(player)
+            if legal_moves:
+                board.move(rng.choice(legal_moves), player)
+            player = board.get_opponent(player)
+        boards.append(board)
+    return boards
+
+
+def test_same_as_board_methods():
+    boards = random_boards(50)
+    tensor = batch_heuristics.boards_to_tensor(boards)
+
+    assert tensor.shape == (50, 8, 8)
+    assert tensor.dtype == np.int8
+
+    disk_counts = batch_heuristics.disk_counts(tensor)
+    corner_counts = batch_heuristics.corner_counts(tensor)
+    mobility_counts = batch_heuristics.mobility_counts(tensor)
+    permanent_disk_counts = batch_heuristics.permanent_disk_counts(tensor)
+    heuristic_weighted = batch_heuristics.heuristic_weighted(tensor)
+    weighted_parity_1 = batch_heuristics.weighted_parity_1(tensor, 'W')
+
+    for i, board in enumerate(boards):
+        assert (disk_counts[0][i], disk_counts[1][i]) == board.get_scores()
+        assert (corner_counts[0][i], corner_counts[1][i]) == board.get_corner_disk_count()
+        assert (mobility_counts[0][i], mobility_counts[1][i]) == board.heuristic_numMoves()
+        assert (permanent_disk_counts[0][i], permanent_disk_counts[1][i]) == board.get_permanent_disk_count()
+        assert (heuristic_weighted[0][i], heuristic_weighted[1][i]) == board.heuristic_weighted()
+        assert weighted_parity_1[i] == alphaBeta.weighted_heuristic(board, 'W')
+
+
+def test_weighted_parity():
+    # Same board as the "Heuristics" test case in othello-cpp/othello_test.cc.
+    board = othello.Board('..................WBBW....WBWB....WBB.....WWWW.....BW.....WB.W..'.replace('.', '0'))
+    tensor = batch_heuristics.boards_to_tensor([board, board])
+
+    assert list(batch_heuristics.weighted_parity_1(tensor, ['B', 'W'])) == [-92, 92]
+    assert list(batch_heuristics.parity(tensor, 'B')) == [-4, -4]
+
+
+def test_features():
+    boards = random_boards(10, seed=1)
+    tensor = batch_heuristics.boards_to_tensor(boards)
+    players = ['B', 'W'] * 5
+
+    features = batch_heuristics.features(tensor, players)
+
+    for name, values in features.items():
+        assert values.shape == (10,), name
+    for i, board in enumerate(boards):
+        player_moves = len(board.get_legal_moves(players[i]))
+        assert features['player_moves'][i] == player_moves
+        assert features['mobility'][i] == np.float32(player_moves - features['opponent_moves'][i] + 1) / np.float32(
+            player_moves + features['opponent_moves'][i] + 1)
@@ -0,0 +1,37 @@
+import othello
+import run_benchmark
+
+
+def test_positions_have_legal_moves():
+    positions = run_benchmark.load_positions()
+    assert len({position['name'] for position in positions}) == len(positions)
+    for position in positions:
+        board = othello.Board(position['board'].replace('.', '0'))
+        assert board.get_legal_moves(position['player']), position['name']
+
+
+def test_compare_flags_slowdowns_and_node_changes():
+    def results(seconds, nodes):
+        return {'results': [
+            {'engine': 'cpp', 'depth': 6, 'position': 'a', 'seconds': seconds[0], 'nodes': nodes},
+            {'engine': 'cpp', 'depth': 6, 'position': 'b', 'seconds': seconds[1], 'nodes': nodes},
+        ]}
+
+    baseline = results([0.1, 0.2], 100)
+    assert run_benchmark.compare(baseline, results([0.11, 0.2], 100)) == []
+    assert run_benchmark.compare(baseline, results([0.1, 0.4], 100)) == [
+        ('cpp', 6, 'total', 0.1 + 0.2, 0.1 + 0.4), ('cpp', 6, 'b', 0.2, 0.4)]
+    # Too small to tell apart from timer noise.
+    assert run_benchmark.compare(results([0.0001, 0.2], 100), results([0.0005, 0.2], 100)) == []
+
+    assert run_benchmark.node_count_changes(baseline, results([0.1, 0.2], 100)) == []
+    assert run_benchmark.node_count_changes(baseline, results([0.1, 0.2], 90)) == [
+        ('cpp', 6, 'a', 100, 90), ('cpp', 6, 'b', 100, 90)]
+
+
+def test_cpp_moves_are_reproducible():
+    positions = run_benchmark.load_positions()[:6]
+    runs = [run_benchmark.benchmark(['cpp'], depths={'cpp': [3]}, repeats=1, seed=5, positions=positions)
+            for _ in range(3)]
+    for results in runs[1:]:
+        assert [(r['move'], r['nodes']) for r in results] == [(r['move'], r['nodes']) for r in runs[0]]
@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+import pytest
+
+import othello
+import othello_ctypes
+from third_party import board_conversion
+
+
+def _random_boards(num_boards, num_moves, seed):
+    rng = random.Random(seed)
+    boards = []
+    players = []
+    while len(boards) < num_boards:
+        board = othello.Game(othello.Board()).board
+        player = 'B'
+        for _ in range(num_moves):
+            moves = board.get_legal_moves(player)
+            if not moves:
+                break
+            board.make_move(rng.choice(moves), player, play_test=False)
+            player = board.get_opponent(player)
+        if board.get_legal_moves(player):
+            boards.append(board)
+            players.append(player)
+    return boards, players
+
+
+def test_batch_matches_single_searches():
+    boards, players = _random_boards(12, 20, seed=0)
+    cpp_boards = np.array([board_conversion.convert_to_our_cpp_array(board) for board in boards])
+    moves, scores = othello_ctypes.best_moves_batch(cpp_boards, players, 'all', 3, num_threads=1)
+
+    for board, player, move, score in zip(boards, players, moves, scores):
+        assert board.is_valid_move((int(move) % 8, int(move) // 8), player)
+        # Equally valued moves are picked at random, so the moves are compared by their values.
+        expected, _ = othello_ctypes.best_move(board_conversion.convert_to_our_cpp_board(board), player, 'all', 3,
+                                               num_threads=1)
+        board.make_move(expected, player, play_test=False)
+        opponent = board.get_opponent(player)
+        assert board.get_legal_moves(opponent)
+        _, opponent_scores = othello_ctypes.best_moves_batch(board_conversion.convert_to_our_cpp_array(board)[None],
+                                                             opponent, 'all', 2, num_threads=1)
+        assert -opponent_scores[0] == pytest.approx(score)
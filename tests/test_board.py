@@ -0,0 +1,84 @@
+import othello
+
+
+def make_board(board_string):
+    return othello.Board(board_string.replace('.', '0'))
+
+
+def test_initial_legal_moves():
+    game = othello.Game(othello.Board())
+
+    assert game.board.get_legal_moves('B') == [(3, 2), (2, 3), (5, 4), (4, 5)]
+    assert game.board.get_legal_moves('W') == [(4, 2), (5, 3), (2, 4), (3, 5)]
+    assert game.board.get_scores() == (2, 2)
+
+
+def test_move_flips():
+    board = make_board('..................WBBW....WBWB....WBB.....WWWW.....BW.....WB.W..')
+    score = board.make_move((2, 6), 'B', play_test=False)
+
+    assert score == 2
+    assert board.get_symbol((2, 6)) == 'B'
+    assert board.get_symbol((2, 5)) == 'W'
+    assert board.get_symbol((3, 5)) == 'B'
+    assert board.get_symbol((4, 4)) == 'B'
+    assert board.get_symbol((3, 6)) == 'B'
+    assert board.get_symbol((2, 7)) == 'W'
+    assert board.most_recent_move == (2, 6)
+
+
+def test_invalid_move_does_not_change_board():
+    board = make_board('..........W.......W.BW....WWBB....WWW.....WB.W..................')
+    data = board.data
+
+    assert not board.is_valid_move((1, 0), 'B')
+    assert board.make_move((1, 0), 'B', play_test=False) == 0
+    assert board.data == data
+
+
+def test_data_view():
+    board = othello.Board()
+    board.force_place_symbol((0, 0), 'W')
+    board.force_place_symbol((3, 1), 'B')
+
+    assert board.data[0][0] == 'W'
+    assert board.data[1][3] == 'B'
+    assert board.num_whites == 1
+    assert board.num_blacks == 1
+
+
+def test_permanent_and_corner_disks():
+    board = make_board('WWWWWWWWW.BWWBBWWBWBWBBBWWBWWWBBWWBBWWBBWWBW.WBBW.BBBBBB..BBBBBB')
+
+    assert board.get_corner_disk_count() == (1, 2)
+    assert board.get_permanent_disk_count() == (20, 15)
+
+
+def test_stable_disks():
+    # Same boards as the "StableBits" test case in othello-cpp/othello_test.cc.
+    board = make_board('BBW.............B...............................................')
+    assert othello.stable_bits(board.black_bits, board.white_bits) == 0b11
+
+    board = make_board('W' * 27 + 'B' + 'W' * 36)
+    assert othello.stable_bits(board.black_bits, board.white_bits) == othello.FULL_MASK
+
+
+def test_undo_restores_board():
+    game = othello.Game(othello.Board())
+    board = game.board
+    initial_data = board.data
+
+    records = []
+    player = 'B'
+    for _ in range(10):
+        legal_moves = board.get_legal_moves(player)
+        records.append(board.move(legal_moves[-1], player))
+        player = board.get_opponent(player)
+
+    for record in reversed(records):
+        board.undo(record)
+
+    assert board.data == initial_data
+    assert board.get_scores() == (2, 2)
+    assert board.most_recent_move is None
+    assert board.turns_played == 0
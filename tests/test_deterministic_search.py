@@ -0,0 +1,38 @@
+import numpy as np
+
+import othello
+import othello_ctypes
+import run_benchmark
+from third_party import board_conversion
+
+
+def test_seeded_move_does_not_depend_on_threads_or_table():
+    for position in run_benchmark.load_positions()[:8]:
+        moves = set()
+        for num_threads in (1, 3):
+            moves.add(othello_ctypes.best_move(position['board'], position['player'], 'all', depth=5,
+                                               num_threads=num_threads, seed=7)[0])
+            with othello_ctypes.TranspositionTable(12) as table:
+                # Deeper results in the table must not change the values of the seeded search.
+                othello_ctypes.best_move(position['board'], position['player'], 'all', depth=6, table=table,
+                                         num_threads=num_threads)
+                moves.add(othello_ctypes.best_move(position['board'], position['player'], 'all', depth=5, table=table,
+                                                   num_threads=num_threads, seed=7)[0])
+        assert len(moves) == 1, (position['name'], moves)
+
+
+def test_seeded_batch_does_not_depend_on_threads_or_other_boards():
+    positions = run_benchmark.load_positions()
+    boards = np.array([board_conversion.convert_to_our_cpp_array(othello.Board(p['board'].replace('.', '0')))
+                       for p in positions])
+    players = [p['player'] for p in positions]
+
+    moves, scores = othello_ctypes.best_moves_batch(boards, players, 'all', 4, num_threads=1, seed=3)
+    for num_threads in (2, 4):
+        other_moves, other_scores = othello_ctypes.best_moves_batch(boards, players, 'all', 4, num_threads=num_threads,
+                                                                    seed=3)
+        assert np.array_equal(moves, other_moves)
+        assert np.array_equal(scores, other_scores)
+
+    reversed_moves, _ = othello_ctypes.best_moves_batch(boards[::-1], players[::-1], 'all', 4, num_threads=2, seed=3)
+    assert np.array_equal(moves, reversed_moves[::-1])
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+import tempfile
+
+import engine_server
+
+START_BOARD = '.' * 27 + 'WB' + '.' * 6 + 'BW' + '.' * 27
+
+
+async def _exchange(server, requests, cancel_after=None):
+    """
+    Sends `requests` on one connection and reads a response to each. A request given as bytes is sent as is.
+
+    :param cancel_after: (seconds, list of requests) sent after the other requests, or None.
+    :return: dict from id to response.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, 'engine.sock')
+        socket_server = await asyncio.start_unix_server(server.handle_connection, path=socket_path)
+        async with socket_server:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            all_requests = list(requests)
+            for request in requests:
+                writer.write(request if isinstance(request, bytes) else (json.dumps(request) + '\n').encode('utf-8'))
+            if cancel_after is not None:
+                await writer.drain()
+                await asyncio.sleep(cancel_after[0])
+                for request in cancel_after[1]:
+                    writer.write((json.dumps(request) + '\n').encode('utf-8'))
+                all_requests.extend(cancel_after[1])
+            await writer.drain()
+            responses = {}
+            while len(responses) < len(all_requests):
+                response = json.loads(await reader.readline())
+                responses[response['id']] = response
+            writer.close()
+            await writer.wait_closed()
+    return responses
+
+
+def test_concurrent_games_and_errors():
+    server = engine_server.EngineServer(num_workers=2, max_queued=8)
+    requests = [{'id': i, 'type': 'move', 'game': 'g{}'.format(i % 3), 'board': START_BOARD, 'player': 'B',
+                 'depth': 4, 'seed': 1} for i in range(6)]
+    requests.append({'id': 'timed', 'type': 'move', 'game': 'g0', 'board': START_BOARD, 'player': 'W', 'time_ms': 50})
+    requests.append({'id': 'bad', 'type': 'move', 'board': START_BOARD, 'player': 'B'})
+    responses = asyncio.run(_exchange(server, requests))
+    server.close()
+
+    assert len({tuple(responses[i]['move']) for i in range(6)}) == 1
+    assert all(responses[i]['depth'] == 4 for i in range(6))
+    assert responses['timed']['depth'] >= 1 and responses['timed']['move'] is not None
+    assert 'error' in responses['bad']
+    metrics = server.metrics()
+    assert metrics['completed'] == 7 and metrics['started'] == 7
+    assert metrics['queued'] == 0 and metrics['running'] == 0
+
+
+def test_cancel_running_and_queued_searches():
+    server = engine_server.EngineServer(num_workers=1, max_queued=1)
+    requests = [{'id': i, 'type': 'move', 'game': 'g', 'board': START_BOARD, 'player': 'B', 'depth': 30}
+                for i in range(3)]
+    cancels = [{'id': 'c1', 'type': 'cancel', 'target': 1}, {'id': 'c0', 'type': 'cancel', 'target': 0},
+               {'id': 'c2', 'type': 'cancel', 'target': 2}, {'id': 'm', 'type': 'metrics'}]
+    responses = asyncio.run(_exchange(server, requests, cancel_after=(0.2, cancels)))
+    server.close()
+
+    # Request 0 is running, 1 waits for the only worker and 2 does not fit in the queue.
+    assert responses[0] == {'id': 0, 'error': 'cancelled'}
+    assert responses[1] == {'id': 1, 'error': 'cancelled'}
+    assert responses[2] == {'id': 2, 'error': 'queue full'}
+    assert responses['c0']['cancelled'] and responses['c1']['cancelled'] and not responses['c2']['cancelled']
+    assert responses['m']['running'] == 1 and responses['m']['rejected'] == 1
+    metrics = server.metrics()
+    assert metrics['queued'] == 0 and metrics['running'] == 0
+    assert metrics['cancelled'] == 2 and metrics['completed'] == 0 and metrics['started'] == 1
+
+
+def test_unexpected_errors_are_answered():
+    server = engine_server.EngineServer(num_workers=1, max_queued=4)
+
+    def failing_search(request, table, control):
+        raise RuntimeError('search failed')
+
+    server._search = failing_search
+    requests = [b'\xff{"id": 1}\n', {'id': 2, 'type': 'move', 'board': START_BOARD, 'player': 'B', 'depth': 2},
+                {'id': 3, 'type': 'metrics'}, {'id': 4, 'type': 'cancel', 'target': {'a': 1}}]
+    responses = asyncio.run(_exchange(server, requests))
+    unhashable_id_responses = asyncio.run(_exchange(server, [
+        {'id': [1], 'type': 'move', 'board': START_BOARD, 'player': 'B', 'depth': 2}]))
+    server.close()
+
+    assert responses[None] == {'id': None, 'error': 'request must be UTF-8'}
+    assert responses[4] == {'id': 4, 'error': 'target must be a string or an integer'}
+    assert unhashable_id_responses[None] == {'id': None, 'error': 'id must be a string or an integer'}
+    assert responses[2] == {'id': 2, 'error': 'search failed'}
+    metrics = server.metrics()
+    assert metrics['failed'] == 1 and metrics['running'] == 0 and metrics['queued'] == 0
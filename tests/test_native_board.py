@@ -0,0 +1,77 @@
+import random
+
+import numpy as np
+import pytest
+
+import othello
+import othello_ctypes
+from third_party import board_conversion
+
+
+def test_random_game_matches_board():
+    rng = random.Random(0)
+    board = othello.Game(othello.Board()).board
+    native_board = othello_ctypes.NativeBoard()
+    assert (native_board.squares == board_conversion.convert_to_our_cpp_array(board)).all()
+
+    player = 'B'
+    num_passes = 0
+    while num_passes < 2:
+        legal_moves = board.get_legal_moves(player)
+        assert sorted(native_board.get_legal_moves(player)) == sorted(legal_moves)
+        if not legal_moves:
+            num_passes += 1
+        else:
+            num_passes = 0
+            xy = rng.choice(legal_moves)
+            _, _, flipped, _ = board.move(xy, player)
+            assert native_board.move(xy, player) == othello.popcount(flipped)
+            assert native_board.get_bits() == (board.black_bits, board.white_bits)
+        player = board.get_opponent(player)
+
+    assert native_board.get_scores() == board.get_scores()
+    assert native_board.get_winner() == board.get_winner()
+
+
+def test_invalid_move_leaves_board_unchanged():
+    native_board = othello_ctypes.NativeBoard()
+    squares = native_board.squares.copy()
+    for xy in [(0, 0), (3, 3), (8, 0)]:
+        assert not native_board.is_valid_move(xy, 'B')
+        with pytest.raises(RuntimeError):
+            native_board.move(xy, 'B')
+    assert (native_board.squares == squares).all()
+
+
+def test_best_move_reads_buffer_in_place():
+    board = othello.Board('..................B..B....BWBW...WWWWW....BBBWW.................'.replace('.', '0'))
+    native_board = othello_ctypes.NativeBoard.from_board(board)
+    board_string = board_conversion.convert_to_our_cpp_board(board)
+
+    for player in ('B', 'W'):
+        move, _ = othello_ctypes.best_move(native_board, player, 'all', depth=4, num_threads=1)
+        expected, _ = othello_ctypes.best_move(board_string, player, 'all', depth=4, num_threads=1)
+        assert move == expected
+    assert native_board.to_board().data == board.data
+
+
+def test_play_game_replays_and_is_reproducible():
+    black = othello_ctypes.player_config('all', depth=2)
+    white = othello_ctypes.player_config('random', depth=1)
+    record = othello_ctypes.play_game(black, white, seed=3)
+
+    native_board = othello_ctypes.NativeBoard()
+    for move, player_index in zip(record['moves'][:record['num_moves']], record['players'][:record['num_moves']]):
+        native_board.move((move % 8, move // 8), 'BW'[player_index])
+    assert native_board.get_scores() == (record['black_score'], record['white_score'])
+    assert not native_board.get_legal_moves('B') and not native_board.get_legal_moves('W')
+    # Black solves the last 14 empty squares. The random player never uses the solver.
+    num_empties = 60 - np.arange(record['num_moves'])
+    is_black = record['players'][:record['num_moves']] == 0
+    expected_depths = np.where(is_black, np.where(num_empties <= 14, num_empties, 2), 1)
+    assert np.array_equal(record['depths'][:record['num_moves']], expected_depths)
+
+    records = othello_ctypes.play_games(black, white, seeds=[3, 4, 3], num_threads=2)
+    for field in ('moves', 'players', 'depths', 'num_moves', 'black_score', 'white_score'):
+        assert np.array_equal(records[0][field], record[field])
+        assert np.array_equal(records[2][field], record[field])
@@ -0,0 +1,41 @@
+import othello
+import opening_book
+from third_party import board_conversion
+
+
+def test_symmetries_round_trip():
+    bits = 0x0123456789ABCDEF
+    images = {opening_book.transform(bits, symmetry) for symmetry in range(opening_book.NUM_SYMMETRIES)}
+
+    assert len(images) == opening_book.NUM_SYMMETRIES
+    for symmetry in range(opening_book.NUM_SYMMETRIES):
+        assert opening_book.inverse_transform(opening_book.transform(bits, symmetry), symmetry) == bits
+
+
+def test_transform_moves_squares():
+    # (1, 0) -> (0, 1)
+    assert opening_book.flip_diagonal(1 << 1) == 1 << 8
+    # (1, 0) -> (6, 0)
+    assert opening_book.mirror_horizontal(1 << 1) == 1 << 6
+    # (1, 0) -> (1, 7)
+    assert opening_book.flip_vertical(1 << 1) == 1 << 57
+
+
+def test_find_move_in_every_orientation(tmpdir):
+    board = othello.Game(othello.Board()).board
+    board.move((3, 2), 'B')
+    filename = str(tmpdir.join('book.npy'))
+    opening_book.save_book(filename, {(board.black_bits, board.white_bits, 1): 2 + 8 * 2})
+    book = opening_book.OpeningBook(filename)
+
+    assert len(book) == 1
+    assert book.find_move(board_conversion.convert_to_our_cpp_board(board), 'W') == (2, 2)
+    assert book.find_move(board_conversion.convert_to_our_cpp_board(board), 'B') is None
+
+    for symmetry in range(opening_book.NUM_SYMMETRIES):
+        black_bits = opening_book.transform(board.black_bits, symmetry)
+        white_bits = opening_book.transform(board.white_bits, symmetry)
+        move = book.find_move_bits(black_bits, white_bits, 'W')
+        assert 1 << move == opening_book.transform(1 << (2 + 8 * 2), symmetry)
+        own, opp = white_bits, black_bits
+        assert othello.legal_move_bits(own, opp) & (1 << move)
@@ -0,0 +1,69 @@
+import argparse
+import os
+
+import numpy as np
+import pytest
+
+import othello_ctypes
+import pattern_evaluator
+import run_tournament
+
+
+def _random_weights(seed):
+    _, phase_size = pattern_evaluator.pattern_offsets()
+    return np.random.RandomState(seed).normal(size=(pattern_evaluator.NUM_PHASES, phase_size)).astype(np.float32)
+
+
+def _restore_pattern_weights():
+    othello_ctypes.load_pattern_weights(othello_ctypes.PATTERN_WEIGHTS_FILENAME if os.path.isfile(
+        othello_ctypes.PATTERN_WEIGHTS_FILENAME) else None)
+
+
+def test_native_evaluation_matches_python(tmpdir):
+    own, opp, labels = pattern_evaluator.self_play_positions(4, depth=1, endgame_empties=0, seed=1)
+    assert len(labels) > 100 and np.all(np.abs(labels) <= 64)
+
+    weights = _random_weights(0)
+    filename = str(tmpdir.join('weights.bin'))
+    pattern_evaluator.save_weights(filename, weights)
+    np.testing.assert_array_equal(pattern_evaluator.load_weights(filename), weights)
+    try:
+        othello_ctypes.load_pattern_weights(filename)
+        native = [othello_ctypes.heuristic(othello_ctypes.NativeBoard(np.where(o, 0, np.where(p, 1, 255))), 'B',
+                                           'pattern') for o, p in zip(own, opp)]
+        move, _ = othello_ctypes.best_move(othello_ctypes.NativeBoard(), 'B', 'pattern', 3)
+        assert move is not None
+    finally:
+        _restore_pattern_weights()
+    np.testing.assert_allclose(native, pattern_evaluator.predict(weights, own, opp), rtol=1e-5, atol=1e-3)
+
+
+def test_pattern_strategy_needs_weights():
+    othello_ctypes.load_pattern_weights(None)
+    try:
+        with pytest.raises(ValueError):
+            othello_ctypes.best_move(othello_ctypes.NativeBoard(), 'B', 'pattern', 3)
+        with pytest.raises(ValueError):
+            othello_ctypes.player_config('pattern', depth=3)
+        with pytest.raises(ValueError):
+            othello_ctypes.heuristic(othello_ctypes.NativeBoard(), 'B', 'pattern')
+        boards = np.array([othello_ctypes.NativeBoard().squares] * 2)
+        with pytest.raises(ValueError):
+            othello_ctypes.best_moves_batch(boards, 'B', ['all', 'pattern'], 3)
+        with pytest.raises(argparse.ArgumentTypeError):
+            run_tournament.parse_engine_spec('cpp:pattern:3')
+    finally:
+        _restore_pattern_weights()
+
+
+def test_fit_recovers_labels():
+    own, opp, _ = pattern_evaluator.self_play_positions(20, depth=1, endgame_empties=0, seed=2)
+    # Labels that only depend on the corners, as in a pattern model.
+    weights = np.zeros_like(_random_weights(0))
+    offsets, _ = pattern_evaluator.pattern_offsets()
+    weights[:, 0] = 1
+    weights[:, offsets[4]:offsets[5]] = _random_weights(1)[:, offsets[4]:offsets[5]]
+    labels = pattern_evaluator.predict(weights, own, opp)
+
+    fitted = pattern_evaluator.fit(own, opp, labels, l2=1e-3)
+    assert np.sqrt(np.mean((pattern_evaluator.predict(fitted, own, opp) - labels) ** 2)) < 0.01 * np.std(labels)
@@ -0,0 +1,38 @@
+import time
+
+import othello_ctypes
+import ponder
+
+
+def test_take_hands_over_the_pondered_move():
+    board = othello_ctypes.NativeBoard()
+    board.move((3, 2), 'B')
+    with othello_ctypes.TranspositionTable(16) as table:
+        pondering = ponder.Ponder(table, max_depth=4, seed=5)
+        pondering.start(board, 'W')
+        while pondering.is_running():
+            time.sleep(0.01)
+        results = pondering.poll()
+        assert set(results) == set(board.get_legal_moves('W'))
+        reply = sorted(results)[0]
+        move, depth = pondering.take(reply)
+        assert depth == 4
+
+        next_board = board.copy()
+        next_board.move(reply, 'W')
+        assert move == othello_ctypes.best_move(next_board, 'B', 'all', 4, seed=5)[0]
+
+
+def test_stop_cancels_a_deep_ponder():
+    board = othello_ctypes.NativeBoard()
+    board.move((3, 2), 'B')
+    with othello_ctypes.TranspositionTable(16) as table:
+        pondering = ponder.Ponder(table, max_replies=1, max_depth=40)
+        pondering.start(board, 'W')
+        time.sleep(0.2)
+        assert pondering.is_running()
+        start_time = time.time()
+        pondering.stop()
+        assert time.time() - start_time < 1
+        assert not pondering.is_running()
+        assert len(pondering.poll()) == 1
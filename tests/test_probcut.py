@@ -0,0 +1,34 @@
+import numpy as np
+
+import calibrate_probcut
+import othello
+import othello_ctypes
+import run_benchmark
+
+
+def test_fit_and_shallow_depths():
+    rng = np.random.RandomState(0)
+    shallow = rng.normal(size=1000)
+    slope, intercept, sigma = calibrate_probcut.fit(shallow, 1.5 * shallow + 0.5 + rng.normal(scale=0.1, size=1000))
+    assert abs(slope - 1.5) < 0.02 and abs(intercept - 0.5) < 0.02 and abs(sigma - 0.1) < 0.01
+
+    for depth in range(calibrate_probcut.MIN_DEPTH, calibrate_probcut.MAX_DEPTH + 1):
+        shallow_depths = calibrate_probcut.shallow_depths(depth)
+        assert 0 < len(shallow_depths) <= calibrate_probcut.NUM_CHECKS
+        assert all(0 < d < depth and d % 2 == depth % 2 for d in shallow_depths)
+
+
+def test_selective_search_is_switched_per_call():
+    options = othello_ctypes.DEFAULT_OPTIONS | othello_ctypes.MULTI_PROBCUT
+    num_cutoffs = 0
+    for position in run_benchmark.load_positions():
+        board, player = position['board'], position['player']
+        stats = othello_ctypes.SearchStats()
+        move, _ = othello_ctypes.best_move(board, player, 'all', 7, num_threads=1, endgame_empties=0, options=options,
+                                           stats=stats)
+        assert othello.Board(board.replace('.', '0')).is_valid_move(move, player)
+        num_cutoffs += stats.probcut_cutoffs
+
+        othello_ctypes.best_move(board, player, 'all', 7, num_threads=1, endgame_empties=0, stats=stats)
+        assert stats.probcut_cutoffs == 0
+    assert num_cutoffs > 0
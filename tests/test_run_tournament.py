@@ -0,0 +1,79 @@
+import argparse
+
+import pytest
+
+import run_tournament
+
+
+def _summary(results):
+    """
+    :return: For each pairing, the number of games and black's wins.
+    """
+    ret = {}
+    for result in results:
+        num_games, black_wins = ret.get((result['black'], result['white']), (0, 0))
+        ret[(result['black'], result['white'])] = (num_games + 1, black_wins + (result['winner'] == 'B'))
+    return ret
+
+
+def _native_results(results):
+    # Games between two cpp engines are played in C++ with the game index as seed, so they repeat exactly.
+    return sorted((int(r['game']), r['winner'], int(r['black_score']), int(r['white_score']), int(r['num_moves']))
+                  for r in results if r['white'] == 'cpp:all:1')
+
+
+def test_resume_from_jsonl_and_csv(tmpdir, capsys):
+    blacks = [run_tournament.parse_engine_spec('cpp:all:1')]
+    # The dhconnelly engine makes its pairing play through the Python game loop.
+    whites = [run_tournament.parse_engine_spec('cpp:all:1'), run_tournament.parse_engine_spec('dhconnelly:weighted:1')]
+
+    all_results = {}
+    for filename in ('results.jsonl', 'results.csv'):
+        output = str(tmpdir.join(filename))
+        results = run_tournament.run_tournament(blacks, whites, 3, output, num_workers=2)
+        assert '0 games already played. 6 to go.' in capsys.readouterr().out
+        resumed_results = run_tournament.run_tournament(blacks, whites, 3, output, num_workers=2)
+        assert '6 games already played. 0 to go.' in capsys.readouterr().out
+        assert _summary(resumed_results) == _summary(results)
+        assert len(run_tournament.ResultFile(output).read()) == 6
+        all_results[filename] = resumed_results
+
+    jsonl_results, csv_results = all_results['results.jsonl'], all_results['results.csv']
+    assert _native_results(jsonl_results) == _native_results(csv_results)
+    assert {pairing: num_games for pairing, (num_games, _) in _summary(jsonl_results).items()} == {
+        pairing: num_games for pairing, (num_games, _) in _summary(csv_results).items()}
+
+
+def test_parse_engine_spec():
+    assert run_tournament.parse_engine_spec('cpp:all:3') == run_tournament.EngineSpec('cpp', 'all', 3)
+    for spec in ('cpp:all', 'stockfish:all:3', 'cpp:unknown:3', 'cpp:all:0'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            run_tournament.parse_engine_spec(spec)
+
+
+def test_result_file_ignores_a_partial_last_line(tmpdir):
+    result = {'black': 'cpp:all:1', 'white': 'cpp:all:2', 'winner': 'B', 'black_score': 40, 'white_score': 24,
+              'num_moves': 60, 'black_seconds': 0.5, 'white_seconds': 0.5}
+    for filename in ('results.jsonl', 'results.csv'):
+        output = str(tmpdir.join(filename))
+        result_file = run_tournament.ResultFile(output)
+        with result_file:
+            result_file.write(dict(result, game=0))
+        # As left by a run that was killed while writing.
+        with open(output, 'a') as f:
+            f.write('{"black": "cpp:al' if filename.endswith('.jsonl') else 'cpp:all:1,cpp:al')
+        assert [int(r['game']) for r in result_file.read()] == [0]
+
+        with result_file:
+            result_file.write(dict(result, game=1))
+        assert [int(r['game']) for r in result_file.read()] == [0, 1]
+
+    # Killed while writing the CSV header.
+    output = str(tmpdir.join('header.csv'))
+    with open(output, 'w') as f:
+        f.write('black,wh')
+    result_file = run_tournament.ResultFile(output)
+    assert result_file.read() == []
+    with result_file:
+        result_file.write(dict(result, game=0))
+    assert [int(r['game']) for r in result_file.read()] == [0]
@@ -0,0 +1,32 @@
+import othello_ctypes
+
+BOARD = '..................B..B....BWBW...WWWWW....BBBWW.................'
+
+
+def test_stats_are_consistent():
+    for num_threads in (1, 3):
+        stats = othello_ctypes.SearchStats()
+        move, _ = othello_ctypes.best_move(BOARD, 'B', 'all', depth=6, num_threads=num_threads, stats=stats)
+        assert move == othello_ctypes.best_move(BOARD, 'B', 'all', depth=6, num_threads=num_threads)[0]
+
+        assert stats.depth == 6
+        assert len(stats.thread_nodes) == num_threads
+        assert sum(stats.thread_nodes) == stats.nodes
+        assert 0 < stats.leaves < stats.nodes
+        assert 0 < stats.tt_hits <= stats.tt_probes
+        assert stats.tt_cutoffs <= stats.tt_hits
+        assert 0 < stats.tt_stores
+        assert 0 < stats.first_move_cutoffs <= stats.beta_cutoffs
+        assert stats.seconds > 0
+
+
+def test_timed_and_solved_depths():
+    stats = othello_ctypes.SearchStats()
+    _, depth, _ = othello_ctypes.best_move_timed(BOARD, 'B', 'all', time_budget_ms=50, num_threads=1, stats=stats)
+    assert stats.depth == depth
+    assert stats.nodes > 0
+
+    endgame = 'WWWWWWWWBBBBBBBBWWWWWWWWBBBBBBBBWWWWWWWWBBBBBBBBWWWWWWWWBBBB....'
+    othello_ctypes.best_move(endgame, 'B', 'all', depth=2, num_threads=1, stats=stats)
+    assert stats.depth == 4
+    assert stats.leaves == 0
@@ -0,0 +1,59 @@
+import numpy as np
+
+import othello_ctypes
+import self_play_dataset
+
+
+def test_self_play_games_record_every_position():
+    config = othello_ctypes.player_config('all', depth=2, endgame_empties=8)
+    positions = othello_ctypes.self_play_games(config, np.arange(6), num_random_moves=4)
+    np.testing.assert_array_equal(othello_ctypes.self_play_games(config, np.arange(6), num_random_moves=4,
+                                                                 num_threads=1), positions)
+
+    start_bits = othello_ctypes.NativeBoard().get_bits()
+    is_start = (positions['black'] == start_bits[0]) & (positions['white'] == start_bits[1])
+    assert np.count_nonzero(is_start) == 6 and is_start[0]
+    squares = self_play_dataset.unpack_squares(positions)
+    for record, board_squares in zip(positions, squares):
+        board = othello_ctypes.NativeBoard(board_squares)
+        assert board.get_bits() == (int(record['black']), int(record['white']))
+        player = 'BW'[record['player']]
+        assert board.get_legal_move_bits(player) >> int(record['best_move']) & 1
+        num_empty = np.count_nonzero(board_squares == othello_ctypes.EMPTY_SQUARE)
+        assert record['depth'] == (num_empty if num_empty <= 8 else 2)
+
+    # Each game's outcome is the same for black, and opposite for white.
+    for game in np.split(positions, np.flatnonzero(is_start)[1:]):
+        black_outcomes = np.where(game['player'] == 0, game['outcome'], -game['outcome'])
+        assert np.all(black_outcomes == black_outcomes[0])
+        # The solver's value of the last positions is the outcome, as both players then play perfectly.
+        assert game['score'][-1] == game['outcome'][-1]
+
+
+def test_append_and_read_back(tmpdir):
+    directory = str(tmpdir.join('dataset'))
+    rng = np.random.RandomState(0)
+    expected = np.zeros(40, dtype=othello_ctypes.POSITION_RECORD_DTYPE)
+    expected['black'] = rng.randint(0, 2 ** 62, size=40, dtype=np.uint64)
+    expected['white'] = ~expected['black']
+    expected['score'] = rng.normal(size=40)
+    expected['outcome'] = np.arange(40)
+
+    with self_play_dataset.DatasetWriter(directory, chunk_size=7) as writer:
+        writer.append(expected[:3])
+        writer.append(expected[3:20])
+    assert len(self_play_dataset.Dataset(directory)) == 20
+    with self_play_dataset.DatasetWriter(directory, chunk_size=7) as writer:
+        writer.append(expected[20:])
+
+    dataset = self_play_dataset.Dataset(directory)
+    assert len(dataset) == 40 and [len(chunk) for chunk in dataset.iter_chunks()] == [7] * 5 + [5]
+    np.testing.assert_array_equal(dataset[:], expected)
+    np.testing.assert_array_equal(dataset[5:23], expected[5:23])
+    np.testing.assert_array_equal(dataset[::3], expected[::3])
+    np.testing.assert_array_equal(dataset[[39, 0, 8, -2]], expected[[39, 0, 8, -2]])
+    assert dataset[-1] == expected[-1] and dataset[13] == expected[13]
+
+    own, opp = self_play_dataset.own_and_opponent(expected[:2])
+    np.testing.assert_array_equal(own, self_play_dataset.unpack_bitboards(expected['black'][:2]))
+    np.testing.assert_array_equal(own, ~opp)
@@ -1,3 +1,4 @@
+import numpy as np
 import othello
 
 
@@ -53,3 +54,18 @@ def convert_to_our_cpp_board(board):
             ret[y * 8 + x] = symbol
 
     return ''.join(ret)
+
+
+def convert_to_our_cpp_array(board):
+    """
+    :return: uint8 array of 64 squares in row-major order. 0 is black, 1 is white and 255 is empty.
+    """
+    assert isinstance(board, othello.Board)
+
+    def unpack(bits):
+        return np.unpackbits(np.array([bits], dtype='<u8').view(np.uint8), bitorder='little').astype(bool)
+
+    ret = np.full(64, 255, dtype=np.uint8)
+    ret[unpack(board.black_bits)] = 0
+    ret[unpack(board.white_bits)] = 1
+    return ret